@@ -0,0 +1,56 @@
+"""POLLyverse poll maker.
+
+The application is built by :func:`create_app`; importing this package creates
+no app, opens no connection and reads no configuration.
+"""
+from dotenv import load_dotenv
+from flask import Flask
+
+from .config import get_config
+from .extensions import db, login_manager
+from .models import User, Poll, PollOption, Option, Vote
+from .tally import get_vote_counts, count_votes, increment_vote_count, reconcile_vote_counts, get_chart_data
+from . import assets, commands, events, ingest, internal, metrics, passwords, replicas, results, templating, users, views
+
+
+def create_app(config=None):
+    """Create and configure the Flask application.
+
+    ``config`` is a profile name (see ``app.config.PROFILES``), a config object,
+    or None to pick the profile from FLASK_ENV.
+    """
+    load_dotenv()
+
+    app = Flask(__name__, template_folder='../templates', static_folder='../static')
+    app.config.from_object(config if config is not None and not isinstance(config, str) else get_config(config))
+
+    db.init_app(app)
+    replicas.init_app(app)
+    login_manager.init_app(app)
+    users.init_app(app)
+    results.init_app(app)
+    events.init_app(app)
+    ingest.init_app(app)
+    passwords.init_app(app)
+    metrics.init_app(app)
+    templating.init_app(app)
+    assets.init_app(app)
+    app.register_blueprint(views.bp)
+    if app.config['INTERNAL_ENDPOINTS']:
+        app.register_blueprint(internal.bp)
+    commands.init_app(app)
+    return app
+
+
+_default_app = None
+
+
+def __getattr__(name):
+    # Keeps `from app import app` working for scripts and older tests; the
+    # default app is only built on first access
+    global _default_app
+    if name == 'app':
+        if _default_app is None:
+            _default_app = create_app()
+        return _default_app
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
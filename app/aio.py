@@ -0,0 +1,297 @@
+"""Async serving of the read endpoints on an ASGI server.
+
+    pip install -r requirements-deploy.txt
+    FLASK_ENV=production uvicorn asgi:app --workers 4
+
+:class:`AsyncReadApp` answers GET requests for view_poll, poll_results and
+my_polls itself, running their queries on an AsyncEngine (aiomysql for MySQL,
+aiosqlite for SQLite), so one process keeps many of them waiting on the
+database at once instead of one per thread. The URL map, models, queries,
+caches, templates, session cookie and request hooks are the Flask app's own;
+every other request is passed to the Flask app on a thread pool of
+ASYNC_WSGI_THREADS threads, like a threaded WSGI server would. Its request body
+is read from the ASGI server as the Flask app consumes it, so a streaming route
+such as /polls/import never holds the whole upload in memory.
+
+An async view loads the session user itself and renders inside a Flask
+request context built from the ASGI scope, so neither it nor its template
+touches the sync engine. Flask-SQLAlchemy's ``db.session`` is shared by every
+task of the event loop and must not be used from an async view. Their
+statements run on ``engine.sync_engine``, where the Engine-wide listeners of
+app.metrics count them like any other request's.
+"""
+import asyncio
+import io
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import abort, current_app, g, session
+from sqlalchemy import select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import selectinload
+from werkzeug.exceptions import ClientDisconnected, HTTPException
+
+from .models import Poll, User
+from .pagination import Page, encode_cursor, keyset_query, cursor_arg, per_page_arg
+from .pool import engine_options
+from .queries import user_polls_query, voted_polls_query, has_voted_query
+from .results import poll_cache, poll_view, serialize_poll
+from .users import CACHED_FIELDS, user_cache
+from . import views
+
+ASYNC_DRIVERS = {'mysql': 'mysql+aiomysql', 'sqlite': 'sqlite+aiosqlite', 'postgresql': 'postgresql+asyncpg'}
+_DONE = object()
+
+
+def async_database_url(config):
+    """ASYNC_DATABASE_URL, or SQLALCHEMY_DATABASE_URI with its driver swapped for an asyncio one."""
+    if config['ASYNC_DATABASE_URL']:
+        return make_url(config['ASYNC_DATABASE_URL'])
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    return url.set(drivername=ASYNC_DRIVERS[url.get_backend_name()])
+
+
+def async_engine_options(config, url):
+    # Same DB_POOL_* sizing as the sync engine, on the asyncio-adapted QueuePool
+    options = engine_options(config, url)
+    options.pop('poolclass', None)
+    return options
+
+
+def wsgi_environ(scope, stream=None):
+    """Build the WSGI environ of an ASGI HTTP request whose body is read from ``stream``."""
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode().decode('latin1'),
+        'PATH_INFO': scope['path'].encode().decode('latin1'),
+        'QUERY_STRING': scope['query_string'].decode('latin1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f'HTTP/{scope["http_version"]}',
+        'REMOTE_ADDR': scope['client'][0] if scope.get('client') else '',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': stream if stream is not None else io.BytesIO(),
+        'wsgi.input_terminated': True,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope['headers']:
+        name = name.decode('latin1').upper().replace('-', '_')
+        key = name if name in ('CONTENT_TYPE', 'CONTENT_LENGTH') else f'HTTP_{name}'
+        value = value.decode('latin1')
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+class RequestBody(io.RawIOBase):
+    """The ASGI request body as a blocking stream, read by a thread pool thread from the event loop.
+
+    Must not be read on the event loop's own thread.
+    """
+
+    def __init__(self, receive, loop):
+        self.receive = receive
+        self.loop = loop
+        self.chunk = b''
+        self.more_body = True
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self.chunk and self.more_body:
+            message = asyncio.run_coroutine_threadsafe(self.receive(), self.loop).result()
+            if message['type'] == 'http.disconnect':
+                raise ClientDisconnected()
+            self.chunk = message.get('body', b'')
+            self.more_body = message.get('more_body', False)
+        size = min(len(buffer), len(self.chunk))
+        buffer[:size] = self.chunk[:size]
+        self.chunk = self.chunk[size:]
+        return size
+
+
+def encode_headers(headers):
+    return [(name.lower().encode('latin1'), value.encode('latin1')) for name, value in headers]
+
+
+async def load_user(db_session):
+    """Set the Flask-Login user of the request from the session cookie, through the user cache."""
+    user = None
+    user_id = session.get('_user_id')
+    if user_id is not None:
+        user_id = int(user_id)
+        cache = user_cache()
+        data = cache.get(user_id)
+        if data is None:
+            found = await db_session.get(User, user_id)
+            if found is not None:
+                data = {field: getattr(found, field) for field in CACHED_FIELDS}
+                cache.set(user_id, data)
+        if data is not None:
+            user = User(**data)
+    g._login_user = user if user is not None else current_app.login_manager.anonymous_user()
+    return g._login_user
+
+
+async def load_poll(db_session, poll_id):
+    """Async counterpart of app.results.get_poll_results, filling the same cache."""
+    cache = poll_cache()
+    data = cache.get(poll_id)
+    if data is None:
+        poll = (await db_session.execute(
+            select(Poll).options(selectinload(Poll.options)).where(Poll.id == poll_id)
+        )).scalar()
+        if poll is None:
+            return None
+        data = serialize_poll(poll)
+        cache.set(poll_id, data)
+    return poll_view(data)
+
+
+async def paginate(db_session, query, cursor, per_page):
+    # The same keyset statements as app.pagination, executed on the async session
+    statement = keyset_query(query, cursor, per_page + 1).statement
+    items = (await db_session.execute(statement)).scalars().all()
+    next_cursor = encode_cursor(items[per_page - 1]) if len(items) > per_page else None
+    return Page(items[:per_page], next_cursor)
+
+
+async def view_poll(db_session, user, poll_id):
+    poll = await load_poll(db_session, poll_id)
+    if poll is None:
+        abort(404)
+    denied = views.poll_denied(poll)
+    if denied is not None:
+        return denied
+    has_voted = False
+    if user.is_authenticated:
+        statement = has_voted_query(poll_id, user.id).limit(1).statement
+        has_voted = (await db_session.execute(statement)).first() is not None
+    return views.render_poll(poll, has_voted)
+
+
+async def poll_results(db_session, user, poll_id):
+    return views.results_response(views.visible_results(await load_poll(db_session, poll_id)))
+
+
+async def my_polls(db_session, user):
+    if not user.is_authenticated:
+        return current_app.login_manager.unauthorized()
+    per_page = per_page_arg()
+    created = await paginate(db_session, user_polls_query(user.id), cursor_arg('created_before'), per_page)
+    voted = await paginate(db_session, voted_polls_query(user.id), cursor_arg('voted_before'), per_page)
+    return views.render_my_polls(created, voted)
+
+
+ASYNC_VIEWS = {
+    'main.view_poll': view_poll,
+    'main.poll_results': poll_results,
+    'main.my_polls': my_polls,
+}
+
+
+class AsyncReadApp:
+    """ASGI application serving ``ASYNC_VIEWS`` natively and everything else through the Flask app."""
+
+    def __init__(self, flask_app, async_views=None):
+        self.flask_app = flask_app
+        self.async_views = ASYNC_VIEWS if async_views is None else async_views
+        self.executor = ThreadPoolExecutor(flask_app.config['ASYNC_WSGI_THREADS'], thread_name_prefix='wsgi')
+        self._engine = None
+
+    @property
+    def engine(self):
+        # Created on first use, inside the worker process and its event loop
+        if self._engine is None:
+            url = async_database_url(self.flask_app.config)
+            self._engine = create_async_engine(url, **async_engine_options(self.flask_app.config, url))
+        return self._engine
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self.http(scope, receive, send)
+        else:
+            await send({'type': 'websocket.close'})
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self._engine is not None:
+                    await self._engine.dispose()
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def http(self, scope, receive, send):
+        body = io.BufferedReader(RequestBody(receive, asyncio.get_running_loop()))
+        environ = wsgi_environ(scope, body)
+        view, args = self.match(environ)
+        if view is None:
+            await self.call_wsgi(environ, send)
+            return
+        response = await self.dispatch(environ, view, args)
+        # Drops the body of a 304 and fixes up headers as werkzeug does for WSGI
+        body, status, headers = response.get_wsgi_response(environ)
+        await send({'type': 'http.response.start', 'status': int(status.split(' ', 1)[0]),
+                    'headers': encode_headers(headers)})
+        await send({'type': 'http.response.body', 'body': b''.join(body)})
+
+    def match(self, environ):
+        if environ['REQUEST_METHOD'] != 'GET':
+            return None, None
+        try:
+            endpoint, args = self.flask_app.url_map.bind_to_environ(environ).match()
+        except HTTPException:
+            return None, None
+        return self.async_views.get(endpoint), args
+
+    async def dispatch(self, environ, view, args):
+        """Run an async view the way Flask's full_dispatch_request runs a sync one."""
+        app = self.flask_app
+        with app.request_context(environ):
+            try:
+                rv = app.preprocess_request()
+                if rv is None:
+                    async with AsyncSession(self.engine, expire_on_commit=False) as db_session:
+                        user = await load_user(db_session)
+                        rv = await view(db_session, user, **args)
+            except Exception as e:
+                try:
+                    rv = app.handle_user_exception(e)
+                except Exception as e:
+                    rv = app.handle_exception(e)
+            return app.finalize_request(rv)
+
+    async def call_wsgi(self, environ, send):
+        """Run the Flask app on the thread pool, streaming its body as it is produced."""
+        loop = asyncio.get_running_loop()
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started['status'] = int(status.split(' ', 1)[0])
+            started['headers'] = headers
+
+        body = await loop.run_in_executor(self.executor, self.flask_app, environ, start_response)
+        chunks = iter(body)
+        try:
+            chunk = await loop.run_in_executor(self.executor, next, chunks, _DONE)
+            await send({'type': 'http.response.start', 'status': started['status'],
+                        'headers': encode_headers(started['headers'])})
+            while chunk is not _DONE:
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                chunk = await loop.run_in_executor(self.executor, next, chunks, _DONE)
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            if hasattr(body, 'close'):
+                await loop.run_in_executor(self.executor, body.close)
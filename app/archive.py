@@ -0,0 +1,163 @@
+"""Vote storage: hash partitioning of the vote table and cold archival of inactive polls.
+
+Partitioning (``flask db partition-votes``, MySQL only) splits ``vote`` into
+PARTITIONS BY HASH(poll_id), so the per-poll reads and deletes touch one
+partition and its indexes stay small. MySQL requires the partitioning column in
+every unique key and doesn't support foreign keys on partitioned tables, so
+the command drops the vote foreign keys and makes ``(id, poll_id)`` the primary
+key. The app never relies on those foreign keys: delete_poll removes votes itself.
+
+Archival (``flask archive-polls``) closes polls that got no vote for
+ARCHIVE_AFTER_DAYS days. Their votes are first folded into the rollups, then
+written to gzip-compressed JSON Lines files under ARCHIVE_DIR and deleted from
+the vote table. What stays online is frozen: the option counters, which the
+results are rendered from, the rollups behind the time series, and who voted
+(``archived_voter``), so the poll stays in its voters' listings. Archived polls
+take no more votes, and vote exports read the archive files.
+
+An archive file holds a header line and then one compact ``[vote_id, user_id,
+option_id, voted_at]`` array per vote. A poll may have several files, one per
+run that found votes for it, named after the first vote id they hold.
+"""
+import glob
+import gzip
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import insert, inspect, or_, select
+
+from .extensions import db
+from .models import ArchivedVoter, Poll, Vote
+from .results import invalidate_poll
+from .rollups import compact
+
+ARCHIVE_COLUMNS = ['vote_id', 'user_id', 'option_id', 'voted_at']
+
+log = logging.getLogger(__name__)
+
+
+def partition_statements(connection, partitions):
+    """DDL that partitions the vote table by HASH(poll_id) into ``partitions`` partitions."""
+    statements = [
+        f'ALTER TABLE vote DROP FOREIGN KEY {foreign_key["name"]}'
+        for foreign_key in inspect(connection).get_foreign_keys('vote')
+    ]
+    statements.append('ALTER TABLE vote DROP PRIMARY KEY, ADD PRIMARY KEY (id, poll_id)')
+    statements.append(f'ALTER TABLE vote PARTITION BY HASH (poll_id) PARTITIONS {int(partitions)}')
+    return statements
+
+
+def archive_dir():
+    return os.path.abspath(current_app.config['ARCHIVE_DIR'])
+
+
+def archive_files(poll_id):
+    """Archive files of a poll, oldest votes first."""
+    paths = glob.glob(os.path.join(archive_dir(), f'poll-{poll_id}-*.jsonl.gz'))
+    return sorted(paths, key=lambda path: int(path.rsplit('-', 1)[1].split('.')[0]))
+
+
+def read_archived_votes(poll_id):
+    """Yield the ``ARCHIVE_COLUMNS`` rows of every archived vote of a poll."""
+    for path in archive_files(poll_id):
+        with gzip.open(path, 'rt', encoding='utf-8') as source:
+            next(source)  # header
+            for line in source:
+                yield json.loads(line)
+
+
+def polls_to_archive(days, limit=None):
+    """Ids of polls with no vote in ``days`` days, and of archived polls that still have votes.
+
+    The latter are left behind by a run that stopped between archiving a poll
+    and deleting its votes, or got a vote before every worker saw the poll archived.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    recent_vote = select(Vote.id).where(Vote.poll_id == Poll.id, Vote.voted_at >= cutoff).exists()
+    any_vote = select(Vote.id).where(Vote.poll_id == Poll.id).exists()
+    query = db.session.query(Poll.id).filter(or_(
+        Poll.archived_at.is_(None) & (Poll.created_at < cutoff) & ~recent_vote,
+        Poll.archived_at.isnot(None) & any_vote,
+    )).order_by(Poll.id)
+    if limit is not None:
+        query = query.limit(limit)
+    return [poll_id for poll_id, in query]
+
+
+def write_archive(poll_id, rows):
+    """Write ``rows`` to a new archive file of the poll; return (first vote id, last vote id, count)."""
+    os.makedirs(archive_dir(), exist_ok=True)
+    partial = os.path.join(archive_dir(), f'poll-{poll_id}.partial')
+    first = last = None
+    count = 0
+    with open(partial, 'wb') as raw:
+        with gzip.GzipFile(fileobj=raw, mode='wb') as output:
+            output.write((json.dumps({'poll_id': poll_id, 'columns': ARCHIVE_COLUMNS}) + '\n').encode())
+            for vote_id, user_id, option_id, voted_at in rows:
+                record = [vote_id, user_id, option_id, voted_at.isoformat() if voted_at else None]
+                output.write((json.dumps(record, separators=(',', ':')) + '\n').encode())
+                first = vote_id if first is None else first
+                last = vote_id
+                count += 1
+        raw.flush()
+        os.fsync(raw.fileno())
+    if not count:
+        os.remove(partial)
+        return None, None, 0
+    # A rerun after a crash rewrites the same file with at least the same votes
+    os.replace(partial, os.path.join(archive_dir(), f'poll-{poll_id}-{first}.jsonl.gz'))
+    return first, last, count
+
+
+def archive_poll(poll_id, yield_per=1000):
+    """Close a poll, move its votes to an archive file and return how many were moved, None if it is gone."""
+    poll = db.session.get(Poll, poll_id)
+    if poll is None:
+        log.info('Poll %s was deleted before it could be archived', poll_id)
+        return None
+    if poll.archived_at is None:
+        # Close voting before reading the votes, so none lands after the file is written
+        poll.archived_at = datetime.utcnow()
+        db.session.commit()
+        invalidate_poll(poll_id)
+
+    statement = (
+        select(Vote.id, Vote.user_id, Vote.option_id, Vote.voted_at)
+        .where(Vote.poll_id == poll_id)
+        .order_by(Vote.id)
+        .execution_options(stream_results=True, yield_per=yield_per)
+    )
+    first, last, count = write_archive(poll_id, db.session.execute(statement))
+    if count:
+        archived = (Vote.poll_id == poll_id) & Vote.id.between(first, last)
+        db.session.execute(insert(ArchivedVoter).from_select(
+            ['poll_id', 'user_id'], select(Vote.poll_id, Vote.user_id).where(archived)
+        ))
+        Vote.query.filter(archived).delete(synchronize_session=False)
+        db.session.commit()
+    return count
+
+
+def archive_polls(days, limit=None, yield_per=1000):
+    """Archive every poll inactive for ``days`` days; return ``(polls, votes)`` archived."""
+    # The time series must have every vote before they leave the table
+    compact(current_app.config['ROLLUP_BATCH_SIZE'], current_app.config['ROLLUP_LAG'])
+    polls = votes = 0
+    for poll_id in polls_to_archive(days, limit):
+        moved = archive_poll(poll_id, yield_per)
+        if moved is not None:
+            polls += 1
+            votes += moved
+    return polls, votes
+
+
+def delete_archived_voters(poll_id):
+    ArchivedVoter.query.filter_by(poll_id=poll_id).delete(synchronize_session=False)
+
+
+def delete_poll_archive(poll_id):
+    for path in archive_files(poll_id):
+        os.remove(path)
@@ -0,0 +1,196 @@
+"""Fingerprinted, precompressed static assets.
+
+``flask assets build`` copies every file under static/ to static/build under a
+name that carries a hash of its content (``images/multiple formats.jpg``
+becomes ``images/multiple-formats.1c0e9b2f4a7d.jpg``), writes gzip and, when the
+optional ``brotli`` package is installed, brotli variants of text assets, and,
+when Pillow is installed, resized WebP copies of the images for ``srcset``. The
+mapping is recorded in static/build/manifest.json, with a ``version`` that
+changes whenever any built name does.
+
+Templates link assets through ``asset_url('css/style.css')`` and
+``asset_srcset('images/easy.jpg')``. Built assets are served from /assets with
+the best encoding the client accepts and a one-year immutable Cache-Control, so
+browsers never revalidate them; a changed file gets a new name. Without a
+build, ``asset_url`` falls back to the plain static URL. Fragments that link
+assets carry ``asset_version()`` in their cache key, so a shared fragment cache
+never serves a previous deploy's names.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+import shutil
+
+from flask import Blueprint, abort, current_app, request, send_from_directory, url_for
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+try:
+    from PIL import Image
+except ImportError:  # no WebP variants
+    Image = None
+
+COMPRESSIBLE = {'.css', '.js', '.svg', '.json', '.txt'}
+RESIZABLE = {'.jpg', '.jpeg', '.png'}
+# Content-Encoding and file suffix, in order of preference
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+BUILD_DIR = 'build'
+MANIFEST = 'manifest.json'
+
+bp = Blueprint('assets', __name__, url_prefix='/assets')
+
+
+def file_digest(path, length=12):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for chunk in iter(lambda: source.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:length]
+
+
+def hashed_name(logical, digest, suffix='', ext=None):
+    """``images/multiple formats.jpg`` -> ``images/multiple-formats<suffix>.<digest>.jpg``."""
+    directory, filename = posixpath.split(logical)
+    stem, original_ext = posixpath.splitext(filename)
+    stem = re.sub(r'[^A-Za-z0-9_.-]+', '-', stem).strip('-') or 'asset'
+    return posixpath.join(directory, f'{stem}{suffix}.{digest}{ext or original_ext}')
+
+
+def source_files(static_folder):
+    """Logical paths of everything under ``static_folder``, except dotfiles and the build."""
+    build = os.path.join(static_folder, BUILD_DIR)
+    for root, dirs, files in os.walk(static_folder):
+        dirs[:] = sorted(d for d in dirs if not d.startswith('.') and os.path.join(root, d) != build)
+        for filename in sorted(files):
+            if not filename.startswith('.'):
+                yield os.path.relpath(os.path.join(root, filename), static_folder).replace(os.sep, '/')
+
+
+def precompress(path):
+    """Write ``path.gz`` (and ``path.br``), skipping a variant that would not be smaller."""
+    with open(path, 'rb') as source:
+        data = source.read()
+    variants = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(data, quality=11)
+    for suffix, compressed in variants.items():
+        if len(compressed) < len(data):
+            with open(path + suffix, 'wb') as target:
+                target.write(compressed)
+
+
+def resize_webp(source, target, width, quality=80):
+    with Image.open(source) as image:
+        height = round(image.height * width / image.width)
+        image = image.convert('RGB').resize((width, height), Image.LANCZOS)
+        image.save(target, 'WEBP', quality=quality, method=6)
+
+
+def image_width(path):
+    with Image.open(path) as image:
+        return image.width
+
+
+def build(static_folder, widths=(480, 960, 1600)):
+    """Build static/build and its manifest; return the manifest.
+
+    Files already built from the same content are left alone, and earlier
+    builds are kept so pages that still reference them keep working.
+    """
+    build_folder = os.path.join(static_folder, BUILD_DIR)
+    manifest = {'assets': {}, 'srcsets': {}}
+    for logical in source_files(static_folder):
+        source = os.path.join(static_folder, logical)
+        digest = file_digest(source)
+        name = hashed_name(logical, digest)
+        target = os.path.join(build_folder, name)
+        manifest['assets'][logical] = name
+        ext = posixpath.splitext(logical)[1].lower()
+        if not os.path.exists(target):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copyfile(source, target)
+            if ext in COMPRESSIBLE:
+                precompress(target)
+        if ext in RESIZABLE and Image is not None:
+            original = image_width(source)
+            srcset = []
+            for width in sorted(set(min(width, original) for width in widths)):
+                variant = hashed_name(logical, digest, suffix=f'-{width}w', ext='.webp')
+                if not os.path.exists(os.path.join(build_folder, variant)):
+                    resize_webp(source, os.path.join(build_folder, variant), width)
+                srcset.append([width, variant])
+            manifest['srcsets'][logical] = srcset
+    manifest['version'] = manifest_version(manifest)
+    os.makedirs(build_folder, exist_ok=True)
+    with open(os.path.join(build_folder, MANIFEST), 'w') as output:
+        json.dump(manifest, output, indent=2, sort_keys=True)
+    return manifest
+
+
+def manifest_version(manifest):
+    names = json.dumps([manifest['assets'], manifest['srcsets']], sort_keys=True)
+    return hashlib.sha256(names.encode()).hexdigest()[:12]
+
+
+def load_manifest(static_folder):
+    try:
+        with open(os.path.join(static_folder, BUILD_DIR, MANIFEST)) as source:
+            return json.load(source)
+    except FileNotFoundError:
+        return {'assets': {}, 'srcsets': {}, 'version': ''}
+
+
+def manifest():
+    return current_app.extensions['assets']
+
+
+def asset_url(filename):
+    """URL of the built copy of static ``filename``, or its plain static URL before a build."""
+    name = manifest()['assets'].get(filename)
+    if name is None:
+        return url_for('static', filename=filename)
+    return url_for('assets.asset', filename=name)
+
+
+def asset_version():
+    """Version of the current build, to put in the key of a cached fragment that links assets."""
+    return manifest().get('version', '')
+
+
+def asset_srcset(filename):
+    """``srcset`` value listing the WebP variants of an image, empty if there are none."""
+    variants = manifest()['srcsets'].get(filename, [])
+    return ', '.join(f"{url_for('assets.asset', filename=name)} {width}w" for width, name in variants)
+
+
+@bp.route('/<path:filename>')
+def asset(filename):
+    if filename == MANIFEST:
+        abort(404)
+    folder = os.path.join(current_app.static_folder, BUILD_DIR)
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    encoding = None
+    for name, suffix in ENCODINGS:
+        if request.accept_encodings[name] and os.path.isfile(os.path.join(folder, filename + suffix)):
+            encoding = name
+            filename += suffix
+            break
+    response = send_from_directory(folder, filename, mimetype=mimetype, max_age=current_app.config['ASSET_MAX_AGE'])
+    if encoding is not None:
+        response.content_encoding = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.immutable = True
+    return response
+
+
+def init_app(app):
+    app.extensions['assets'] = load_manifest(app.static_folder)
+    app.jinja_env.globals.update(asset_url=asset_url, asset_srcset=asset_srcset, asset_version=asset_version)
+    app.register_blueprint(bp)
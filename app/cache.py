@@ -0,0 +1,142 @@
+"""Small caching toolkit shared by the user loader and the poll result cache.
+
+Backends implement ``get(key)``, ``set(key, value, ttl=None)`` and
+``delete(key)``, and ``get`` returns None on a miss:
+
+* :class:`LRUCache` - process-local, bounded, with a per-entry TTL.
+* :class:`SharedStore` - adapts a redis-py style client (or anything with
+  ``get``/``set(ex=...)``/``delete``) and stores values as JSON.
+* :class:`TieredCache` - a local cache in front of an optional shared store.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    def as_dict(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class LRUCache:
+    """Thread-safe least-recently-used cache with a time-to-live per entry."""
+
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires = entry
+                if expires is None or expires > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.stats.hits += 1
+                    return value
+                del self._data[key]
+            self.stats.misses += 1
+            return None
+
+    def set(self, key, value, ttl=None):
+        ttl = ttl if ttl is not None else self.ttl
+        expires = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SharedStore:
+    """Cache backend on top of a shared key-value client such as ``redis.Redis``."""
+
+    def __init__(self, client, prefix='', ttl=None):
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+        self.stats = CacheStats()
+
+    def get(self, key):
+        raw = self.client.get(f'{self.prefix}{key}')
+        if raw is None:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        return json.loads(raw)
+
+    def set(self, key, value, ttl=None):
+        self.client.set(f'{self.prefix}{key}', json.dumps(value), ex=ttl or self.ttl)
+
+    def delete(self, key):
+        self.client.delete(f'{self.prefix}{key}')
+
+
+class TieredCache:
+    """Process-local cache in front of an optional shared store.
+
+    Reads try the local cache first and fill it from the shared store; writes
+    and deletes go to both, so an invalidation in one worker reaches the others
+    once their local entry expires.
+    """
+
+    def __init__(self, local, shared=None):
+        self.local = local
+        self.shared = shared
+
+    @property
+    def stats(self):
+        return self.local.stats
+
+    def get(self, key):
+        value = self.local.get(key)
+        if value is None and self.shared is not None:
+            value = self.shared.get(key)
+            if value is not None:
+                self.local.set(key, value)
+        return value
+
+    def set(self, key, value, ttl=None):
+        self.local.set(key, value, ttl)
+        if self.shared is not None:
+            self.shared.set(key, value, ttl)
+
+    def delete(self, key):
+        self.local.delete(key)
+        if self.shared is not None:
+            self.shared.delete(key)
+
+
+def shared_client(url):
+    """Connect to the Redis server at ``url`` (needs the optional ``redis`` package)."""
+    if not url:
+        return None
+    try:
+        import redis
+    except ImportError:
+        raise RuntimeError('A Redis URL is configured but the redis package is not installed') from None
+    return redis.Redis.from_url(url)
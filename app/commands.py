@@ -0,0 +1,175 @@
+"""Flask CLI commands, registered on the app by create_app()."""
+import time
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+
+import migrations
+from . import assets
+from .archive import archive_polls, partition_statements, polls_to_archive
+from .export import export_rows, encode_rows
+from .extensions import db
+from .models import User, Poll
+from .polls import import_polls, PollImportError
+from .queries import explain_route_queries
+from .rollups import compact
+from .tally import reconcile_vote_counts
+
+db_cli = AppGroup('db', help='Manage the database and its schema migrations.')
+
+@db_cli.command('create')
+def db_create_command():
+    """Create the database named in SQLALCHEMY_DATABASE_URI if it is missing (MySQL only)."""
+    url = make_url(current_app.config['SQLALCHEMY_DATABASE_URI'])
+    if url.get_backend_name() != 'mysql':
+        click.echo(f'Nothing to do for {url.get_backend_name()}.')
+        return
+    server = create_engine(url.set(database=''))
+    with server.connect() as connection:
+        connection.execute(text(f'CREATE DATABASE IF NOT EXISTS `{url.database}`'))
+    server.dispose()
+    click.echo(f'Database {url.database} is ready.')
+
+@db_cli.command('upgrade')
+@click.option('--target', type=int, default=None, help='Stop after this version.')
+def db_upgrade_command(target):
+    """Apply pending schema migrations."""
+    applied = migrations.upgrade(db.engine, target)
+    for migration in applied:
+        click.echo(f'Applied {migration.version:04d} {migration.name}')
+    click.echo(f'Database is at version {migrations.current_version(db.engine)}.')
+
+@db_cli.command('current')
+def db_current_command():
+    """Show the schema version and any pending migrations."""
+    click.echo(f'Current version: {migrations.current_version(db.engine)}')
+    for migration in migrations.pending(db.engine):
+        click.echo(f'Pending: {migration.version:04d} {migration.name}')
+
+@db_cli.command('partition-votes')
+@click.option('--partitions', type=int, default=16, show_default=True)
+@click.option('--dry-run', is_flag=True, help='Print the statements instead of running them.')
+def db_partition_votes_command(partitions, dry_run):
+    """Partition the vote table by HASH(poll_id) (MySQL only, drops the vote foreign keys)."""
+    if db.engine.dialect.name != 'mysql':
+        raise click.ClickException('Partitioning the vote table is only supported on MySQL.')
+    with db.engine.connect() as connection:
+        statements = partition_statements(connection, partitions)
+        for statement in statements:
+            click.echo(statement)
+            if not dry_run:
+                # DDL commits implicitly in MySQL, each statement stands alone
+                connection.execute(text(statement))
+
+@click.command('reconcile-tallies')
+@click.option('--poll-id', type=int, default=None, help='Only reconcile the options of this poll.')
+def reconcile_tallies_command(poll_id):
+    """Rebuild the per-option vote counters from the vote table."""
+    fixed = reconcile_vote_counts(poll_id)
+    click.echo(f'Reconciled vote counters: {fixed} option(s) corrected.')
+
+@click.command('import-polls')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--user', 'username', required=True, help='Username that will own the imported polls.')
+@click.option('--format', 'format', type=click.Choice(['jsonl', 'csv']), default=None,
+              help='Input format, guessed from the file extension by default.')
+@click.option('--batch-size', type=int, default=None, help='Polls per transaction (IMPORT_BATCH_SIZE).')
+def import_polls_command(path, username, format, batch_size):
+    """Create polls with their options from a JSON Lines or CSV file."""
+    user = User.query.filter_by(username=username).first()
+    if user is None:
+        raise click.ClickException(f'No user named {username}')
+    format = format or ('csv' if path.lower().endswith('.csv') else 'jsonl')
+    with open(path, encoding='utf-8', newline='' if format == 'csv' else None) as lines:
+        try:
+            result = import_polls(lines, user.id, format=format,
+                                  batch_size=batch_size or current_app.config['IMPORT_BATCH_SIZE'])
+        except PollImportError as e:
+            if e.result is not None:
+                raise click.ClickException(f'{e}; imported {e.result.imported} poll(s) before it')
+            raise click.ClickException(str(e))
+    for error in result.errors:
+        click.echo(f'line {error["line"]}: {error["error"]}', err=True)
+    click.echo(f'Imported {result.imported} poll(s), skipped {result.skipped} invalid row(s).')
+
+@click.command('export-poll')
+@click.argument('poll_id', type=int)
+@click.option('--kind', type=click.Choice(['votes', 'tallies']), default='votes', show_default=True)
+@click.option('--format', 'format', type=click.Choice(['csv', 'jsonl']), default='csv', show_default=True)
+@click.option('--output', type=click.File('w', encoding='utf-8'), default='-', help='File to write, stdout by default.')
+def export_poll_command(poll_id, kind, format, output):
+    """Stream a poll's raw votes or per-option tallies as CSV or JSON Lines."""
+    if db.session.get(Poll, poll_id) is None:
+        raise click.ClickException(f'No poll with id {poll_id}')
+    columns, rows = export_rows(kind, poll_id, yield_per=current_app.config['EXPORT_YIELD_PER'])
+    for chunk in encode_rows(columns, rows, format):
+        output.write(chunk)
+
+@click.command('compact-rollups')
+@click.option('--every', type=float, default=None, help='Keep running, compacting every this many seconds.')
+def compact_rollups_command(every):
+    """Fold new votes into the per-minute, per-hour and per-day rollups."""
+    while True:
+        folded = compact(current_app.config['ROLLUP_BATCH_SIZE'], current_app.config['ROLLUP_LAG'])
+        click.echo(f'Folded {folded} vote(s) into the rollups.')
+        if every is None:
+            return
+        db.session.remove()
+        time.sleep(every)
+
+@click.command('archive-polls')
+@click.option('--days', type=int, default=None, help='Archive polls without a vote for this many days (ARCHIVE_AFTER_DAYS).')
+@click.option('--limit', type=int, default=None, help='Archive at most this many polls.')
+@click.option('--dry-run', is_flag=True, help='Only list the polls that would be archived.')
+def archive_polls_command(days, limit, dry_run):
+    """Move the votes of inactive polls to archive files and freeze their tallies."""
+    days = days if days is not None else current_app.config['ARCHIVE_AFTER_DAYS']
+    if dry_run:
+        poll_ids = polls_to_archive(days, limit)
+        click.echo(f'{len(poll_ids)} poll(s) to archive: {" ".join(map(str, poll_ids))}')
+        return
+    polls, votes = archive_polls(days, limit, yield_per=current_app.config['EXPORT_YIELD_PER'])
+    click.echo(f'Archived {votes} vote(s) of {polls} poll(s) to {current_app.config["ARCHIVE_DIR"]}.')
+
+@click.command('explain-queries')
+def explain_queries_command():
+    """EXPLAIN every route query and fail if one needs a full table scan.
+
+    MySQL happily scans tiny tables, so run this against a realistically sized
+    database.
+    """
+    failures = 0
+    for route, sql, plan, full_scan in explain_route_queries():
+        status = 'FULL SCAN' if full_scan else 'ok'
+        click.echo(f'[{status}] {route}: {" ".join(sql.split())}')
+        for row in plan:
+            click.echo(f'    {row}')
+        failures += full_scan
+    if failures:
+        raise click.ClickException(f'{failures} route queries fall back to a full table scan')
+
+assets_cli = AppGroup('assets', help='Build the fingerprinted static assets.')
+
+@assets_cli.command('build')
+def assets_build_command():
+    """Write hashed, precompressed copies of static/ and resized WebP images to static/build."""
+    if assets.brotli is None:
+        click.echo('brotli is not installed, writing gzip variants only.')
+    if assets.Image is None:
+        click.echo('Pillow is not installed, skipping WebP image variants.')
+    manifest = assets.build(current_app.static_folder, current_app.config['ASSET_WIDTHS'])
+    current_app.extensions['assets'] = manifest
+    click.echo(f'Built {len(manifest["assets"])} assets and {sum(map(len, manifest["srcsets"].values()))} image variants.')
+
+def init_app(app):
+    app.cli.add_command(db_cli)
+    app.cli.add_command(assets_cli)
+    app.cli.add_command(reconcile_tallies_command)
+    app.cli.add_command(import_polls_command)
+    app.cli.add_command(export_poll_command)
+    app.cli.add_command(compact_rollups_command)
+    app.cli.add_command(archive_polls_command)
+    app.cli.add_command(explain_queries_command)
@@ -0,0 +1,223 @@
+"""Configuration profiles.
+
+A profile is picked by name (``create_app('production')``) or through the
+FLASK_ENV environment variable. Secrets and connection strings are read from
+the environment when the profile is instantiated, so they never live in the
+code and .env files loaded by create_app() are honoured.
+"""
+import os
+
+DEFAULT_DATABASE_URI = 'mysql+pymysql://root:@localhost:3306/POLLyverse?charset=utf8mb4'
+
+
+def env_int(name, default):
+    return int(os.environ[name]) if name in os.environ else default
+
+
+def env_float(name, default):
+    return float(os.environ[name]) if name in os.environ else default
+
+
+def env_bool(name, default):
+    return os.environ[name].lower() in ('1', 'true', 'yes', 'on') if name in os.environ else default
+
+
+class Config:
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ECHO = False
+
+    # Connection pool of each worker process (see app.pool), overridable per deployment
+    DB_POOL_SIZE = 5
+    DB_MAX_OVERFLOW = 10
+    DB_POOL_RECYCLE = 3600  # seconds, keep below MySQL's wait_timeout
+    DB_POOL_PRE_PING = False
+    DB_POOL_TIMEOUT = 30  # seconds to wait for a free connection
+
+    # Read replicas of the primary (see app.replicas); a user who wrote something reads from the
+    # primary for REPLICA_PIN_SECONDS, and a failing replica is re-checked every REPLICA_HEALTH_INTERVAL
+    REPLICA_DATABASE_URIS = ()
+    REPLICA_PIN_SECONDS = 10
+    REPLICA_HEALTH_INTERVAL = 5
+
+    # Session user cache (see app.users), optionally shared through Redis
+    USER_CACHE_SIZE = 10000
+    USER_CACHE_TTL = 300  # seconds
+    CACHE_REDIS_URL = None
+
+    # view_poll result cache (see app.results); the TTL bounds how stale other workers can be
+    POLL_CACHE_SIZE = 10000
+    POLL_CACHE_TTL = 10  # seconds
+
+    # Page size of the poll listings (index, my_polls); ?per_page= is capped at the maximum
+    POLLS_PER_PAGE = 20
+    MAX_POLLS_PER_PAGE = 100
+
+    # Results JSON: shared caches may reuse public tallies for RESULTS_MAX_AGE seconds,
+    # and the creator's chart refreshes every RESULTS_POLL_INTERVAL seconds
+    RESULTS_MAX_AGE = 2
+    RESULTS_POLL_INTERVAL = 5
+
+    # Live vote stream: set EVENTS_REDIS_URL to fan out across workers; a watcher more than
+    # EVENTS_QUEUE_SIZE events behind is disconnected; keepalive comments every EVENTS_KEEPALIVE seconds
+    EVENTS_REDIS_URL = None
+    EVENTS_QUEUE_SIZE = 100
+    EVENTS_KEEPALIVE = 15
+
+    # 'sync' writes each vote in its own transaction; 'buffered' queues it for a background
+    # writer that commits batches (see app.ingest for durability and duplicate semantics)
+    VOTE_INGEST = 'sync'
+    VOTE_BATCH_SIZE = 500
+    VOTE_BATCH_INTERVAL = 0.05  # seconds
+    VOTE_QUEUE_SIZE = 10000
+
+    # Polls written per transaction by bulk imports (flask import-polls, POST /polls/import)
+    IMPORT_BATCH_SIZE = 500
+
+    # Polls with no vote for ARCHIVE_AFTER_DAYS days are archived by `flask archive-polls`: their votes
+    # move to gzipped JSON Lines files in ARCHIVE_DIR and their tallies are frozen (see app.archive)
+    ARCHIVE_DIR = 'archive'
+    ARCHIVE_AFTER_DAYS = 180
+
+    # Rows fetched per round trip by vote exports
+    EXPORT_YIELD_PER = 1000
+
+    # Vote rollup compaction (flask compact-rollups): votes per transaction, and how many
+    # seconds a vote must be old before it is folded in
+    ROLLUP_BATCH_SIZE = 10000
+    ROLLUP_LAG = 10
+
+    # Password hashing (see app.passwords): the full werkzeug method with its work factor, and
+    # the pool it runs on; logins and registrations get a 503 beyond MAX_PENDING hashes per worker
+    PASSWORD_HASH_METHOD = 'pbkdf2:sha256:600000'
+    PASSWORD_HASH_EXECUTOR = 'thread'  # or 'process'
+    PASSWORD_HASH_WORKERS = 2
+    PASSWORD_HASH_MAX_PENDING = 32
+
+    # Request instrumentation (see app.metrics); a request running more than QUERY_BUDGET
+    # statements is logged as a warning, 0 disables the check
+    METRICS_ENABLED = True
+    SERVER_TIMING = True
+    QUERY_BUDGET = 10
+
+    # Compiled templates are cached on disk for new workers (None: a directory under the system
+    # temp dir); {% cache %} fragments are kept FRAGMENT_CACHE_TTL seconds (see app.templating)
+    TEMPLATE_BYTECODE_CACHE = True
+    TEMPLATE_BYTECODE_CACHE_DIR = None
+    FRAGMENT_CACHE = True
+    FRAGMENT_CACHE_SIZE = 1000
+    FRAGMENT_CACHE_TTL = 300  # seconds
+
+    # ASGI serving (asgi.py, see app.aio): the async read views use ASYNC_DATABASE_URL, by default the
+    # database URI with an asyncio driver; other requests run on ASYNC_WSGI_THREADS threads per process
+    ASYNC_DATABASE_URL = None
+    ASYNC_WSGI_THREADS = 8
+
+    # Built assets (flask assets build) are cached by browsers for ASSET_MAX_AGE seconds without
+    # revalidation; images get WebP variants ASSET_WIDTHS pixels wide
+    ASSET_MAX_AGE = 365 * 24 * 3600
+    ASSET_WIDTHS = (480, 960, 1600)
+
+    # Diagnostics under /_internal, never enable on a public listener
+    INTERNAL_ENDPOINTS = False
+
+    def __init__(self):
+        self.SECRET_KEY = os.environ.get('SECRET_KEY', 'dev-secret-key')
+        self.SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', DEFAULT_DATABASE_URI)
+        if 'REPLICA_DATABASE_URLS' in os.environ:
+            self.REPLICA_DATABASE_URIS = tuple(url for url in os.environ['REPLICA_DATABASE_URLS'].split(',') if url)
+        self.REPLICA_PIN_SECONDS = env_int('REPLICA_PIN_SECONDS', self.REPLICA_PIN_SECONDS)
+        self.REPLICA_HEALTH_INTERVAL = env_int('REPLICA_HEALTH_INTERVAL', self.REPLICA_HEALTH_INTERVAL)
+        self.DB_POOL_SIZE = env_int('DB_POOL_SIZE', self.DB_POOL_SIZE)
+        self.DB_MAX_OVERFLOW = env_int('DB_MAX_OVERFLOW', self.DB_MAX_OVERFLOW)
+        self.DB_POOL_RECYCLE = env_int('DB_POOL_RECYCLE', self.DB_POOL_RECYCLE)
+        self.DB_POOL_PRE_PING = env_bool('DB_POOL_PRE_PING', self.DB_POOL_PRE_PING)
+        self.DB_POOL_TIMEOUT = env_int('DB_POOL_TIMEOUT', self.DB_POOL_TIMEOUT)
+        self.USER_CACHE_SIZE = env_int('USER_CACHE_SIZE', self.USER_CACHE_SIZE)
+        self.USER_CACHE_TTL = env_int('USER_CACHE_TTL', self.USER_CACHE_TTL)
+        self.CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL', self.CACHE_REDIS_URL)
+        self.POLL_CACHE_SIZE = env_int('POLL_CACHE_SIZE', self.POLL_CACHE_SIZE)
+        self.POLL_CACHE_TTL = env_int('POLL_CACHE_TTL', self.POLL_CACHE_TTL)
+        self.RESULTS_MAX_AGE = env_int('RESULTS_MAX_AGE', self.RESULTS_MAX_AGE)
+        self.RESULTS_POLL_INTERVAL = env_int('RESULTS_POLL_INTERVAL', self.RESULTS_POLL_INTERVAL)
+        self.EVENTS_REDIS_URL = os.environ.get('EVENTS_REDIS_URL', self.EVENTS_REDIS_URL)
+        self.EVENTS_KEEPALIVE = env_int('EVENTS_KEEPALIVE', self.EVENTS_KEEPALIVE)
+        self.VOTE_INGEST = os.environ.get('VOTE_INGEST', self.VOTE_INGEST)
+        self.VOTE_BATCH_SIZE = env_int('VOTE_BATCH_SIZE', self.VOTE_BATCH_SIZE)
+        self.VOTE_BATCH_INTERVAL = env_float('VOTE_BATCH_INTERVAL', self.VOTE_BATCH_INTERVAL)
+        self.VOTE_QUEUE_SIZE = env_int('VOTE_QUEUE_SIZE', self.VOTE_QUEUE_SIZE)
+        self.ARCHIVE_DIR = os.environ.get('ARCHIVE_DIR', self.ARCHIVE_DIR)
+        self.ARCHIVE_AFTER_DAYS = env_int('ARCHIVE_AFTER_DAYS', self.ARCHIVE_AFTER_DAYS)
+        self.PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', self.PASSWORD_HASH_METHOD)
+        self.PASSWORD_HASH_EXECUTOR = os.environ.get('PASSWORD_HASH_EXECUTOR', self.PASSWORD_HASH_EXECUTOR)
+        self.PASSWORD_HASH_WORKERS = env_int('PASSWORD_HASH_WORKERS', self.PASSWORD_HASH_WORKERS)
+        self.PASSWORD_HASH_MAX_PENDING = env_int('PASSWORD_HASH_MAX_PENDING', self.PASSWORD_HASH_MAX_PENDING)
+        self.METRICS_ENABLED = env_bool('METRICS_ENABLED', self.METRICS_ENABLED)
+        self.SERVER_TIMING = env_bool('SERVER_TIMING', self.SERVER_TIMING)
+        self.QUERY_BUDGET = env_int('QUERY_BUDGET', self.QUERY_BUDGET)
+        self.TEMPLATE_BYTECODE_CACHE = env_bool('TEMPLATE_BYTECODE_CACHE', self.TEMPLATE_BYTECODE_CACHE)
+        self.TEMPLATE_BYTECODE_CACHE_DIR = os.environ.get('TEMPLATE_BYTECODE_CACHE_DIR', self.TEMPLATE_BYTECODE_CACHE_DIR)
+        self.FRAGMENT_CACHE = env_bool('FRAGMENT_CACHE', self.FRAGMENT_CACHE)
+        self.FRAGMENT_CACHE_TTL = env_int('FRAGMENT_CACHE_TTL', self.FRAGMENT_CACHE_TTL)
+        self.ASYNC_DATABASE_URL = os.environ.get('ASYNC_DATABASE_URL', self.ASYNC_DATABASE_URL)
+        self.ASYNC_WSGI_THREADS = env_int('ASYNC_WSGI_THREADS', self.ASYNC_WSGI_THREADS)
+        self.INTERNAL_ENDPOINTS = env_bool('INTERNAL_ENDPOINTS', self.INTERNAL_ENDPOINTS)
+
+
+class DevelopmentConfig(Config):
+    DEBUG = True
+    SQLALCHEMY_ECHO = True  # Log every SQL statement while developing
+    INTERNAL_ENDPOINTS = True
+    FRAGMENT_CACHE = False  # Template edits show up on reload
+
+
+class ProductionConfig(Config):
+    DB_POOL_SIZE = 10
+    DB_MAX_OVERFLOW = 5
+    # Recycle and ping connections so MySQL's wait_timeout never hands us a dead one
+    DB_POOL_RECYCLE = 280
+    DB_POOL_PRE_PING = True
+    DB_POOL_TIMEOUT = 10
+
+    def __init__(self):
+        super().__init__()
+        if 'SECRET_KEY' not in os.environ:
+            raise RuntimeError('SECRET_KEY must be set in the environment for the production profile')
+
+
+class TestConfig(Config):
+    TESTING = True
+    WTF_CSRF_ENABLED = False
+    FRAGMENT_CACHE = False  # Tests reuse poll ids across fresh databases
+
+    def __init__(self):
+        super().__init__()
+        self.SECRET_KEY = os.environ.get('SECRET_KEY', 'test-secret-key')
+        self.SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///:memory:')
+
+
+class BenchConfig(Config):
+    """Production-like settings against a local database the benchmarks can seed."""
+
+    # Seeded users log in during HTTP runs; don't let hashing dominate the route timings
+    PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'
+
+    def __init__(self):
+        super().__init__()
+        self.SQLALCHEMY_DATABASE_URI = os.environ.get('BENCH_DATABASE_URL', 'sqlite:///' + os.path.abspath('bench.db'))
+
+
+PROFILES = {
+    'development': DevelopmentConfig,
+    'production': ProductionConfig,
+    'test': TestConfig,
+    'bench': BenchConfig,
+}
+
+
+def get_config(name=None):
+    """Instantiate the profile called ``name``, defaulting to FLASK_ENV or development."""
+    name = name or os.environ.get('FLASK_ENV') or 'development'
+    try:
+        return PROFILES[name]()
+    except KeyError:
+        raise ValueError(f'Unknown configuration profile {name!r}, expected one of {", ".join(PROFILES)}') from None
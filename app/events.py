@@ -0,0 +1,159 @@
+"""Live vote events for the per-poll Server-Sent Events stream.
+
+Every worker process has an EventHub that fans events out to the streams it is
+serving. Publishers go through a Broker: LocalBroker hands events straight to
+this process's hub, RedisBroker relays them over Redis pub/sub so that a vote
+committed by one worker reaches the watchers connected to every other worker.
+Any object with the Broker methods can be plugged in instead.
+"""
+import json
+import os
+import queue
+import threading
+
+from flask import current_app
+
+from .cache import shared_client
+
+
+class Subscription:
+    """One watcher's queue of pending events on a channel."""
+
+    def __init__(self, hub, channel, maxsize):
+        self.hub = hub
+        self.channel = channel
+        self.queue = queue.Queue(maxsize)
+        self.lagged = False
+
+    def get(self, timeout=None):
+        """Return the next event, or None if nothing arrived within ``timeout`` seconds."""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+
+class EventHub:
+    """In-process fan-out of events to the subscribers of a channel."""
+
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self._channels = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, channel):
+        subscription = Subscription(self, channel, self.queue_size)
+        with self._lock:
+            self._channels.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._channels.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._channels[subscription.channel]
+
+    def deliver(self, channel, event):
+        with self._lock:
+            subscribers = list(self._channels.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.queue.put_nowait(event)
+            except queue.Full:
+                # Never block a publisher on a slow watcher: cut it off instead, and
+                # let its EventSource reconnect and start again from a fresh snapshot
+                subscription.lagged = True
+                self.unsubscribe(subscription)
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._channels.values())
+
+
+class Broker:
+    """Carries published events to the EventHub of every worker."""
+
+    def __init__(self, hub):
+        self.hub = hub
+
+    def publish(self, channel, event):
+        raise NotImplementedError
+
+    def subscribe(self, channel):
+        return self.hub.subscribe(channel)
+
+
+class LocalBroker(Broker):
+    """Single-process broker: events only reach watchers of this worker."""
+
+    def publish(self, channel, event):
+        self.hub.deliver(channel, event)
+
+
+class RedisBroker(Broker):
+    """Relays events through Redis pub/sub to the hubs of all workers."""
+
+    def __init__(self, hub, client, prefix='events:'):
+        super().__init__(hub)
+        self.client = client
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._listener_pid = None
+
+    def publish(self, channel, event):
+        self.client.publish(self.prefix + channel, json.dumps(event))
+
+    def subscribe(self, channel):
+        self._ensure_listener()
+        return super().subscribe(channel)
+
+    def _ensure_listener(self):
+        # Keyed on the pid: the pubsub connection and its thread belong to the process
+        # that subscribed
+        with self._lock:
+            if self._listener_pid == os.getpid():
+                return
+            pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            pubsub.psubscribe(self.prefix + '*')
+            threading.Thread(target=self._listen, args=(pubsub,), daemon=True).start()
+            self._listener_pid = os.getpid()
+
+    def _listen(self, pubsub):
+        for message in pubsub.listen():
+            channel = message['channel']
+            if isinstance(channel, bytes):
+                channel = channel.decode()
+            self.hub.deliver(channel[len(self.prefix):], json.loads(message['data']))
+
+
+def broker():
+    return current_app.extensions['event_broker']
+
+
+def poll_channel(poll_id):
+    return f'poll:{poll_id}'
+
+
+def publish_vote(poll_id, option_id):
+    """Tell the poll's watchers that ``option_id`` gained a vote. Call after the commit."""
+    try:
+        broker().publish(poll_channel(poll_id), {'type': 'vote', 'option_id': option_id, 'delta': 1})
+    except Exception:
+        # The vote is already committed; a broker outage only delays watchers until they reconnect
+        current_app.logger.exception('Could not publish vote on poll %s', poll_id)
+
+
+def format_event(event):
+    """Encode an event dict as an SSE message named after its type."""
+    return f'event: {event["type"]}\ndata: {json.dumps(event)}\n\n'
+
+
+def init_app(app):
+    hub = EventHub(queue_size=app.config['EVENTS_QUEUE_SIZE'])
+    client = shared_client(app.config['EVENTS_REDIS_URL'])
+    app.extensions['event_broker'] = RedisBroker(hub, client) if client else LocalBroker(hub)
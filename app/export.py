@@ -0,0 +1,85 @@
+"""Streaming exports of a poll's raw votes and per-option tallies as CSV or JSON Lines.
+
+Votes are read as plain column rows through a server-side cursor
+(``stream_results``) in chunks of ``yield_per`` rows, and encoded as they
+arrive, so an export never holds more than one chunk in memory and never loads
+``Vote`` objects into the session. Votes of an archived poll are read back
+from its archive files (see app.archive).
+"""
+import csv
+import io
+import json
+from datetime import datetime
+from itertools import chain
+
+from sqlalchemy import select
+
+from .archive import archive_files, read_archived_votes
+from .extensions import db
+from .models import PollOption, Vote
+
+FORMATS = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+
+VOTE_COLUMNS = ['vote_id', 'voted_at', 'option_id', 'option_text']
+TALLY_COLUMNS = ['option_id', 'option_text', 'votes']
+
+
+def vote_rows(poll_id, yield_per=1000):
+    statement = (
+        select(Vote.id, Vote.voted_at, Vote.option_id, PollOption.text)
+        .join(PollOption, PollOption.id == Vote.option_id)
+        .where(Vote.poll_id == poll_id)
+        .order_by(Vote.id)
+        .execution_options(stream_results=True, yield_per=yield_per)
+    )
+    return db.session.execute(statement)
+
+
+def archived_vote_rows(poll_id):
+    if not archive_files(poll_id):
+        return iter(())
+    # Option texts are read now, before the live votes hold the connection with a streaming cursor
+    texts = dict(db.session.execute(select(PollOption.id, PollOption.text).where(PollOption.poll_id == poll_id)).all())
+    return ((vote_id, voted_at, option_id, texts.get(option_id))
+            for vote_id, _, option_id, voted_at in read_archived_votes(poll_id))
+
+
+def tally_rows(poll_id):
+    statement = (
+        select(PollOption.id, PollOption.text, PollOption.vote_count)
+        .where(PollOption.poll_id == poll_id)
+        .order_by(PollOption.id)
+    )
+    return db.session.execute(statement)
+
+
+def export_rows(kind, poll_id, yield_per=1000):
+    """Return the column names and the row iterator of a ``votes`` or ``tallies`` export."""
+    if kind == 'votes':
+        archived = archived_vote_rows(poll_id)
+        return VOTE_COLUMNS, chain(archived, vote_rows(poll_id, yield_per))
+    return TALLY_COLUMNS, tally_rows(poll_id)
+
+
+def encode(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def encode_rows(columns, rows, format, chunk_rows=1000):
+    """Yield the export as text chunks of up to ``chunk_rows`` rows each."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if format == 'csv' else None
+    if writer is not None:
+        writer.writerow(columns)
+    for count, row in enumerate(rows, 1):
+        values = [encode(value) for value in row]
+        if writer is not None:
+            writer.writerow(values)
+        else:
+            buffer.write(json.dumps(dict(zip(columns, values))) + '\n')
+        if count % chunk_rows == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
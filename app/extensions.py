@@ -0,0 +1,25 @@
+"""Flask extensions, created unbound and attached to the app in create_app()."""
+from flask_login import LoginManager
+from flask_sqlalchemy import SQLAlchemy as _SQLAlchemy
+from sqlalchemy import orm
+
+from .pool import engine_options
+from .replicas import RoutingSession
+
+
+class SQLAlchemy(_SQLAlchemy):
+    def apply_driver_hacks(self, app, sa_url, options):
+        # Resolved when the engine is created, so the pool matches the final
+        # database URI even if it was changed after create_app()
+        options.update(engine_options(app.config, sa_url))
+        return super().apply_driver_hacks(app, sa_url, options)
+
+    def create_session(self, options):
+        # Reads of replica_reads views may go to a replica (see app.replicas)
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+
+db = SQLAlchemy()
+
+login_manager = LoginManager()
+login_manager.login_view = 'main.login'
@@ -0,0 +1,188 @@
+"""Buffered vote ingestion.
+
+With VOTE_INGEST = 'buffered' the vote route validates a vote against the poll
+result cache and hands it to the process's VoteWriter instead of writing it.
+A background thread drains the queue in batches of up to VOTE_BATCH_SIZE votes
+or VOTE_BATCH_INTERVAL seconds, whichever comes first, and writes each batch in
+one transaction: a multi-row INSERT of the votes plus one counter UPDATE per
+option, instead of a transaction and a fsync per vote.
+
+Durability: a vote is acknowledged once it is queued, so votes still in the
+queue when a worker dies are lost (at most VOTE_QUEUE_SIZE per worker). A clean
+shutdown drains the queue first.
+
+Duplicates: the first vote of a user on a poll wins, as on the synchronous path.
+Later votes are dropped by the writer, whether they are already in the table or
+earlier in the same batch, and are counted in ``stats['duplicates']``.
+"""
+import atexit
+import os
+import queue
+import threading
+import time
+from collections import Counter, namedtuple
+from contextlib import nullcontext
+from datetime import datetime
+
+from flask import current_app, has_app_context
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from .events import publish_vote
+from .extensions import db
+from .models import PollOption, Vote
+from .results import invalidate_poll
+
+PendingVote = namedtuple('PendingVote', ['poll_id', 'user_id', 'option_id', 'voted_at'])
+
+
+class VoteWriter:
+    """Bounded vote queue of one worker process and the thread that writes it out."""
+
+    def __init__(self, app, batch_size=500, interval=0.05, queue_size=10000):
+        self.app = app
+        self.batch_size = batch_size
+        self.interval = interval
+        self.queue = queue.Queue(queue_size)
+        self.stats = Counter()
+        self._lock = threading.Lock()
+        self._writer_pid = None
+
+    def submit(self, poll_id, user_id, option_id):
+        """Queue a validated vote. Returns False when the queue is full."""
+        self._ensure_writer()
+        try:
+            self.queue.put_nowait(PendingVote(poll_id, user_id, option_id, datetime.utcnow()))
+        except queue.Full:
+            self.stats['rejected'] += 1
+            return False
+        self.stats['queued'] += 1
+        return True
+
+    def _ensure_writer(self):
+        # Keyed on the pid: a queue inherited from the parent has no thread draining it,
+        # and each worker registers its own drain at exit
+        with self._lock:
+            if self._writer_pid == os.getpid():
+                return
+            threading.Thread(target=self._run, daemon=True).start()
+            atexit.register(self.drain)
+            self._writer_pid = os.getpid()
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.interval
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get(timeout=max(deadline - time.monotonic(), 0)))
+                except queue.Empty:
+                    break
+            try:
+                self.write(batch)
+            except Exception:
+                self.stats['lost'] += len(batch)
+                self.app.logger.exception('Could not write a batch of %d votes', len(batch))
+
+    def drain(self):
+        """Write every queued vote now, in the calling thread."""
+        while True:
+            batch = []
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                return
+            self.write(batch)
+
+    def write(self, batch):
+        # Popping an app context removes the thread's db.session, so only push one in
+        # the writer thread, and use a session of its own so a drain from a request
+        # thread leaves the request's session alone
+        with nullcontext() if has_app_context() else self.app.app_context():
+            session = db.create_session({})()
+            try:
+                written = self._write_batch(session, batch)
+            except IntegrityError:
+                # A synchronous vote got in between the duplicate check and the insert
+                session.rollback()
+                written = self._write_one_by_one(session, batch)
+            finally:
+                session.close()
+            for vote in written:
+                publish_vote(vote.poll_id, vote.option_id)
+            for poll_id in {vote.poll_id for vote in written}:
+                invalidate_poll(poll_id)
+        self.stats['batches'] += 1
+        self.stats['written'] += len(written)
+        self.stats['duplicates'] += len(batch) - len(written)
+        return written
+
+    def _write_batch(self, session, batch):
+        votes = self._new_votes(session, batch)
+        if votes:
+            session.execute(insert(Vote), [
+                {'poll_id': vote.poll_id, 'user_id': vote.user_id, 'option_id': vote.option_id, 'voted_at': vote.voted_at}
+                for vote in votes
+            ])
+            increments = Counter(vote.option_id for vote in votes)
+            session.execute(
+                update(PollOption)
+                .where(PollOption.id == bindparam('option_id'))
+                .values(vote_count=PollOption.vote_count + bindparam('votes'))
+                .execution_options(synchronize_session=False),
+                [{'option_id': option_id, 'votes': count} for option_id, count in increments.items()],
+            )
+        session.commit()
+        return votes
+
+    def _new_votes(self, session, batch):
+        """Drop the votes of users who already voted on the poll, in the table or earlier in the batch."""
+        users_by_poll = {}
+        for vote in batch:
+            users_by_poll.setdefault(vote.poll_id, set()).add(vote.user_id)
+        seen = set()
+        for poll_id, user_ids in users_by_poll.items():
+            existing = select(Vote.user_id).where(Vote.poll_id == poll_id, Vote.user_id.in_(user_ids))
+            seen.update((poll_id, user_id) for user_id in session.execute(existing).scalars())
+        votes = []
+        for vote in batch:
+            if (vote.poll_id, vote.user_id) not in seen:
+                seen.add((vote.poll_id, vote.user_id))
+                votes.append(vote)
+        return votes
+
+    def _write_one_by_one(self, session, batch):
+        written = []
+        for vote in batch:
+            try:
+                session.add(Vote(poll_id=vote.poll_id, user_id=vote.user_id, option_id=vote.option_id, voted_at=vote.voted_at))
+                session.flush()
+                session.execute(
+                    update(PollOption)
+                    .where(PollOption.id == vote.option_id)
+                    .values(vote_count=PollOption.vote_count + 1)
+                    .execution_options(synchronize_session=False)
+                )
+                session.commit()
+                written.append(vote)
+            except IntegrityError:
+                session.rollback()
+        return written
+
+
+def vote_writer():
+    return current_app.extensions['vote_writer']
+
+
+def init_app(app):
+    if app.config['VOTE_INGEST'] not in ('sync', 'buffered'):
+        raise ValueError(f"VOTE_INGEST must be 'sync' or 'buffered', not {app.config['VOTE_INGEST']!r}")
+    app.extensions['vote_writer'] = VoteWriter(
+        app,
+        batch_size=app.config['VOTE_BATCH_SIZE'],
+        interval=app.config['VOTE_BATCH_INTERVAL'],
+        queue_size=app.config['VOTE_QUEUE_SIZE'],
+    )
@@ -0,0 +1,59 @@
+"""Internal diagnostics endpoints, only registered when INTERNAL_ENDPOINTS is enabled.
+
+They expose per-process state, so behind gunicorn each request shows the
+worker that served it.
+"""
+import os
+
+from flask import Blueprint, Response, abort, current_app, jsonify
+
+from .extensions import db
+from .pool import pool_stats
+
+bp = Blueprint('internal', __name__, url_prefix='/_internal')
+
+
+@bp.route('/pool')
+def pool():
+    return jsonify(pid=os.getpid(), **pool_stats(db.engine))
+
+
+@bp.route('/replicas')
+def replicas():
+    replica_set = current_app.extensions['replicas']
+    return jsonify(pid=os.getpid(), replicas=replica_set.stats() if replica_set is not None else [])
+
+
+@bp.route('/cache')
+def cache():
+    return jsonify(
+        pid=os.getpid(),
+        user_cache=current_app.extensions['user_cache'].stats.as_dict(),
+        poll_cache=current_app.extensions['poll_cache'].stats.as_dict(),
+        fragment_cache=current_app.extensions['fragment_cache'].stats.as_dict(),
+    )
+
+
+@bp.route('/ingest')
+def ingest():
+    writer = current_app.extensions['vote_writer']
+    return jsonify(pid=os.getpid(), mode=current_app.config['VOTE_INGEST'], pending=writer.queue.qsize(), **writer.stats)
+
+
+@bp.route('/passwords')
+def passwords():
+    hasher = current_app.extensions['password_hasher']
+    return jsonify(pid=os.getpid(), method=hasher.method, workers=hasher.workers, **hasher.stats.as_dict())
+
+
+@bp.route('/metrics')
+def metrics():
+    registry = current_app.extensions.get('metrics')
+    if registry is None:
+        abort(404)
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+
+@bp.route('/events')
+def events():
+    return jsonify(pid=os.getpid(), subscribers=current_app.extensions['event_broker'].hub.subscriber_count())
@@ -0,0 +1,160 @@
+"""Per-request timing and SQL instrumentation.
+
+Engine events count the statements each request runs, their total time and the
+rows the driver reports (rows returned by a MySQL SELECT, rows changed by
+writes; SQLite only reports the latter). After each request the totals are
+
+* sent back in a ``Server-Timing`` header, so they show up in the browser's
+  network panel,
+* added to per-endpoint histograms served in the Prometheus text format at
+  ``/_internal/metrics``, one set per worker process,
+* checked against QUERY_BUDGET, logging a warning for a request that runs more
+  statements, which is how N+1 query regressions show up.
+"""
+import threading
+import time
+from bisect import bisect_left
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_time = 0.0
+        self.rows = 0
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, name, labels):
+        lines, cumulative = [], 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_sum{{{labels}}} {self.sum:.6f}')
+        lines.append(f'{name}_count{{{labels}}} {self.count}')
+        return lines
+
+
+class Registry:
+    """Histograms and counters of one worker process, keyed by endpoint."""
+
+    HISTOGRAMS = {
+        'request_duration_seconds': ('Wall time of a request', DURATION_BUCKETS),
+        'request_sql_duration_seconds': ('Time spent in SQL statements per request', DURATION_BUCKETS),
+        'request_sql_queries': ('SQL statements per request', QUERY_BUCKETS),
+    }
+    COUNTERS = {
+        'request_sql_rows_total': 'Rows reported by the driver',
+        'request_over_query_budget_total': 'Requests that ran more statements than QUERY_BUDGET',
+    }
+
+    def __init__(self, prefix='pollmaker_'):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self.histograms = {name: {} for name in self.HISTOGRAMS}
+        self.counters = {name: {} for name in self.COUNTERS}
+
+    def observe(self, name, endpoint, value):
+        with self._lock:
+            histogram = self.histograms[name].get(endpoint)
+            if histogram is None:
+                histogram = self.histograms[name][endpoint] = Histogram(self.HISTOGRAMS[name][1])
+            histogram.observe(value)
+
+    def increment(self, name, endpoint, amount=1):
+        with self._lock:
+            self.counters[name][endpoint] = self.counters[name].get(endpoint, 0) + amount
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for name, (help, _) in self.HISTOGRAMS.items():
+                lines += [f'# HELP {self.prefix}{name} {help}', f'# TYPE {self.prefix}{name} histogram']
+                for endpoint, histogram in sorted(self.histograms[name].items()):
+                    lines += histogram.render(self.prefix + name, f'endpoint="{endpoint}"')
+            for name, help in self.COUNTERS.items():
+                lines += [f'# HELP {self.prefix}{name} {help}', f'# TYPE {self.prefix}{name} counter']
+                for endpoint, value in sorted(self.counters[name].items()):
+                    lines.append(f'{self.prefix}{name}{{endpoint="{endpoint}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def current_metrics():
+    return g.get('_request_metrics') if has_request_context() else None
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_metrics() is not None:
+        context._metrics_started = time.perf_counter()
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    metrics = current_metrics()
+    started = getattr(context, '_metrics_started', None)
+    if metrics is None or started is None:
+        return
+    metrics.queries += 1
+    metrics.sql_time += time.perf_counter() - started
+    metrics.rows += max(cursor.rowcount, 0)
+
+
+_listening = False
+
+
+def listen():
+    # Listens on every engine once per process; statements outside a request are ignored
+    global _listening
+    if not _listening:
+        event.listen(Engine, 'before_cursor_execute', before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', after_cursor_execute)
+        _listening = True
+
+
+def init_app(app):
+    if not app.config['METRICS_ENABLED']:
+        return
+    listen()
+    registry = app.extensions['metrics'] = Registry()
+
+    @app.before_request
+    def start_request_metrics():
+        g._request_metrics = RequestMetrics()
+
+    @app.after_request
+    def record_request_metrics(response):
+        metrics = g.pop('_request_metrics', None)
+        if metrics is None:
+            return response
+        elapsed = time.perf_counter() - metrics.started
+        endpoint = request.endpoint or 'unmatched'
+        registry.observe('request_duration_seconds', endpoint, elapsed)
+        registry.observe('request_sql_duration_seconds', endpoint, metrics.sql_time)
+        registry.observe('request_sql_queries', endpoint, metrics.queries)
+        registry.increment('request_sql_rows_total', endpoint, metrics.rows)
+        budget = app.config['QUERY_BUDGET']
+        if budget and metrics.queries > budget:
+            registry.increment('request_over_query_budget_total', endpoint)
+            app.logger.warning('%s %s ran %d SQL statements, over the budget of %d',
+                               request.method, request.path, metrics.queries, budget)
+        if app.config['SERVER_TIMING']:
+            response.headers.add('Server-Timing', f'app;dur={elapsed * 1000:.1f}')
+            response.headers.add('Server-Timing', f'db;dur={metrics.sql_time * 1000:.1f};desc="{metrics.queries} queries"')
+        return response
@@ -0,0 +1,93 @@
+from datetime import datetime
+
+from flask_login import UserMixin
+
+from .extensions import db
+
+# Index plan (created by migrations/versions, checked by `flask explain-queries`):
+#   poll         ix_poll_user_created (user_id, created_at)  index and my_polls listings of a user's polls
+#   poll_option  ix_poll_option_poll (poll_id)               loading the options of a poll
+#   vote         uq_vote_poll_user (poll_id, user_id)        has-voted check, one vote per user, delete_poll
+#   vote         ix_vote_user_poll (user_id, poll_id)        my_polls join from a user's votes to their polls
+#   vote         ix_vote_option (option_id)                  per-option counts when reconciling tallies
+#   vote_rollup  primary key (poll_id, granularity, bucket, option_id)  time series of a poll
+# Every index also covers the foreign key on its leading column, so MySQL adds no implicit ones.
+class User(UserMixin, db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    username = db.Column(db.String(80), unique=True, nullable=False)
+    email = db.Column(db.String(120), unique=True, nullable=False)
+    password_hash = db.Column(db.String(512))  # Increased to 512 to ensure it's large enough
+    polls = db.relationship('Poll', backref='creator', lazy=True)
+    votes = db.relationship('Vote', backref='voter', lazy=True)
+
+class Poll(db.Model):
+    __table_args__ = (db.Index('ix_poll_user_created', 'user_id', 'created_at'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    title = db.Column(db.String(200), nullable=False)
+    description = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    is_private = db.Column(db.Boolean, default=False)
+    # Set by `flask archive-polls`: votes moved to ARCHIVE_DIR, tallies frozen, voting closed
+    archived_at = db.Column(db.DateTime)
+    options = db.relationship('PollOption', backref='poll', lazy=True, cascade='all, delete-orphan')
+    votes = db.relationship('Vote', backref='poll', lazy=True)
+
+class PollOption(db.Model):
+    __table_args__ = (db.Index('ix_poll_option_poll', 'poll_id'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    text = db.Column(db.String(200), nullable=False)
+    poll_id = db.Column(db.Integer, db.ForeignKey('poll.id'), nullable=False)
+    # Denormalized number of votes, maintained by the vote route (see reconcile-tallies)
+    vote_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    votes = db.relationship('Vote', backref='option', lazy=True)
+
+# Shorter name used by some callers
+Option = PollOption
+
+# Number of options, deferred so it only costs a correlated COUNT in the listings that
+# ask for it with undefer() instead of loading every option row
+Poll.option_count = db.column_property(
+    db.select(db.func.count(PollOption.id))
+    .where(PollOption.poll_id == Poll.id)
+    .correlate_except(PollOption)
+    .scalar_subquery(),
+    deferred=True,
+)
+
+class Vote(db.Model):
+    # One vote per user and poll, enforced by the database rather than by the vote route
+    __table_args__ = (
+        db.UniqueConstraint('poll_id', 'user_id', name='uq_vote_poll_user'),
+        db.Index('ix_vote_user_poll', 'user_id', 'poll_id'),
+        db.Index('ix_vote_option', 'option_id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    poll_id = db.Column(db.Integer, db.ForeignKey('poll.id'), nullable=False)
+    option_id = db.Column(db.Integer, db.ForeignKey('poll_option.id'), nullable=False)
+    # The app's UTC clock, like every other timestamp, so buffered and direct votes agree (see app.rollups)
+    voted_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class ArchivedVoter(db.Model):
+    """Who voted in an archived poll, kept when app.archive moves its votes out of the vote table."""
+    __table_args__ = (db.Index('ix_archived_voter_user', 'user_id', 'poll_id'),)
+
+    poll_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+
+class VoteRollup(db.Model):
+    """Votes per option and minute, hour or day bucket, built from the vote table by app.rollups."""
+    poll_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    granularity = db.Column(db.String(6), primary_key=True)
+    bucket = db.Column(db.DateTime, primary_key=True)
+    option_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    votes = db.Column(db.Integer, nullable=False, default=0)
+
+class RollupWatermark(db.Model):
+    """Id of the last vote folded into the rollups."""
+    name = db.Column(db.String(50), primary_key=True)
+    last_vote_id = db.Column(db.Integer, nullable=False, default=0)
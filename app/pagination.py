@@ -0,0 +1,64 @@
+"""Keyset pagination of poll listings over (created_at, id), newest first.
+
+A page is fetched with ``WHERE (created_at, id) < cursor ORDER BY created_at
+DESC, id DESC LIMIT n``, which the (user_id, created_at) index serves directly,
+so every page costs the same however many polls come before it.
+"""
+import base64
+from collections import namedtuple
+from datetime import datetime
+
+from flask import abort, current_app, request
+from sqlalchemy import and_, or_
+
+from .models import Poll
+
+Page = namedtuple('Page', ['items', 'next_cursor'])
+
+
+def encode_cursor(poll):
+    raw = f'{poll.created_at.isoformat()}|{poll.id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(value):
+    """Return the ``(created_at, id)`` pair of a cursor, or None for the first page.
+
+    Raises ValueError for a malformed cursor.
+    """
+    if not value:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(value + '=' * (-len(value) % 4)).decode()
+        created_at, poll_id = raw.split('|')
+        return datetime.fromisoformat(created_at), int(poll_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f'Invalid page cursor {value!r}') from e
+
+
+def keyset_query(query, cursor, limit):
+    """Restrict a Poll query to the ``limit`` polls that come after ``cursor``."""
+    if cursor is not None:
+        created_at, poll_id = cursor
+        query = query.filter(or_(Poll.created_at < created_at, and_(Poll.created_at == created_at, Poll.id < poll_id)))
+    return query.order_by(Poll.created_at.desc(), Poll.id.desc()).limit(limit)
+
+
+def paginate_polls(query, cursor=None, per_page=20):
+    # One extra row tells whether there is a next page without a COUNT
+    items = keyset_query(query, cursor, per_page + 1).all()
+    next_cursor = encode_cursor(items[per_page - 1]) if len(items) > per_page else None
+    return Page(items[:per_page], next_cursor)
+
+
+def cursor_arg(name):
+    """Read a cursor from the query string, answering 400 when it is malformed."""
+    try:
+        return decode_cursor(request.args.get(name))
+    except ValueError:
+        abort(400)
+
+
+def per_page_arg():
+    per_page = request.args.get('per_page', current_app.config['POLLS_PER_PAGE'], type=int)
+    return max(1, min(per_page, current_app.config['MAX_POLLS_PER_PAGE']))
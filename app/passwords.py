@@ -0,0 +1,125 @@
+"""Password hashing off the request thread.
+
+Hashing is deliberately slow, so a burst of logins can take every CPU of a
+worker. The PasswordHasher runs it on a small pool of threads (hashlib releases
+the GIL while hashing) or processes, PASSWORD_HASH_WORKERS wide. At most
+PASSWORD_HASH_MAX_PENDING hashes may be running or queued per worker process;
+beyond that HasherBusy is raised and the route answers 503 instead of queueing
+more work. Queue and hashing times are served at /_internal/passwords.
+
+The work factor is PASSWORD_HASH_METHOD, a werkzeug method such as
+``pbkdf2:sha256:600000`` or ``scrypt:32768:8:1``. Hashes made with another
+method are replaced on the user's next successful login. A short method like
+``scrypt`` is compared by the full prefix werkzeug writes for it, so it doesn't
+count as another method than the hashes it produces.
+"""
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+
+from flask import current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class HasherBusy(RuntimeError):
+    pass
+
+
+class HashStats:
+    """Queue and run time counters of one hasher, safe to update from several threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.completed = 0
+        self.rejected = 0
+        self.queue_total = 0.0
+        self.queue_max = 0.0
+        self.run_total = 0.0
+
+    def record(self, queued, ran):
+        with self._lock:
+            self.completed += 1
+            self.queue_total += queued
+            self.queue_max = max(self.queue_max, queued)
+            self.run_total += ran
+
+    def reject(self):
+        with self._lock:
+            self.rejected += 1
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'queue_max_ms': round(self.queue_max * 1000, 3),
+                'queue_avg_ms': round(self.queue_total * 1000 / self.completed, 3) if self.completed else 0.0,
+                'run_avg_ms': round(self.run_total * 1000 / self.completed, 3) if self.completed else 0.0,
+            }
+
+
+@lru_cache(maxsize=None)
+def method_prefix(method):
+    """The method part werkzeug writes at the start of a hash, e.g. ``scrypt:32768:8:1`` for ``scrypt``."""
+    return generate_password_hash('', method).split('$', 1)[0]
+
+
+def timed(function, *args):
+    # Module level so that a process pool can pickle it; wall clock times are
+    # comparable across processes
+    started = time.time()
+    result = function(*args)
+    return result, started, time.time()
+
+
+class PasswordHasher:
+    def __init__(self, method, workers=2, max_pending=32, executor='thread'):
+        self.method = method
+        self.workers = workers
+        self.executor_class = ProcessPoolExecutor if executor == 'process' else ThreadPoolExecutor
+        self.stats = HashStats()
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def executor(self):
+        # Created lazily, in the worker, so its hashing threads are never forked
+        with self._lock:
+            if self._executor is None:
+                self._executor = self.executor_class(max_workers=self.workers)
+            return self._executor
+
+    def run(self, function, *args):
+        if not self._slots.acquire(blocking=False):
+            self.stats.reject()
+            raise HasherBusy('Too many password hashes in progress')
+        try:
+            submitted = time.time()
+            result, started, finished = self.executor().submit(timed, function, *args).result()
+            self.stats.record(max(started - submitted, 0.0), finished - started)
+            return result
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        return self.run(generate_password_hash, password, self.method)
+
+    def verify(self, pwhash, password):
+        return self.run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        return pwhash.split('$', 1)[0] != method_prefix(self.method)
+
+
+def hasher():
+    return current_app.extensions['password_hasher']
+
+
+def init_app(app):
+    app.extensions['password_hasher'] = PasswordHasher(
+        app.config['PASSWORD_HASH_METHOD'],
+        workers=app.config['PASSWORD_HASH_WORKERS'],
+        max_pending=app.config['PASSWORD_HASH_MAX_PENDING'],
+        executor=app.config['PASSWORD_HASH_EXECUTOR'],
+    )
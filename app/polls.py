@@ -0,0 +1,155 @@
+"""Creating polls: one from the form, or thousands from a JSON Lines or CSV file.
+
+Bulk imports read their input a line at a time and write it in batches of
+``batch_size`` polls, each batch in one transaction with a single multi-row
+INSERT of its options, so memory use does not grow with the size of the file.
+Invalid rows are skipped and reported with their line number; each batch is
+committed on its own, so an interrupted import keeps the batches before it.
+
+JSON Lines rows are objects such as::
+
+    {"title": "Lunch?", "description": "Friday", "options": ["Pizza", "Sushi"], "is_private": false}
+
+CSV files have a header with ``title``, ``options`` (separated by ``|``) and
+optionally ``description`` and ``is_private``.
+"""
+import csv
+import json
+from collections import namedtuple
+
+from sqlalchemy import insert
+
+from .extensions import db
+from .models import Poll, PollOption
+
+MAX_IMPORT_ERRORS = 100
+# A MySQL TEXT column holds 65535 bytes
+MAX_DESCRIPTION_BYTES = 65535
+
+# ``errors`` lists the first MAX_IMPORT_ERRORS of the ``skipped`` rows
+ImportResult = namedtuple('ImportResult', ['imported', 'skipped', 'errors'])
+
+
+class PollImportError(ValueError):
+    """A row or file that can't be imported; ``result`` holds what was committed before a failed file."""
+
+    def __init__(self, message, result=None):
+        super().__init__(message)
+        self.result = result
+
+
+def add_poll(user_id, title, description, options, is_private=False):
+    """Add a poll and its options to the current transaction; the caller commits."""
+    poll = Poll(title=title, description=description, user_id=user_id, is_private=is_private)
+    db.session.add(poll)
+    db.session.flush()
+    db.session.execute(insert(PollOption), [{'poll_id': poll.id, 'text': text} for text in options])
+    return poll
+
+
+def parse_bool(value):
+    if isinstance(value, bool):
+        return value
+    return str(value or '').strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def poll_fields(row):
+    """Validate one imported row and return the keyword arguments of add_poll()."""
+    if not isinstance(row, dict):
+        raise PollImportError('expected an object')
+    title = str(row.get('title') or '').strip()
+    if not title:
+        raise PollImportError('missing title')
+    if len(title) > 200:
+        raise PollImportError('title is longer than 200 characters')
+    options = row.get('options') or []
+    if isinstance(options, str):
+        options = options.split('|')
+    options = [str(option).strip() for option in options if str(option).strip()]
+    if len(options) < 2:
+        raise PollImportError('a poll must have at least 2 options')
+    if any(len(option) > 200 for option in options):
+        raise PollImportError('option is longer than 200 characters')
+    description = row.get('description') or None
+    if description is not None and not isinstance(description, str):
+        raise PollImportError('description must be a string')
+    if description is not None and len(description.encode('utf-8')) > MAX_DESCRIPTION_BYTES:
+        raise PollImportError(f'description is longer than {MAX_DESCRIPTION_BYTES} bytes')
+    return {
+        'title': title,
+        'description': description,
+        'options': options,
+        'is_private': parse_bool(row.get('is_private')),
+    }
+
+
+def read_jsonl(lines):
+    """Yield ``(line_number, row)``; a row that is not valid JSON is yielded as the error."""
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line)
+        except ValueError as e:
+            yield number, PollImportError(f'invalid JSON: {e}')
+
+
+def read_csv(lines):
+    reader = csv.DictReader(lines)
+    if reader.fieldnames is None or not {'title', 'options'} <= set(reader.fieldnames):
+        raise PollImportError('CSV header must contain title and options')
+    for row in reader:
+        yield reader.line_num, row
+
+
+READERS = {'jsonl': read_jsonl, 'csv': read_csv}
+
+
+def decoded(rows):
+    """Yield from ``rows``, turning a decoding error of the input into a PollImportError."""
+    try:
+        yield from rows
+    except UnicodeDecodeError:
+        raise PollImportError('input is not valid UTF-8') from None
+
+
+def import_polls(lines, user_id, format='jsonl', batch_size=500):
+    """Create the polls read from ``lines`` for ``user_id`` and return an ImportResult."""
+    imported, skipped, errors, batch = 0, 0, [], []
+    try:
+        for number, row in decoded(READERS[format](lines)):
+            try:
+                if isinstance(row, Exception):
+                    raise row
+                batch.append(poll_fields(row))
+            except PollImportError as e:
+                skipped += 1
+                if len(errors) < MAX_IMPORT_ERRORS:
+                    errors.append({'line': number, 'error': str(e)})
+                continue
+            if len(batch) == batch_size:
+                imported += write_batch(batch, user_id)
+                batch = []
+    except PollImportError as e:
+        # The input can't be read any further: the batches already written stay, the rows read since are dropped
+        e.result = ImportResult(imported, skipped, errors)
+        raise
+    if batch:
+        imported += write_batch(batch, user_id)
+    return ImportResult(imported, skipped, errors)
+
+
+def write_batch(batch, user_id):
+    polls = [Poll(user_id=user_id, **{key: value for key, value in fields.items() if key != 'options'}) for fields in batch]
+    db.session.add_all(polls)
+    db.session.flush()
+    db.session.execute(insert(PollOption), [
+        {'poll_id': poll.id, 'text': text}
+        for poll, fields in zip(polls, batch)
+        for text in fields['options']
+    ])
+    db.session.commit()
+    # Don't let the identity map grow with the file
+    for poll in polls:
+        db.session.expunge(poll)
+    return len(polls)
@@ -0,0 +1,64 @@
+"""Queries shared by the routes and `flask explain-queries`."""
+from datetime import datetime
+
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import joinedload, undefer
+
+from .extensions import db
+from .models import ArchivedVoter, Poll, PollOption, Vote, VoteRollup
+from .pagination import keyset_query
+
+
+def user_polls_query(user_id):
+    return Poll.query.filter_by(user_id=user_id).options(undefer(Poll.option_count))
+
+def voted_polls_query(user_id):
+    # A semi-join returns each poll once however many vote rows match; the votes of
+    # archived polls have left the vote table, their voters are in archived_voter
+    voted = select(Vote.poll_id).where(Vote.user_id == user_id).union_all(
+        select(ArchivedVoter.poll_id).where(ArchivedVoter.user_id == user_id)
+    )
+    return Poll.query.filter(Poll.id.in_(voted)).options(joinedload(Poll.creator))
+
+def poll_options_query(poll_id):
+    return PollOption.query.filter_by(poll_id=poll_id)
+
+def has_voted_query(poll_id, user_id):
+    live = db.session.query(Vote.poll_id).filter_by(poll_id=poll_id, user_id=user_id)
+    archived = db.session.query(ArchivedVoter.poll_id).filter_by(poll_id=poll_id, user_id=user_id)
+    return live.union_all(archived)
+
+def explain_route_queries():
+    """Run EXPLAIN on the queries the routes issue.
+
+    Returns a list of ``(route, sql, plan_rows, full_scan)`` tuples. Only MySQL
+    and SQLite plans are understood.
+    """
+    cursor = (datetime(2000, 1, 1), 1)
+    route_queries = [
+        ('index', keyset_query(user_polls_query(1), None, 21)),
+        ('index', keyset_query(user_polls_query(1), cursor, 21)),
+        ('view_poll', Poll.query.filter_by(id=1)),
+        ('view_poll', poll_options_query(1)),
+        ('view_poll', has_voted_query(1, 1)),
+        ('my_polls', keyset_query(user_polls_query(1), cursor, 21)),
+        ('my_polls', keyset_query(voted_polls_query(1), cursor, 21)),
+        ('timeseries', VoteRollup.query.filter(
+            VoteRollup.poll_id == 1, VoteRollup.granularity == 'hour', VoteRollup.bucket >= cursor[0]
+        ).order_by(VoteRollup.bucket)),
+        ('compact-rollups', Vote.query.filter(Vote.id > 1).order_by(Vote.id).limit(10000)),
+        ('reconcile-tallies', Vote.query.with_entities(func.count(Vote.id)).filter(Vote.option_id == 1)),
+    ]
+    dialect = db.engine.dialect
+    results = []
+    for route, query in route_queries:
+        sql = str(query.statement.compile(dialect=dialect, compile_kwargs={'literal_binds': True}))
+        if dialect.name == 'sqlite':
+            plan = [dict(row) for row in db.session.execute(text(f'EXPLAIN QUERY PLAN {sql}')).mappings()]
+            # "SCAN poll" reads the whole table, "SCAN poll USING INDEX ..." only walks an index
+            full_scan = any(row['detail'].startswith('SCAN') and 'USING' not in row['detail'] for row in plan)
+        else:
+            plan = [dict(row) for row in db.session.execute(text(f'EXPLAIN {sql}')).mappings()]
+            full_scan = any(row.get('type') == 'ALL' for row in plan)
+        results.append((route, sql, plan, full_scan))
+    return results
@@ -0,0 +1,147 @@
+"""Routing of read-only queries to database replicas.
+
+Set REPLICA_DATABASE_URIS to one or more replicas of the primary in
+SQLALCHEMY_DATABASE_URI. Views decorated with :func:`replica_reads` (the poll
+page, listings, results and exports) then run their SELECTs on a replica,
+picked round robin once per request so the whole page reads one snapshot.
+Everything else, and any statement of a session with pending changes, goes to
+the primary.
+
+A replica whose ``SELECT 1`` health check fails is skipped until a check
+REPLICA_HEALTH_INTERVAL seconds later succeeds; with none healthy, reads fall
+back to the primary.
+
+Replicas lag behind, so a user who just wrote something (voted, created or
+deleted a poll, registered, logged in) is pinned to the primary for
+REPLICA_PIN_SECONDS through a timestamp in their session cookie, which every
+worker sees. Others may still read the previous state for as long as the lag.
+Shared caches are only filled from the primary (see :func:`reading_from_replica`),
+so a lagging replica's rows never reach a pinned user through them.
+
+The async views of app.aio always read from the primary.
+"""
+import itertools
+import logging
+import os
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, g, has_request_context, session
+from flask_sqlalchemy import SignallingSession
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError
+
+from .pool import engine_options
+
+log = logging.getLogger(__name__)
+
+
+class ReplicaSet:
+    """Engines of the replicas of one app, with round robin and cached health checks."""
+
+    def __init__(self, uris, config, health_interval=5):
+        self.uris = list(uris)
+        self.config = config
+        self.health_interval = health_interval
+        self._lock = threading.Lock()
+        self._pid = None
+        self._engines = []
+
+    @property
+    def engines(self):
+        # Built on first use in each process; engines must not be shared across a fork
+        with self._lock:
+            if self._pid != os.getpid():
+                self._engines = [self._engine(uri) for uri in self.uris]
+                self._health = [(True, float('-inf'))] * len(self._engines)
+                self._reads = [0] * len(self._engines)
+                self._next = itertools.count()
+                self._pid = os.getpid()
+            return self._engines
+
+    def _engine(self, uri):
+        url = make_url(uri)
+        return create_engine(url, **engine_options(self.config, url))
+
+    def healthy(self, index):
+        engines = self.engines
+        ok, checked_at = self._health[index]
+        if time.monotonic() - checked_at < self.health_interval:
+            return ok
+        try:
+            with engines[index].connect() as connection:
+                connection.execute(text('SELECT 1'))
+            now_ok = True
+        except DBAPIError:
+            now_ok = False
+        if now_ok != ok:
+            log.warning('Replica %s is %s', engines[index].url.render_as_string(hide_password=True),
+                        'back' if now_ok else 'down, reading from the primary')
+        self._health[index] = (now_ok, time.monotonic())
+        return now_ok
+
+    def choose(self):
+        """Return the next healthy replica engine, or None to read from the primary."""
+        engines = self.engines
+        start = next(self._next)
+        for offset in range(len(engines)):
+            index = (start + offset) % len(engines)
+            if self.healthy(index):
+                self._reads[index] += 1
+                return engines[index]
+        return None
+
+    def stats(self):
+        engines = self.engines
+        return [
+            {'url': engine.url.render_as_string(hide_password=True), 'healthy': ok, 'requests': reads}
+            for engine, (ok, _), reads in zip(engines, self._health, self._reads)
+        ]
+
+
+def replica_set():
+    return current_app.extensions.get('replicas')
+
+
+def pin_to_primary():
+    """Read from the primary for the next REPLICA_PIN_SECONDS, after the current user wrote something."""
+    if replica_set() is not None:
+        session['_primary_until'] = time.time() + current_app.config['REPLICA_PIN_SECONDS']
+
+
+def pinned_to_primary():
+    return session.get('_primary_until', 0) > time.time()
+
+
+def reading_from_replica():
+    """True while the current request's SELECTs go to a replica, whose rows may be behind the primary."""
+    return has_request_context() and g.get('_replica_engine') is not None
+
+
+def replica_reads(view):
+    """Run the SELECTs of a view on a replica, unless the user is pinned to the primary."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        replicas = replica_set()
+        if replicas is not None:
+            g._replica_engine = None if pinned_to_primary() else replicas.choose()
+        return view(*args, **kwargs)
+    return wrapper
+
+
+class RoutingSession(SignallingSession):
+    """Session that sends the SELECTs of a replica_reads view to the replica it picked."""
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if has_request_context() and getattr(clause, 'is_select', False) and not self._flushing:
+            engine = g.get('_replica_engine')
+            if engine is not None and not (self.new or self.dirty or self.deleted):
+                return engine
+        return super().get_bind(mapper, clause)
+
+
+def init_app(app):
+    uris = app.config['REPLICA_DATABASE_URIS']
+    app.extensions['replicas'] = ReplicaSet(uris, app.config, app.config['REPLICA_HEALTH_INTERVAL']) if uris else None
@@ -0,0 +1,95 @@
+"""Read-through cache of what view_poll needs: a poll, its options and their tallies.
+
+Entries are plain JSON-compatible dicts keyed by poll id, so any backend from
+app.cache works, including a shared Redis store. The vote, create_poll and
+delete_poll routes invalidate the entry of the poll they change. Each worker
+keeps its own local copy, so other workers can serve counts up to
+POLL_CACHE_TTL seconds old unless a shared store is configured.
+
+The same entries back the JSON results endpoint, whose strong ETag is a hash
+of the tallies, so a watcher whose chart is current gets a 304 without a query.
+"""
+import hashlib
+from collections import namedtuple
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy.orm import selectinload
+
+from .cache import LRUCache, SharedStore, TieredCache, shared_client
+from .models import Poll
+from .replicas import reading_from_replica
+
+# archived_at defaults to None for entries cached before it was added
+PollView = namedtuple('PollView',
+                      ['id', 'title', 'description', 'user_id', 'is_private', 'created_at', 'options', 'archived_at'],
+                      defaults=(None,))
+OptionView = namedtuple('OptionView', ['id', 'text', 'vote_count'])
+
+
+def poll_cache():
+    return current_app.extensions['poll_cache']
+
+
+def serialize_poll(poll):
+    return {
+        'id': poll.id,
+        'title': poll.title,
+        'description': poll.description,
+        'user_id': poll.user_id,
+        'is_private': bool(poll.is_private),
+        'created_at': poll.created_at.isoformat() if poll.created_at else None,
+        'archived_at': poll.archived_at.isoformat() if poll.archived_at else None,
+        'options': [
+            {'id': option.id, 'text': option.text, 'vote_count': option.vote_count}
+            for option in poll.options
+        ],
+    }
+
+
+def poll_view(data):
+    created_at = datetime.fromisoformat(data['created_at']) if data['created_at'] else None
+    archived_at = datetime.fromisoformat(data['archived_at']) if data.get('archived_at') else None
+    options = [OptionView(**option) for option in data['options']]
+    return PollView(**{**data, 'created_at': created_at, 'options': options, 'archived_at': archived_at})
+
+
+def get_poll_results(poll_id):
+    """Return a read-only ``PollView`` of the poll with its tallies, or None if it does not exist."""
+    cache = poll_cache()
+    data = cache.get(poll_id)
+    if data is None:
+        poll = Poll.query.options(selectinload(Poll.options)).get(poll_id)
+        if poll is None:
+            return None
+        data = serialize_poll(poll)
+        # A replica may not have the latest votes yet; caching them would hide those from pinned voters
+        if not reading_from_replica():
+            cache.set(poll_id, data)
+    return poll_view(data)
+
+
+def results_payload(poll):
+    """JSON body of the results endpoint for a ``PollView``."""
+    return {
+        'poll_id': poll.id,
+        'total_votes': sum(option.vote_count for option in poll.options),
+        'options': [{'id': option.id, 'text': option.text, 'votes': option.vote_count} for option in poll.options],
+    }
+
+
+def results_etag(poll):
+    """Strong entity tag that changes whenever any tally or option of the poll does."""
+    version = ';'.join(f'{option.id}:{option.vote_count}:{option.text}' for option in poll.options)
+    return hashlib.sha1(f'{poll.id}|{version}'.encode()).hexdigest()
+
+
+def invalidate_poll(poll_id):
+    poll_cache().delete(poll_id)
+
+
+def init_app(app):
+    local = LRUCache(maxsize=app.config['POLL_CACHE_SIZE'], ttl=app.config['POLL_CACHE_TTL'])
+    client = shared_client(app.config['CACHE_REDIS_URL'])
+    shared = SharedStore(client, prefix='poll:', ttl=app.config['POLL_CACHE_TTL']) if client else None
+    app.extensions['poll_cache'] = TieredCache(local, shared)
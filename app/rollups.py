@@ -0,0 +1,173 @@
+"""Per-minute, per-hour and per-day vote counts of every poll option.
+
+The ``vote_rollup`` table is derived from ``vote`` by a compaction job
+(``flask compact-rollups``, run from cron or with ``--every``). Each run folds
+the votes after the watermark, the id of the last vote it has seen, into the
+buckets with one upsert per batch, then moves the watermark forward in the same
+transaction. Votes younger than ROLLUP_LAG seconds are left for the next run, so
+a vote whose transaction commits after one with a higher id is not skipped.
+
+Votes are stamped, compacted and bucketed by the app's UTC clock
+(``datetime.utcnow``), never the database's, which is local time on a MySQL
+server not set to UTC.
+
+The time series endpoint and the chart's line mode only read rollups, so
+their cost depends on the number of buckets shown, not on the number of votes.
+"""
+from collections import Counter, namedtuple
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select, update
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+
+from .extensions import db
+from .models import RollupWatermark, Vote, VoteRollup
+
+WATERMARK = 'vote_rollup'
+
+# ``span`` is how far back a time series goes when no start is given
+Granularity = namedtuple('Granularity', ['truncate', 'width', 'span'])
+
+
+def to_minute(t):
+    return t.replace(second=0, microsecond=0)
+
+
+def to_hour(t):
+    return t.replace(minute=0, second=0, microsecond=0)
+
+
+def to_day(t):
+    return t.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+GRANULARITIES = {
+    'minute': Granularity(to_minute, timedelta(minutes=1), timedelta(hours=2)),
+    'hour': Granularity(to_hour, timedelta(hours=1), timedelta(days=3)),
+    'day': Granularity(to_day, timedelta(days=1), timedelta(days=90)),
+}
+
+# Widest span a single time series request may cover, in buckets
+MAX_BUCKETS = 2000
+
+
+def upsert_statement(dialect_name):
+    """INSERT of rollup rows that adds to the counts of buckets that already exist."""
+    table = VoteRollup.__table__
+    if dialect_name == 'mysql':
+        statement = mysql.insert(table)
+        return statement.on_duplicate_key_update(votes=table.c.votes + statement.inserted.votes)
+    if dialect_name in ('sqlite', 'postgresql'):
+        statement = (sqlite if dialect_name == 'sqlite' else postgresql).insert(table)
+        return statement.on_conflict_do_update(
+            index_elements=[column.name for column in table.primary_key],
+            set_={'votes': table.c.votes + statement.excluded.votes},
+        )
+    raise NotImplementedError(f'No rollup upsert for {dialect_name}')
+
+
+def bucket_counts(votes):
+    """Count ``(poll_id, option_id, voted_at)`` rows per poll, granularity, bucket and option."""
+    counts = Counter()
+    for poll_id, option_id, voted_at in votes:
+        for name, granularity in GRANULARITIES.items():
+            counts[poll_id, name, granularity.truncate(voted_at), option_id] += 1
+    return counts
+
+
+def compact(batch_size=10000, lag=10):
+    """Fold every vote older than ``lag`` seconds into the rollups; return how many were folded."""
+    folded = 0
+    while True:
+        count = compact_batch(batch_size, lag)
+        if count is None:
+            return folded
+        folded += count
+
+
+def compact_batch(batch_size, lag):
+    """Fold up to ``batch_size`` votes in one transaction; None when there is nothing to do."""
+    session = db.session
+    watermark = session.get(RollupWatermark, WATERMARK)
+    if watermark is None:
+        watermark = RollupWatermark(name=WATERMARK, last_vote_id=0)
+        session.add(watermark)
+        session.flush()
+    start = watermark.last_vote_id
+
+    cutoff = datetime.utcnow() - timedelta(seconds=lag)
+
+    rows = session.execute(
+        select(Vote.id, Vote.poll_id, Vote.option_id, Vote.voted_at)
+        .where(Vote.id > start)
+        .order_by(Vote.id)
+        .limit(batch_size)
+    ).all()
+    # Stop at the first vote that is too recent: everything after it waits for the next run
+    ready = []
+    for row in rows:
+        if row.voted_at is not None and row.voted_at > cutoff:
+            break
+        ready.append(row)
+    if not ready:
+        session.rollback()
+        return None
+
+    # Claim the batch first: a concurrent run that read the same watermark updates no row and backs off
+    claimed = session.execute(
+        update(RollupWatermark)
+        .where(RollupWatermark.name == WATERMARK, RollupWatermark.last_vote_id == start)
+        .values(last_vote_id=ready[-1].id)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not claimed:
+        session.rollback()
+        return None
+
+    counts = bucket_counts((row.poll_id, row.option_id, row.voted_at) for row in ready if row.voted_at is not None)
+    if counts:
+        session.execute(upsert_statement(db.engine.dialect.name), [
+            {'poll_id': poll_id, 'granularity': granularity, 'bucket': bucket, 'option_id': option_id, 'votes': votes}
+            for (poll_id, granularity, bucket, option_id), votes in counts.items()
+        ])
+    session.commit()
+    return len(ready)
+
+
+def timeseries(poll, granularity, since=None):
+    """Vote counts of each option of ``poll`` (a PollView) per bucket, zeros included.
+
+    Returns ``(buckets, series)`` where ``series`` maps option ids to a list of
+    counts aligned with ``buckets``. A ``since`` with a UTC offset is converted
+    to the naive UTC the buckets are kept in.
+    """
+    truncate, width, span = GRANULARITIES[granularity]
+    if since is not None and since.tzinfo is not None:
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)
+    end = truncate(datetime.utcnow())
+    start = truncate(since) if since is not None else end - span
+    start = max(start, end - width * (MAX_BUCKETS - 1))
+
+    rows = db.session.execute(
+        select(VoteRollup.bucket, VoteRollup.option_id, VoteRollup.votes)
+        .where(VoteRollup.poll_id == poll.id, VoteRollup.granularity == granularity, VoteRollup.bucket >= start)
+        .order_by(VoteRollup.bucket)
+    ).all()
+    if rows:
+        end = max(end, rows[-1].bucket)
+
+    buckets = []
+    bucket = start
+    while bucket <= end:
+        buckets.append(bucket)
+        bucket += width
+    index = {bucket: i for i, bucket in enumerate(buckets)}
+    series = {option.id: [0] * len(buckets) for option in poll.options}
+    for row in rows:
+        if row.option_id in series and row.bucket in index:
+            series[row.option_id][index[row.bucket]] += row.votes
+    return buckets, series
+
+
+def delete_poll_rollups(poll_id):
+    VoteRollup.query.filter_by(poll_id=poll_id).delete(synchronize_session=False)
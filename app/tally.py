@@ -0,0 +1,48 @@
+"""Vote tallies, read from the denormalized per-option counters."""
+from sqlalchemy import func, select
+
+from .extensions import db
+from .models import Poll, PollOption, Vote
+
+
+def get_vote_counts(poll):
+    """Return the vote count of every option of a poll.
+
+    Counts are read from the denormalized ``PollOption.vote_count`` column,
+    so the cost only depends on the number of options, not on the number of votes.
+    """
+    return {option.id: option.vote_count for option in poll.options}
+
+def count_votes(poll_id):
+    """Count the votes of a poll from the vote table with a single grouped query."""
+    rows = db.session.query(Vote.option_id, func.count(Vote.id)).filter(Vote.poll_id == poll_id).group_by(Vote.option_id).all()
+    return dict(rows)
+
+def increment_vote_count(option_id, poll_id):
+    """Add one vote to an option's counter in the current transaction.
+
+    Returns the number of updated rows, which is 0 when the option does not
+    belong to the poll or the poll is archived.
+    """
+    open_polls = select(Poll.id).where(Poll.archived_at.is_(None))
+    return PollOption.query.filter_by(id=option_id, poll_id=poll_id).filter(PollOption.poll_id.in_(open_polls)).update(
+        {PollOption.vote_count: PollOption.vote_count + 1}, synchronize_session=False
+    )
+
+def reconcile_vote_counts(poll_id=None):
+    """Rebuild option counters from the vote table and return how many were wrong.
+
+    Archived polls are skipped: their votes have left the table and their counters are frozen.
+    """
+    actual = select(func.count(Vote.id)).where(Vote.option_id == PollOption.id).scalar_subquery()
+    open_polls = select(Poll.id).where(Poll.archived_at.is_(None))
+    query = PollOption.query.filter(PollOption.vote_count != actual, PollOption.poll_id.in_(open_polls))
+    if poll_id is not None:
+        query = query.filter(PollOption.poll_id == poll_id)
+    fixed = query.update({PollOption.vote_count: actual}, synchronize_session=False)
+    db.session.commit()
+    return fixed
+
+def get_chart_data(poll, vote_counts):
+    """Build the results chart payload from already computed vote counts."""
+    return [{'text': option.text, 'votes': vote_counts[option.id]} for option in poll.options]
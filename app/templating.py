@@ -0,0 +1,75 @@
+"""Template compilation and fragment caching.
+
+Compiled templates are kept in a Jinja filesystem bytecode cache, so a freshly
+forked worker loads them instead of parsing every template from source.
+TEMPLATE_BYTECODE_CACHE_DIR defaults to a per-user directory under the system
+temp dir; entries are keyed by the template source's checksum, so a deploy
+never serves stale bytecode.
+
+Sections that don't depend on the request are wrapped in a ``cache`` tag and
+rendered once per key:
+
+    {% cache 'poll_form', poll.id %}...{% endcache %}
+
+The rendered markup is kept in a tiered cache like the poll results (see
+app.cache), for FRAGMENT_CACHE_TTL seconds or until :func:`invalidate_fragment`
+is called with the same key. A fragment must only read what its key names:
+anything that depends on the current user, flashed messages or the tallies
+stays outside the tag.
+"""
+from flask import current_app
+from jinja2 import FileSystemBytecodeCache, nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+from .cache import LRUCache, SharedStore, TieredCache, shared_client
+
+
+def fragment_cache():
+    return current_app.extensions['fragment_cache']
+
+
+def fragment_key(parts):
+    return ':'.join(str(part) for part in parts)
+
+
+def invalidate_fragment(*parts):
+    """Drop the fragment cached under the key ``parts``, e.g. ``invalidate_fragment('poll_form', poll_id)``."""
+    fragment_cache().delete(fragment_key(parts))
+
+
+class FragmentCacheExtension(Extension):
+    """The ``{% cache key, ... %}...{% endcache %}`` tag."""
+
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        parts = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            parts.append(parser.parse_expression())
+        body = parser.parse_statements(['name:endcache'], drop_needle=True)
+        call = self.call_method('_render', [nodes.List(parts)])
+        return nodes.CallBlock(call, [], [], body).set_lineno(lineno)
+
+    def _render(self, parts, caller):
+        if not current_app.config['FRAGMENT_CACHE']:
+            return caller()
+        cache = fragment_cache()
+        key = fragment_key(parts)
+        html = cache.get(key)
+        if html is None:
+            html = str(caller())
+            cache.set(key, html)
+        return Markup(html)
+
+
+def init_app(app):
+    if app.config['TEMPLATE_BYTECODE_CACHE']:
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(app.config['TEMPLATE_BYTECODE_CACHE_DIR'])
+    app.jinja_env.add_extension(FragmentCacheExtension)
+
+    local = LRUCache(maxsize=app.config['FRAGMENT_CACHE_SIZE'], ttl=app.config['FRAGMENT_CACHE_TTL'])
+    client = shared_client(app.config['CACHE_REDIS_URL'])
+    shared = SharedStore(client, prefix='fragment:', ttl=app.config['FRAGMENT_CACHE_TTL']) if client else None
+    app.extensions['fragment_cache'] = TieredCache(local, shared)
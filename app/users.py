@@ -0,0 +1,65 @@
+"""Session user loading with a cache in front of the user table.
+
+Flask-Login calls the user loader on every authenticated request. The cache
+keeps the user's columns (never the password hash) for USER_CACHE_TTL
+seconds, and the loader turns them back into a ``User`` attached to the
+current session without a SELECT. Any update or delete of a user, committed
+through the ORM, drops its entry.
+"""
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from .cache import LRUCache, SharedStore, TieredCache, shared_client
+from .extensions import db, login_manager
+from .models import User
+
+CACHED_FIELDS = ('id', 'username', 'email')
+
+
+def user_cache():
+    return current_app.extensions['user_cache']
+
+
+@login_manager.user_loader
+def load_user(user_id):
+    user_id = int(user_id)
+    cache = user_cache()
+    data = cache.get(user_id)
+    if data is None:
+        user = User.query.get(user_id)
+        if user is not None:
+            cache.set(user_id, {field: getattr(user, field) for field in CACHED_FIELDS})
+        return user
+    # Rebuild a persistent instance from the cached columns; the password hash
+    # is left unloaded and fetched only if something reads it
+    user = User(**data)
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _mark_user_changed(mapper, connection, user):
+    Session.object_session(user).info.setdefault('changed_users', set()).add(user.id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_changed_users(session):
+    changed = session.info.pop('changed_users', None)
+    if changed:
+        cache = user_cache()
+        for user_id in changed:
+            cache.delete(user_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_changed_users(session):
+    session.info.pop('changed_users', None)
+
+
+def init_app(app):
+    local = LRUCache(maxsize=app.config['USER_CACHE_SIZE'], ttl=app.config['USER_CACHE_TTL'])
+    client = shared_client(app.config['CACHE_REDIS_URL'])
+    shared = SharedStore(client, prefix='user:', ttl=app.config['USER_CACHE_TTL']) if client else None
+    app.extensions['user_cache'] = TieredCache(local, shared)
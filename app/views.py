@@ -0,0 +1,390 @@
+import io
+from datetime import datetime
+
+from flask import (
+    Blueprint, render_template, request, redirect, url_for, flash, abort, jsonify, current_app, Response,
+    stream_with_context, make_response,
+)
+from flask_login import login_user, login_required, logout_user, current_user
+from sqlalchemy.exc import IntegrityError
+
+from .archive import delete_archived_voters, delete_poll_archive
+from .events import broker, poll_channel, publish_vote, format_event
+from .export import FORMATS, export_rows, encode_rows
+from .extensions import db
+from .ingest import vote_writer
+from .models import User, Poll, Vote
+from .pagination import paginate_polls, cursor_arg, per_page_arg
+from .passwords import hasher, HasherBusy
+from .polls import add_poll, import_polls, PollImportError
+from .queries import user_polls_query, voted_polls_query, has_voted_query
+from .replicas import replica_reads, pin_to_primary
+from .results import get_poll_results, invalidate_poll, results_payload, results_etag
+from .rollups import GRANULARITIES, timeseries, delete_poll_rollups
+from .tally import get_vote_counts, increment_vote_count, get_chart_data
+from .templating import invalidate_fragment
+
+bp = Blueprint('main', __name__)
+
+def hasher_busy(template):
+    # Shed load rather than queue more hashing behind a login burst
+    flash('The server is busy, please try again in a moment.', 'warning')
+    response = make_response(render_template(template), 503)
+    response.headers['Retry-After'] = '1'
+    return response
+
+def upgrade_password_hash(user, password):
+    # Move a hash made with an older work factor to the configured one, capacity permitting
+    if hasher().needs_rehash(user.password_hash):
+        try:
+            user.password_hash = hasher().hash(password)
+            db.session.commit()
+        except HasherBusy:
+            pass
+
+# Routes
+@bp.route('/')
+@replica_reads
+def index():
+    if current_user.is_authenticated:
+        page = paginate_polls(user_polls_query(current_user.id), cursor_arg('before'), per_page_arg())
+        return render_template('index.html', polls=page.items, next_cursor=page.next_cursor)
+    return render_template('landing.html')
+
+@bp.route('/register', methods=['GET', 'POST'])
+def register():
+    if request.method == 'POST':
+        try:
+            username = request.form.get('username')
+            email = request.form.get('email')
+            password = request.form.get('password')
+            
+            if not username or not password:
+                flash('Please enter both username and password', 'danger')
+                return redirect(url_for('main.register'))
+            
+            if User.query.filter_by(username=username).first():
+                flash('Username already exists', 'danger')
+                return redirect(url_for('main.register'))
+            
+            if User.query.filter_by(email=email).first():
+                flash('Email already exists', 'danger')
+                return redirect(url_for('main.register'))
+            
+            try:
+                password_hash = hasher().hash(password)
+            except HasherBusy:
+                return hasher_busy('register.html')
+            user = User(username=username, email=email, password_hash=password_hash)
+            db.session.add(user)
+            db.session.commit()
+            pin_to_primary()
+            
+            flash('Registration successful! Please login.', 'success')
+            return redirect(url_for('main.login'))
+        except Exception as e:
+            db.session.rollback()
+            print(f"Registration error: {str(e)}")
+            flash('An error occurred during registration. Please try again.', 'danger')
+            return redirect(url_for('main.register'))
+    
+    return render_template('register.html')
+
+@bp.route('/login', methods=['GET', 'POST'])
+def login():
+    if current_user.is_authenticated:
+        return redirect(url_for('main.index'))
+        
+    if request.method == 'POST':
+        username = request.form.get('username')
+        password = request.form.get('password')
+        
+        if not username or not password:
+            flash('Please enter both username and password', 'danger')
+            return redirect(url_for('main.login'))
+            
+        user = User.query.filter_by(username=username).first()
+        
+        if not user:
+            flash('Username not found', 'danger')
+            return redirect(url_for('main.login'))
+            
+        try:
+            valid = hasher().verify(user.password_hash, password)
+        except HasherBusy:
+            return hasher_busy('login.html')
+            
+        if valid:
+            upgrade_password_hash(user, password)
+            login_user(user)
+            pin_to_primary()
+            next_page = request.args.get('next')
+            if next_page and next_page.startswith('/'):  # Ensure the next URL is relative
+                return redirect(next_page)
+            return redirect(url_for('main.index'))
+        else:
+            flash('Invalid password', 'danger')
+            
+    return render_template('login.html')
+
+@bp.route('/logout')
+@login_required
+def logout():
+    logout_user()
+    return redirect(url_for('main.index'))
+
+@bp.route('/create', methods=['GET', 'POST'])
+@login_required
+def create_poll():
+    if request.method == 'POST':
+        title = request.form['title']
+        description = request.form['description']
+        options = request.form.getlist('options')
+        is_private = 'is_private' in request.form
+        
+        if len(options) < 2:
+            flash('A poll must have at least 2 options.', 'error')
+            return redirect(url_for('main.create_poll'))
+        
+        # One transaction, with all the options in a single INSERT
+        poll = add_poll(current_user.id, title, description, options, is_private=is_private)
+        db.session.commit()
+        pin_to_primary()
+        invalidate_poll(poll.id)
+        invalidate_fragment('poll_form', poll.id)
+        flash('Poll created successfully!', 'success')
+        return redirect(url_for('main.index'))
+    
+    return render_template('create_poll.html')
+
+@bp.route('/polls/import', methods=['POST'])
+@login_required
+def import_polls_endpoint():
+    # Parse the body as it arrives instead of buffering the whole upload
+    format = 'csv' if request.mimetype == 'text/csv' else 'jsonl'
+    lines = io.TextIOWrapper(request.stream, encoding='utf-8', newline='' if format == 'csv' else None)
+    try:
+        result = import_polls(lines, current_user.id, format=format,
+                              batch_size=current_app.config['IMPORT_BATCH_SIZE'])
+    except PollImportError as e:
+        if e.result is None:
+            return jsonify(error=str(e)), 400
+        pin_to_primary()
+        return jsonify(error=str(e), **e.result._asdict()), 400
+    pin_to_primary()
+    return jsonify(imported=result.imported, skipped=result.skipped, errors=result.errors)
+
+@bp.route('/poll/<int:poll_id>')
+@replica_reads
+def view_poll(poll_id):
+    poll = get_poll_results(poll_id)
+    if poll is None:
+        abort(404)
+    
+    denied = poll_denied(poll)
+    if denied is not None:
+        return denied
+    
+    # Check if user has already voted
+    has_voted = False
+    if current_user.is_authenticated:
+        has_voted = has_voted_query(poll_id, current_user.id).first() is not None
+    
+    return render_poll(poll, has_voted)
+
+def poll_denied(poll):
+    """Redirect away from a private poll the current user did not create, None if they may see it."""
+    if poll.is_private and current_user.is_authenticated and current_user.id != poll.user_id:
+        flash('You do not have permission to view this poll', 'danger')
+        return redirect(url_for('main.index'))
+    return None
+
+def render_poll(poll, has_voted):
+    # Get vote counts for all options at once
+    vote_counts = get_vote_counts(poll)
+    return render_template('view_poll.html', 
+                         poll=poll, 
+                         vote_counts=vote_counts,
+                         chart_data=get_chart_data(poll, vote_counts),
+                         has_voted=has_voted,
+                         results_interval=current_app.config['RESULTS_POLL_INTERVAL'])
+
+def results_or_404(poll_id):
+    return visible_results(get_poll_results(poll_id))
+
+def visible_results(poll):
+    if poll is None:
+        abort(404)
+    
+    # Tallies of a private poll are only for its creator; don't reveal that it exists
+    if poll.is_private and (not current_user.is_authenticated or current_user.id != poll.user_id):
+        abort(404)
+    return poll
+
+@bp.route('/poll/<int:poll_id>/results.json')
+@replica_reads
+def poll_results(poll_id):
+    return results_response(results_or_404(poll_id))
+
+def results_response(poll):
+    response = jsonify(results_payload(poll))
+    response.set_etag(results_etag(poll))
+    if poll.is_private:
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+    else:
+        response.cache_control.public = True
+        response.cache_control.max_age = current_app.config['RESULTS_MAX_AGE']
+    return response.make_conditional(request)
+
+@bp.route('/poll/<int:poll_id>/timeseries.json')
+@replica_reads
+def poll_timeseries(poll_id):
+    poll = results_or_404(poll_id)
+    granularity = request.args.get('granularity', 'hour')
+    if granularity not in GRANULARITIES:
+        abort(400)
+    try:
+        since = datetime.fromisoformat(request.args['since']) if 'since' in request.args else None
+    except ValueError:
+        abort(400)
+    
+    buckets, series = timeseries(poll, granularity, since)
+    return jsonify(
+        poll_id=poll.id,
+        granularity=granularity,
+        buckets=[bucket.isoformat() for bucket in buckets],
+        series=[{'option_id': option.id, 'text': option.text, 'votes': series[option.id]} for option in poll.options],
+    )
+
+@bp.route('/poll/<int:poll_id>/events')
+def poll_events(poll_id):
+    # Subscribe before taking the snapshot so no vote falls between the two
+    subscription = broker().subscribe(poll_channel(poll_id))
+    try:
+        snapshot = {'type': 'results', **results_payload(results_or_404(poll_id))}
+    except Exception:
+        subscription.close()
+        raise
+    keepalive = current_app.config['EVENTS_KEEPALIVE']
+    
+    def stream():
+        try:
+            yield format_event(snapshot)
+            while not subscription.lagged:
+                event = subscription.get(timeout=keepalive)
+                yield format_event(event) if event is not None else ': keepalive\n\n'
+        finally:
+            subscription.close()
+    
+    response = Response(stream(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+def queue_vote(poll, option_id):
+    # Validate against the cached poll and leave the write to the batch writer;
+    # False when its queue is full, so the caller falls through to the synchronous path
+    if option_id not in {option.id for option in poll.options}:
+        abort(404)
+    if not vote_writer().submit(poll.id, current_user.id, option_id):
+        return False
+    pin_to_primary()
+    return True
+
+@bp.route('/vote/<int:poll_id>', methods=['POST'])
+def vote(poll_id):
+    if not current_user.is_authenticated:
+        flash('Please log in to vote on this poll.', 'info')
+        return redirect(url_for('main.login', next=url_for('main.view_poll', poll_id=poll_id)))
+        
+    option_id = request.form.get('option', type=int)
+    
+    if not option_id:
+        flash('Please select an option to vote.', 'error')
+        return redirect(url_for('main.view_poll', poll_id=poll_id))
+    
+    poll = get_poll_results(poll_id)
+    if poll is None:
+        abort(404)
+    if poll.archived_at is not None:
+        flash('This poll is archived and no longer takes votes.', 'info')
+        return redirect(url_for('main.view_poll', poll_id=poll_id))
+    
+    if current_app.config['VOTE_INGEST'] == 'buffered' and queue_vote(poll, option_id):
+        flash('Your vote has been received and will appear in the results shortly.', 'success')
+        return redirect(url_for('main.view_poll', poll_id=poll_id))
+    
+    # Insert first and let UNIQUE(poll_id, user_id) reject a second vote, so there is
+    # no window between checking and inserting for a concurrent request to slip through
+    try:
+        db.session.add(Vote(user_id=current_user.id, poll_id=poll_id, option_id=option_id))
+        db.session.flush()
+    except IntegrityError:
+        db.session.rollback()
+        return redirect(url_for('main.view_poll', poll_id=poll_id))
+    
+    # The counter update also checks that the option belongs to this poll, and that it is still open
+    if not increment_vote_count(option_id, poll_id):
+        db.session.rollback()
+        abort(404)
+    db.session.commit()
+    # So the voter's next page sees their vote even if the replicas lag
+    pin_to_primary()
+    invalidate_poll(poll_id)
+    publish_vote(poll_id, option_id)
+    
+    flash('Your vote has been recorded!', 'success')
+    return redirect(url_for('main.view_poll', poll_id=poll_id))
+
+@bp.route('/my_polls')
+@login_required
+@replica_reads
+def my_polls():
+    per_page = per_page_arg()
+    created = paginate_polls(user_polls_query(current_user.id), cursor_arg('created_before'), per_page)
+    voted = paginate_polls(voted_polls_query(current_user.id), cursor_arg('voted_before'), per_page)
+    return render_my_polls(created, voted)
+
+def render_my_polls(created, voted):
+    return render_template('my_polls.html',
+                         created_polls=created.items,
+                         created_next=created.next_cursor,
+                         voted_polls=voted.items,
+                         voted_next=voted.next_cursor)
+
+@bp.route('/poll/<int:poll_id>/export/<any(votes, tallies):kind>.<any(csv, jsonl):format>')
+@login_required
+@replica_reads
+def export_poll(poll_id, kind, format):
+    poll = Poll.query.get_or_404(poll_id)
+    if poll.user_id != current_user.id:
+        abort(404)
+    
+    columns, rows = export_rows(kind, poll_id, yield_per=current_app.config['EXPORT_YIELD_PER'])
+    # The request context, and with it the session and its cursor, lives until the last chunk
+    response = Response(stream_with_context(encode_rows(columns, rows, format)), mimetype=FORMATS[format])
+    response.headers['Content-Disposition'] = f'attachment; filename=poll-{poll_id}-{kind}.{format}'
+    return response
+
+@bp.route('/poll/<int:poll_id>/delete', methods=['POST'])
+@login_required
+def delete_poll(poll_id):
+    poll = Poll.query.get_or_404(poll_id)
+    
+    if poll.user_id != current_user.id:
+        flash('You can only delete your own polls.', 'error')
+        return redirect(url_for('main.view_poll', poll_id=poll_id))
+    
+    # Votes are not cascaded by the schema; option counters go away with the options
+    Vote.query.filter_by(poll_id=poll.id).delete(synchronize_session=False)
+    delete_archived_voters(poll.id)
+    delete_poll_rollups(poll.id)
+    db.session.delete(poll)
+    db.session.commit()
+    delete_poll_archive(poll_id)
+    pin_to_primary()
+    invalidate_poll(poll_id)
+    invalidate_fragment('poll_form', poll_id)
+    flash('Poll deleted successfully!', 'success')
+    return redirect(url_for('main.my_polls'))
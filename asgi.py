@@ -0,0 +1,5 @@
+"""ASGI entry point: `uvicorn asgi:app` (see app.aio)."""
+from app import create_app
+from app.aio import AsyncReadApp
+
+app = AsyncReadApp(create_app())
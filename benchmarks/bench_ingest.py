@@ -0,0 +1,111 @@
+"""Compare synchronous and buffered vote ingestion on one hot poll.
+
+    FLASK_ENV=bench python benchmarks/bench_ingest.py --votes 2000 --clients 8
+
+Each mode starts from an empty schema on the bench database (BENCH_DATABASE_URL,
+default bench.db), then ``--clients`` threads post one vote per user through
+the vote route. Reports request latency and the time until every vote is
+committed, as JSON.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from sqlalchemy import insert  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.ingest import vote_writer  # noqa: E402
+from app.models import User, Poll, PollOption, Vote  # noqa: E402
+
+
+def setup(app, votes, options):
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        db.session.execute(insert(User), [
+            {'username': f'bench{i}', 'email': f'bench{i}@example.com', 'password_hash': 'x'} for i in range(votes)
+        ])
+        poll = Poll(title='Bench poll', user_id=1)
+        db.session.add(poll)
+        db.session.flush()
+        db.session.add_all([PollOption(text=f'Option {i}', poll_id=poll.id) for i in range(options)])
+        db.session.commit()
+        return poll.id, [option.id for option in poll.options]
+
+
+def post_votes(app, poll_id, option_ids, user_ids, latencies):
+    client = app.test_client()
+    for user_id in user_ids:
+        with client.session_transaction() as session:
+            session['_user_id'] = str(user_id)
+        start = time.perf_counter()
+        response = client.post(f'/vote/{poll_id}', data={'option': option_ids[user_id % len(option_ids)]})
+        latencies.append(time.perf_counter() - start)
+        assert response.status_code == 302, response.status_code
+
+
+def run(mode, votes, clients, options):
+    app = create_app('bench')
+    app.config['VOTE_INGEST'] = mode
+    poll_id, option_ids = setup(app, votes, options)
+
+    latencies = []
+    user_ids = list(range(1, votes + 1))
+    threads = [
+        threading.Thread(target=post_votes, args=(app, poll_id, option_ids, user_ids[i::clients], latencies))
+        for i in range(clients)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    requests_done = time.perf_counter() - start
+
+    with app.app_context():
+        if mode == 'buffered':
+            stats = vote_writer().stats
+            while stats['written'] + stats['duplicates'] + stats['lost'] < stats['queued']:
+                time.sleep(0.005)
+        committed = time.perf_counter() - start
+        assert Vote.query.count() == votes
+        assert sum(option.vote_count for option in PollOption.query.filter_by(poll_id=poll_id)) == votes
+        batches = vote_writer().stats['batches']
+
+    latencies.sort()
+    return {
+        'mode': mode,
+        'votes': votes,
+        'clients': clients,
+        'requests_seconds': round(requests_done, 3),
+        'committed_seconds': round(committed, 3),
+        'votes_per_second': round(votes / committed, 1),
+        'latency_ms': {
+            'p50': round(statistics.median(latencies) * 1000, 2),
+            'p95': round(latencies[int(len(latencies) * 0.95)] * 1000, 2),
+            'max': round(latencies[-1] * 1000, 2),
+        },
+        'batches': batches,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--votes', type=int, default=2000)
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--options', type=int, default=4)
+    parser.add_argument('--mode', choices=['sync', 'buffered', 'both'], default='both')
+    args = parser.parse_args()
+
+    modes = ['sync', 'buffered'] if args.mode == 'both' else [args.mode]
+    print(json.dumps([run(mode, args.votes, args.clients, args.options) for mode in modes], indent=2))
+
+
+if __name__ == '__main__':
+    main()
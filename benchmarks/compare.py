@@ -0,0 +1,65 @@
+"""Compare two benchmarks/routes.py reports.
+
+    python benchmarks/compare.py before.json after.json --max-regression 10
+
+Prints the change of each scenario's p50/p95/p99 latency, throughput and query
+count. With ``--max-regression``, exits non-zero when any p95 latency grew by
+more than that percentage.
+"""
+import argparse
+import json
+import sys
+
+
+def change(before, after):
+    if not before:
+        return None
+    return (after - before) * 100.0 / before
+
+
+def compare(before, after):
+    """Return one row per (scenario, driver) present in both reports."""
+    baseline = {(result['scenario'], result['driver']): result for result in before['results']}
+    rows = []
+    for result in after['results']:
+        old = baseline.get((result['scenario'], result['driver']))
+        if old is None:
+            continue
+        rows.append({
+            'scenario': result['scenario'],
+            'driver': result['driver'],
+            **{f'{p}_ms': (old['latency_ms'][p], result['latency_ms'][p]) for p in ('p50', 'p95', 'p99')},
+            'throughput_rps': (old['throughput_rps'], result['throughput_rps']),
+            'queries_mean': (old['queries_mean'], result['queries_mean']),
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('before')
+    parser.add_argument('after')
+    parser.add_argument('--max-regression', type=float, default=None, help='Allowed p95 growth, in percent.')
+    args = parser.parse_args()
+    with open(args.before) as before, open(args.after) as after:
+        rows = compare(json.load(before), json.load(after))
+
+    columns = ['p50_ms', 'p95_ms', 'p99_ms', 'throughput_rps', 'queries_mean']
+    print(f'{"scenario":<12} {"driver":<12}' + ''.join(f'{column:>24}' for column in columns))
+    regressions = []
+    for row in rows:
+        cells = []
+        for column in columns:
+            old, new = row[column]
+            delta = change(old, new) if old is not None and new is not None else None
+            cells.append(f'{old} -> {new}' + (f' ({delta:+.0f}%)' if delta is not None else ''))
+        print(f'{row["scenario"]:<12} {row["driver"]:<12}' + ''.join(f'{cell:>24}' for cell in cells))
+        growth = change(*row['p95_ms'])
+        if args.max_regression is not None and growth is not None and growth > args.max_regression:
+            regressions.append(f'{row["scenario"]}/{row["driver"]} p95 {growth:+.0f}%')
+    if regressions:
+        sys.exit('Regressions: ' + ', '.join(regressions))
+
+
+if __name__ == '__main__':
+    main()
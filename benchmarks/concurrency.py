@@ -0,0 +1,105 @@
+"""Requests per second of one server process, sync gunicorn against the ASGI read path.
+
+    FLASK_ENV=bench python benchmarks/seed.py --votes 100000
+    FLASK_ENV=bench python benchmarks/concurrency.py --concurrency 1 8 32 128 --output concurrency.json
+
+Starts one sync gunicorn worker (``wsgi:app``, as deployed) and one uvicorn
+worker (``asgi:app``, see app.aio) on the bench database in turn, and drives
+view_poll, results and my_polls at each ``--concurrency`` with the HTTP load
+generator of benchmarks/routes.py. The poll cache is turned off so every
+request waits on the database; point BENCH_DATABASE_URL at MySQL on another
+host to see the effect of network round trips, which SQLite doesn't have.
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app, db  # noqa: E402
+from routes import Workload, run_http  # noqa: E402
+
+SERVERS = {
+    'gunicorn-sync': ['gunicorn', '--workers', '1', '--bind', '127.0.0.1:{port}', 'wsgi:app'],
+    'uvicorn-asgi': ['uvicorn', '--workers', '1', '--port', '{port}', '--no-access-log', 'asgi:app'],
+}
+SCENARIOS = ['view_poll', 'results', 'my_polls']
+
+
+class ReadWorkload(Workload):
+    def next_request(self, scenario):
+        if scenario == 'results':
+            user_id, method, path, form = super().next_request('view_poll')
+            return user_id, method, f'{path}/results.json', form
+        return super().next_request(scenario)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(port, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f'The server exited with status {process.returncode}')
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise SystemExit(f'The server did not listen on port {port} within {timeout}s')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--server', action='append', choices=list(SERVERS), help='Repeatable, both by default.')
+    parser.add_argument('--scenario', action='append', choices=SCENARIOS, help='Repeatable, all by default.')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32, 128])
+    parser.add_argument('--requests', type=int, default=1000, help='Requests per scenario and concurrency.')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', default=None, help='Write the JSON report here instead of stdout.')
+    args = parser.parse_args()
+
+    app = create_app('bench')
+    with app.app_context():
+        workload = ReadWorkload(args.seed)
+        database = db.engine.url.get_backend_name()
+        db.session.remove()
+
+    env = {**os.environ, 'FLASK_ENV': 'bench', 'POLL_CACHE_SIZE': '0', 'SECRET_KEY': app.config['SECRET_KEY']}
+    results = []
+    for name in args.server or list(SERVERS):
+        port = free_port()
+        command = [part.format(port=port) for part in SERVERS[name]]
+        process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_for(port, process)
+            for scenario in args.scenario or SCENARIOS:
+                for concurrency in args.concurrency:
+                    result = run_http(app, f'http://127.0.0.1:{port}', workload, scenario, args.requests, concurrency)
+                    results.append({'server': name, 'concurrency': concurrency, **result})
+                    print(f'{name:<14} {scenario:<10} c={concurrency:<4} {result["throughput_rps"]:>8} req/s  '
+                          f'p95 {result["latency_ms"]["p95"]} ms  errors {result["errors"]}', file=sys.stderr)
+        finally:
+            process.terminate()
+            process.wait()
+
+    report = json.dumps({'meta': {'database': database, 'requests': args.requests}, 'results': results}, indent=2)
+    if args.output:
+        with open(args.output, 'w') as output:
+            output.write(report + '\n')
+    else:
+        print(report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""Render time of the landing and view_poll templates.
+
+    python benchmarks/render.py --renders 2000
+
+``cold`` is the first render in a fresh app, the way a newly forked worker
+sees it: compiled from source, or loaded from a warm bytecode cache. ``warm``
+is the mean of ``--renders`` later renders, with fragment caching off and on.
+Runs against an in-memory database with one poll, so only template work is
+measured.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from flask import render_template  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.config import TestConfig  # noqa: E402
+from app.models import User  # noqa: E402
+from app.polls import add_poll  # noqa: E402
+from app.results import get_poll_results  # noqa: E402
+from app.tally import get_vote_counts, get_chart_data  # noqa: E402
+
+
+def make_app(bytecode_dir=None, fragments=False):
+    config = TestConfig()
+    config.SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    config.TEMPLATE_BYTECODE_CACHE = bytecode_dir is not None
+    config.TEMPLATE_BYTECODE_CACHE_DIR = bytecode_dir
+    config.FRAGMENT_CACHE = fragments
+    config.METRICS_ENABLED = False
+    app = create_app(config)
+    with app.app_context():
+        db.create_all()
+        user = User(username='bench', email='bench@example.com', password_hash='-')
+        db.session.add(user)
+        db.session.flush()
+        add_poll(user.id, 'Favourite colour', 'Pick one', ['Red', 'Green', 'Blue', 'Yellow'], is_private=False)
+        db.session.commit()
+    return app
+
+
+def render(app, template):
+    if template == 'landing':
+        return render_template('landing.html')
+    poll = get_poll_results(1)
+    vote_counts = get_vote_counts(poll)
+    return render_template('view_poll.html', poll=poll, vote_counts=vote_counts,
+                           chart_data=get_chart_data(poll, vote_counts), has_voted=False,
+                           results_interval=app.config['RESULTS_POLL_INTERVAL'])
+
+
+def timed_render(app, template, renders=1):
+    with app.app_context(), app.test_request_context('/'):
+        start = time.perf_counter()
+        for _ in range(renders):
+            render(app, template)
+        return (time.perf_counter() - start) / renders
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--renders', type=int, default=1000)
+    parser.add_argument('--output', default=None, help='Write the JSON report here as well.')
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as bytecode_dir:
+        timed_render(make_app(bytecode_dir), 'view_poll')
+        timed_render(make_app(bytecode_dir), 'landing')
+        for template in ('landing', 'view_poll'):
+            cold_source = timed_render(make_app(), template)
+            cold_bytecode = timed_render(make_app(bytecode_dir), template)
+            plain = make_app()
+            timed_render(plain, template)
+            cached = make_app(fragments=True)
+            timed_render(cached, template)
+            results.append({
+                'template': template,
+                'cold_ms': {'source': round(cold_source * 1000, 2), 'bytecode_cache': round(cold_bytecode * 1000, 2)},
+                'warm_ms': {
+                    'no_fragments': round(timed_render(plain, template, args.renders) * 1000, 4),
+                    'fragments': round(timed_render(cached, template, args.renders) * 1000, 4),
+                },
+            })
+
+    report = json.dumps({'renders': args.renders, 'results': results}, indent=2)
+    print(report)
+    if args.output:
+        with open(args.output, 'w') as output:
+            output.write(report + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,237 @@
+"""Latency, throughput and query counts of the core routes.
+
+    FLASK_ENV=bench python benchmarks/seed.py --votes 100000
+    FLASK_ENV=bench python benchmarks/routes.py --requests 500 --concurrency 8 --output run.json
+
+Each scenario (view_poll, vote, index, my_polls, create_poll) is driven twice:
+through the Flask test client in this process, which measures the app alone,
+and by ``--concurrency`` threads sending real HTTP requests to a threaded
+server on 127.0.0.1 (or to ``--url``, for instance a gunicorn started on the
+same bench database). Query counts come from the Server-Timing header. Results
+are JSON; compare two runs with benchmarks/compare.py.
+"""
+import argparse
+import http.client
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import threading
+import time
+from urllib.parse import urlencode, urlsplit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from sqlalchemy import func  # noqa: E402
+from werkzeug.serving import make_server  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.models import User, PollOption, Vote  # noqa: E402
+
+SCENARIOS = ['view_poll', 'vote', 'index', 'my_polls', 'create_poll']
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(int(len(sorted_values) * fraction), len(sorted_values) - 1)]
+
+
+def query_count(server_timing):
+    """Statement count from a ``db;dur=..;desc="N queries"`` Server-Timing entry."""
+    for entry in server_timing.split(','):
+        if entry.strip().startswith('db;') and 'desc="' in entry:
+            return int(entry.split('desc="')[1].split()[0])
+    return None
+
+
+def summarize(scenario, driver, samples, elapsed):
+    """``samples`` are ``(seconds, ok, queries)`` tuples."""
+    latencies = sorted(seconds for seconds, _, _ in samples)
+    queries = [count for _, _, count in samples if count is not None]
+    return {
+        'scenario': scenario,
+        'driver': driver,
+        'requests': len(samples),
+        'errors': sum(not ok for _, ok, _ in samples),
+        'throughput_rps': round(len(samples) / elapsed, 1) if elapsed else 0.0,
+        'latency_ms': {
+            'p50': round(percentile(latencies, 0.50) * 1000, 2),
+            'p95': round(percentile(latencies, 0.95) * 1000, 2),
+            'p99': round(percentile(latencies, 0.99) * 1000, 2),
+            'max': round(latencies[-1] * 1000, 2) if latencies else 0.0,
+        },
+        'queries_mean': round(sum(queries) / len(queries), 2) if queries else None,
+    }
+
+
+class Workload:
+    """Picks the requests of each scenario from what the database was seeded with."""
+
+    def __init__(self, seed=1):
+        self.rng = random.Random(seed)
+        self.options = {}
+        for poll_id, option_id in db.session.query(PollOption.poll_id, PollOption.id):
+            self.options.setdefault(poll_id, []).append(option_id)
+        self.poll_ids = sorted(self.options)
+        self.polls = len(self.poll_ids)
+        self.users = db.session.query(func.max(User.id)).scalar() or 0
+        voters = db.session.query(func.max(Vote.user_id)).scalar() or 0
+        # Users past the last voter have not voted anywhere: each votes once
+        self.fresh_users = iter(range(voters + 1, self.users + 1))
+        self.lock = threading.Lock()
+        if not self.polls:
+            raise SystemExit('The bench database is empty, run benchmarks/seed.py first')
+
+    def next_request(self, scenario):
+        """Return ``(user_id, method, path, form)``."""
+        with self.lock:
+            poll_id = self.rng.choice(self.poll_ids)
+            owner = self.rng.randint(1, min(self.users, self.polls))
+            if scenario == 'view_poll':
+                return owner, 'GET', f'/poll/{poll_id}', None
+            if scenario == 'vote':
+                voter = next(self.fresh_users, None)
+                if voter is None:
+                    raise SystemExit('Out of fresh users for the vote scenario, seed with more --fresh-users')
+                option = self.rng.choice(self.options[poll_id])
+                return voter, 'POST', f'/vote/{poll_id}', {'option': option}
+            if scenario == 'index':
+                return owner, 'GET', '/', None
+            if scenario == 'my_polls':
+                return owner, 'GET', '/my_polls', None
+            return owner, 'POST', '/create', {
+                'title': 'Benchmark poll', 'description': 'Created by the benchmark', 'options': ['Yes', 'No', 'Maybe'],
+            }
+
+
+def run_test_client(app, workload, scenario, requests):
+    client = app.test_client()
+    samples = []
+    started = time.perf_counter()
+    for _ in range(requests):
+        user_id, method, path, form = workload.next_request(scenario)
+        with client.session_transaction() as session:
+            session['_user_id'] = str(user_id)
+            session['_fresh'] = True
+        start = time.perf_counter()
+        response = client.open(path, method=method, data=form)
+        samples.append((time.perf_counter() - start, response.status_code < 400,
+                        query_count(', '.join(response.headers.getlist('Server-Timing')))))
+    return summarize(scenario, 'test_client', samples, time.perf_counter() - started)
+
+
+def session_cookie(app, user_id):
+    """Signed session cookie of a logged-in user, so the load test needn't log in for each one.
+
+    A server started with ``--url`` must share the bench SECRET_KEY.
+    """
+    serializer = app.session_interface.get_signing_serializer(app)
+    value = serializer.dumps({'_user_id': str(user_id), '_fresh': True})
+    return f'{app.config["SESSION_COOKIE_NAME"]}={value}'
+
+
+def run_http(app, base_url, workload, scenario, requests, concurrency):
+    url = urlsplit(base_url)
+    samples = []
+    lock = threading.Lock()
+    remaining = [requests]
+
+    def worker():
+        # One keep-alive connection per thread; http.client reconnects if the server closes it
+        connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=30)
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    break
+                remaining[0] -= 1
+            user_id, method, path, form = workload.next_request(scenario)
+            headers = {'Cookie': session_cookie(app, user_id)}
+            body = None
+            if form is not None:
+                body = urlencode(form, doseq=True)
+                headers['Content-Type'] = 'application/x-www-form-urlencoded'
+            start = time.perf_counter()
+            try:
+                connection.request(method, path, body=body, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                ok, queries = response.status < 400, query_count(response.getheader('Server-Timing', ''))
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                ok, queries = False, None
+            sample = (time.perf_counter() - start, ok, queries)
+            with lock:
+                samples.append(sample)
+        connection.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(scenario, 'http', samples, time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scenario', action='append', choices=SCENARIOS, help='Repeatable, all by default.')
+    parser.add_argument('--requests', type=int, default=200, help='Requests per scenario and driver.')
+    parser.add_argument('--concurrency', type=int, default=8, help='Threads of the HTTP load generator.')
+    parser.add_argument('--driver', choices=['test_client', 'http', 'both'], default='both')
+    parser.add_argument('--url', default=None, help='Load test a running server instead of an in-process one.')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', default=None, help='Write the JSON report here instead of stdout.')
+    args = parser.parse_args()
+
+    app = create_app('bench')
+    results = []
+    with app.app_context():
+        workload = Workload(args.seed)
+        meta = {
+            'database': db.engine.url.get_backend_name(),
+            'polls': workload.polls,
+            'users': workload.users,
+            'votes': db.session.query(func.count(Vote.id)).scalar(),
+        }
+        db.session.remove()
+
+    server = None
+    base_url = args.url
+    if args.driver != 'test_client' and base_url is None:
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)
+        server = make_server('127.0.0.1', 0, app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f'http://127.0.0.1:{server.server_port}'
+
+    for scenario in args.scenario or SCENARIOS:
+        if args.driver in ('test_client', 'both'):
+            results.append(run_test_client(app, workload, scenario, args.requests))
+        if args.driver in ('http', 'both'):
+            results.append(run_http(app, base_url, workload, scenario, args.requests, args.concurrency))
+    if server is not None:
+        server.shutdown()
+
+    report = {
+        'meta': {
+            **meta,
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+            'python': platform.python_version(),
+            'started_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as output:
+            output.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+"""Seed the bench database with synthetic users, polls, options and votes.
+
+    FLASK_ENV=bench python benchmarks/seed.py --votes 1000000
+
+Rows are generated deterministically from ``--seed`` and written with
+multi-row INSERTs ``--batch-size`` rows at a time, so seeding 10^7 votes runs
+in constant memory. Vote ``i`` goes to poll ``i % polls`` from user
+``i // polls``, which keeps (poll, user) pairs unique. ``--fresh-users`` more
+users are created without any vote, for the vote benchmark to use. Every user's
+password is ``bench``.
+
+Set BENCH_DATABASE_URL to seed MySQL instead of the default bench.db.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from flask import current_app  # noqa: E402
+from sqlalchemy import bindparam, insert, update  # noqa: E402
+from werkzeug.security import generate_password_hash  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.models import User, Poll, PollOption, Vote  # noqa: E402
+
+PASSWORD = 'bench'
+SCALES = {
+    # votes: (users, polls)
+    10 ** 3: (100, 20),
+    10 ** 4: (1000, 100),
+    10 ** 5: (5000, 500),
+    10 ** 6: (20000, 2000),
+    10 ** 7: (100000, 10000),
+}
+
+
+def default_shape(votes):
+    """Users and polls for ``votes``, from the nearest preset scale."""
+    scale = min(SCALES, key=lambda size: abs(size - votes))
+    return SCALES[scale]
+
+
+def insert_batches(table, rows, batch_size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == batch_size:
+            db.session.execute(insert(table), batch)
+            db.session.commit()
+            batch = []
+    if batch:
+        db.session.execute(insert(table), batch)
+        db.session.commit()
+
+
+def seed(votes, users=None, polls=None, options=4, fresh_users=10000, batch_size=5000, seed=1):
+    """Recreate the schema and fill it; return a summary of what was written."""
+    default_users, default_polls = default_shape(votes)
+    users = users or default_users
+    polls = polls or default_polls
+    if votes > users * polls:
+        raise ValueError(f'{votes} votes need more than {users} users x {polls} polls')
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    start_time = datetime(2024, 1, 1)
+
+    db.drop_all()
+    db.create_all()
+
+    password_hash = generate_password_hash(PASSWORD, current_app.config['PASSWORD_HASH_METHOD'])
+    total_users = users + fresh_users
+    insert_batches(User, (
+        {'id': i, 'username': f'user{i}', 'email': f'user{i}@bench.invalid', 'password_hash': password_hash}
+        for i in range(1, total_users + 1)
+    ), batch_size)
+    insert_batches(Poll, (
+        {'id': i, 'title': f'Bench poll {i}', 'description': 'Synthetic', 'user_id': (i - 1) % users + 1,
+         'is_private': False, 'created_at': start_time + timedelta(minutes=i)}
+        for i in range(1, polls + 1)
+    ), batch_size)
+    insert_batches(PollOption, (
+        {'id': (poll - 1) * options + j + 1, 'poll_id': poll, 'text': f'Option {j + 1}', 'vote_count': 0}
+        for poll in range(1, polls + 1) for j in range(options)
+    ), batch_size)
+
+    counts = {}
+
+    def vote_rows():
+        for i in range(votes):
+            poll = i % polls + 1
+            option = (poll - 1) * options + rng.randrange(options) + 1
+            counts[option] = counts.get(option, 0) + 1
+            yield {'id': i + 1, 'poll_id': poll, 'user_id': i // polls + 1, 'option_id': option,
+                   'voted_at': start_time + timedelta(seconds=i)}
+
+    insert_batches(Vote, vote_rows(), batch_size)
+    db.session.execute(
+        update(PollOption).where(PollOption.id == bindparam('option_id')).values(vote_count=bindparam('votes'))
+        .execution_options(synchronize_session=False),
+        [{'option_id': option_id, 'votes': count} for option_id, count in counts.items()],
+    )
+    db.session.commit()
+
+    return {
+        'database': db.engine.url.get_backend_name(),
+        'users': users,
+        'fresh_users': fresh_users,
+        'polls': polls,
+        'options_per_poll': options,
+        'votes': votes,
+        'seed': seed,
+        'seconds': round(time.perf_counter() - started, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--votes', type=int, default=10 ** 4, help='1000 to 10000000')
+    parser.add_argument('--users', type=int, default=None, help='Voting users (default from the scale).')
+    parser.add_argument('--polls', type=int, default=None, help='Polls (default from the scale).')
+    parser.add_argument('--options', type=int, default=4, help='Options per poll.')
+    parser.add_argument('--fresh-users', type=int, default=10000, help='Users with no votes, for the vote benchmark.')
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    app = create_app('bench')
+    with app.app_context():
+        summary = seed(args.votes, args.users, args.polls, args.options, args.fresh_users, args.batch_size, args.seed)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == '__main__':
+    main()
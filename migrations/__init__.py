@@ -0,0 +1,103 @@
+"""Versioned schema migrations.
+
+Every module in ``migrations/versions`` is named ``NNNN_description.py`` and
+defines an ``upgrade(connection)`` function. Migrations run in version order,
+each in its own transaction, and the applied versions are recorded in the
+``schema_version`` table. Nothing here runs on import: the schema is only
+touched by ``flask db upgrade``.
+"""
+import importlib
+import pkgutil
+from collections import namedtuple
+from datetime import datetime
+
+import sqlalchemy as sa
+
+Migration = namedtuple('Migration', ['version', 'name', 'upgrade'])
+
+metadata = sa.MetaData()
+
+schema_version = sa.Table(
+    'schema_version',
+    metadata,
+    sa.Column('version', sa.Integer, primary_key=True, autoincrement=False),
+    sa.Column('name', sa.String(200), nullable=False),
+    sa.Column('applied_at', sa.DateTime, nullable=False),
+)
+
+
+def discover():
+    """Return all migrations shipped in ``migrations/versions``, oldest first."""
+    from . import versions
+
+    migrations = []
+    for module_info in pkgutil.iter_modules(versions.__path__):
+        version, _, name = module_info.name.partition('_')
+        if not version.isdigit():
+            continue
+        module = importlib.import_module(f'{versions.__name__}.{module_info.name}')
+        migrations.append(Migration(int(version), name, module.upgrade))
+    return sorted(migrations, key=lambda migration: migration.version)
+
+
+def applied_versions(connection):
+    """Return the set of versions already applied to the database."""
+    schema_version.create(connection, checkfirst=True)
+    return {row.version for row in connection.execute(sa.select(schema_version.c.version))}
+
+
+def current_version(engine):
+    """Return the highest applied version, or 0 for an empty database."""
+    with engine.begin() as connection:
+        return max(applied_versions(connection), default=0)
+
+
+def pending(engine):
+    """Return the migrations that have not been applied yet."""
+    with engine.begin() as connection:
+        applied = applied_versions(connection)
+    return [migration for migration in discover() if migration.version not in applied]
+
+
+def upgrade(engine, target=None):
+    """Apply pending migrations up to ``target`` (all of them by default).
+
+    Returns the list of migrations that were applied.
+    """
+    applied = []
+    for migration in pending(engine):
+        if target is not None and migration.version > target:
+            break
+        with engine.begin() as connection:
+            migration.upgrade(connection)
+            connection.execute(
+                schema_version.insert().values(
+                    version=migration.version, name=migration.name, applied_at=datetime.utcnow()
+                )
+            )
+        applied.append(migration)
+    return applied
+
+
+# Helpers for migration scripts
+def has_table(connection, table):
+    return sa.inspect(connection).has_table(table)
+
+
+def has_column(connection, table, column):
+    return any(col['name'] == column for col in sa.inspect(connection).get_columns(table))
+
+
+def has_index(connection, table, index):
+    inspector = sa.inspect(connection)
+    names = {ix['name'] for ix in inspector.get_indexes(table)}
+    names.update(uq['name'] for uq in inspector.get_unique_constraints(table))
+    return index in names
+
+
+def create_index(connection, table, name, columns, unique=False):
+    """Create an index unless one with the same name already exists."""
+    if has_index(connection, table, name):
+        return
+    kind = 'UNIQUE INDEX' if unique else 'INDEX'
+    connection.execute(sa.text(f'CREATE {kind} {name} ON {table} ({", ".join(columns)})'))
@@ -0,0 +1,45 @@
+"""Create the user, poll, poll_option and vote tables.
+
+This is the schema the old import-time init_db() created, so databases set up
+before migrations existed pass through it unchanged.
+"""
+import sqlalchemy as sa
+
+
+def upgrade(connection):
+    metadata = sa.MetaData()
+    sa.Table(
+        'user',
+        metadata,
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('username', sa.String(80), unique=True, nullable=False),
+        sa.Column('email', sa.String(120), unique=True, nullable=False),
+        sa.Column('password_hash', sa.String(512), nullable=False),
+    )
+    sa.Table(
+        'poll',
+        metadata,
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('title', sa.String(200), nullable=False),
+        sa.Column('description', sa.Text),
+        sa.Column('created_at', sa.DateTime, server_default=sa.func.current_timestamp()),
+        sa.Column('user_id', sa.Integer, sa.ForeignKey('user.id'), nullable=False),
+        sa.Column('is_private', sa.Boolean, server_default=sa.false()),
+    )
+    sa.Table(
+        'poll_option',
+        metadata,
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('text', sa.String(200), nullable=False),
+        sa.Column('poll_id', sa.Integer, sa.ForeignKey('poll.id', ondelete='CASCADE'), nullable=False),
+    )
+    sa.Table(
+        'vote',
+        metadata,
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('user_id', sa.Integer, sa.ForeignKey('user.id'), nullable=False),
+        sa.Column('poll_id', sa.Integer, sa.ForeignKey('poll.id'), nullable=False),
+        sa.Column('option_id', sa.Integer, sa.ForeignKey('poll_option.id'), nullable=False),
+        sa.Column('voted_at', sa.DateTime, server_default=sa.func.current_timestamp()),
+    )
+    metadata.create_all(connection, checkfirst=True)
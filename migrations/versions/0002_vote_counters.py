@@ -0,0 +1,16 @@
+"""Add the denormalized poll_option.vote_count counter and fill it from the vote table."""
+import sqlalchemy as sa
+
+from migrations import has_column
+
+RECOUNT = """
+    UPDATE poll_option SET vote_count = (
+        SELECT COUNT(vote.id) FROM vote WHERE vote.option_id = poll_option.id
+    )
+"""
+
+
+def upgrade(connection):
+    if not has_column(connection, 'poll_option', 'vote_count'):
+        connection.execute(sa.text('ALTER TABLE poll_option ADD COLUMN vote_count INTEGER NOT NULL DEFAULT 0'))
+    connection.execute(sa.text(RECOUNT))
@@ -0,0 +1,30 @@
+"""Enforce one vote per user and poll.
+
+Duplicate votes that slipped in before the constraint existed are removed,
+keeping the earliest one, and the option counters are recounted.
+"""
+import sqlalchemy as sa
+
+from migrations import create_index, has_index
+
+# The derived table lets MySQL delete from the table it is selecting from
+DELETE_DUPLICATES = """
+    DELETE FROM vote WHERE id NOT IN (
+        SELECT keep_id FROM (SELECT MIN(id) AS keep_id FROM vote GROUP BY poll_id, user_id) AS keep
+    )
+"""
+
+RECOUNT = """
+    UPDATE poll_option SET vote_count = (
+        SELECT COUNT(vote.id) FROM vote WHERE vote.option_id = poll_option.id
+    )
+"""
+
+
+def upgrade(connection):
+    if has_index(connection, 'vote', 'uq_vote_poll_user'):
+        return
+    removed = connection.execute(sa.text(DELETE_DUPLICATES)).rowcount
+    if removed:
+        connection.execute(sa.text(RECOUNT))
+    create_index(connection, 'vote', 'uq_vote_poll_user', ['poll_id', 'user_id'], unique=True)
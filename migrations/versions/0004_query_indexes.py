@@ -0,0 +1,9 @@
+"""Add the indexes behind the route queries (see the index plan in app/models.py)."""
+from migrations import create_index
+
+
+def upgrade(connection):
+    create_index(connection, 'poll', 'ix_poll_user_created', ['user_id', 'created_at'])
+    create_index(connection, 'poll_option', 'ix_poll_option_poll', ['poll_id'])
+    create_index(connection, 'vote', 'ix_vote_user_poll', ['user_id', 'poll_id'])
+    create_index(connection, 'vote', 'ix_vote_option', ['option_id'])
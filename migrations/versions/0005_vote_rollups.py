@@ -0,0 +1,22 @@
+"""Create the vote_rollup time series table and the watermark of its compaction job."""
+import sqlalchemy as sa
+
+
+def upgrade(connection):
+    metadata = sa.MetaData()
+    sa.Table(
+        'vote_rollup',
+        metadata,
+        sa.Column('poll_id', sa.Integer, primary_key=True, autoincrement=False),
+        sa.Column('granularity', sa.String(6), primary_key=True),
+        sa.Column('bucket', sa.DateTime, primary_key=True),
+        sa.Column('option_id', sa.Integer, primary_key=True, autoincrement=False),
+        sa.Column('votes', sa.Integer, nullable=False, server_default='0'),
+    )
+    sa.Table(
+        'rollup_watermark',
+        metadata,
+        sa.Column('name', sa.String(50), primary_key=True),
+        sa.Column('last_vote_id', sa.Integer, nullable=False, server_default='0'),
+    )
+    metadata.create_all(connection, checkfirst=True)
@@ -0,0 +1,9 @@
+"""Add poll.archived_at, set when `flask archive-polls` moves a poll's votes out of the vote table."""
+import sqlalchemy as sa
+
+from migrations import has_column
+
+
+def upgrade(connection):
+    if not has_column(connection, 'poll', 'archived_at'):
+        connection.execute(sa.text('ALTER TABLE poll ADD COLUMN archived_at DATETIME NULL'))
@@ -0,0 +1,14 @@
+"""Create archived_voter, the voters of archived polls, whose vote rows `flask archive-polls` deletes."""
+import sqlalchemy as sa
+
+
+def upgrade(connection):
+    metadata = sa.MetaData()
+    sa.Table(
+        'archived_voter',
+        metadata,
+        sa.Column('poll_id', sa.Integer, primary_key=True, autoincrement=False),
+        sa.Column('user_id', sa.Integer, primary_key=True, autoincrement=False),
+        sa.Index('ix_archived_voter_user', 'user_id', 'poll_id'),
+    )
+    metadata.create_all(connection, checkfirst=True)
@@ -0,0 +1 @@
+# Migration scripts, applied in the order of their numeric prefix
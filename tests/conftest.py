@@ -0,0 +1,113 @@
+import pytest
+from contextlib import contextmanager
+from app import create_app, db
+from app.models import User, Poll, PollOption, Vote
+from sqlalchemy import event
+from werkzeug.security import generate_password_hash
+
+@pytest.fixture
+def app():
+    app = create_app('test')
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def user(app):
+    user = User(
+        username='testuser',
+        email='test@example.com',
+        password_hash=generate_password_hash('password123')
+    )
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+@pytest.fixture
+def logged_in(client, user):
+    client.post('/login', data={'username': 'testuser', 'password': 'password123'})
+    return user
+
+@pytest.fixture
+def make_poll(app):
+    """Create a poll of ``owner`` with the given options; other Poll columns go in ``fields``.
+
+        poll = make_poll(user, 'Lunch', options=('Soup', 'Salad'), is_private=True)
+    """
+    def make(owner, title='Test Poll', options=('Option 1', 'Option 2'), **fields):
+        poll = Poll(title=title, user_id=owner.id, **fields)
+        db.session.add(poll)
+        db.session.flush()
+        db.session.add_all([PollOption(text=text, poll_id=poll.id) for text in options])
+        db.session.commit()
+        return poll
+    
+    return make
+
+@pytest.fixture
+def make_voters(app):
+    """Create ``count`` users named voter0, voter1, ..., numbered on from the voters made before."""
+    def make(count):
+        start = User.query.filter(User.username.startswith('voter')).count()
+        voters = [User(username=f'voter{i}', email=f'voter{i}@example.com', password_hash='x')
+                  for i in range(start, start + count)]
+        db.session.add_all(voters)
+        db.session.commit()
+        return voters
+    
+    return make
+
+@pytest.fixture
+def add_votes(make_voters):
+    """Vote on ``poll``, each time as a new voter, and update the tallies.
+
+    Each vote is an option index, or an ``(option_index, voted_at)`` pair to stamp it:
+
+        add_votes(poll, 0, 1, 0)
+        add_votes(poll, (0, datetime(2024, 5, 1, 9, 15)), (1, datetime(2024, 5, 1, 13, 5)))
+    """
+    def add(poll, *votes, voted_at=None):
+        voters = make_voters(len(votes))
+        for voter, vote in zip(voters, votes):
+            index, stamp = vote if isinstance(vote, tuple) else (vote, voted_at)
+            option = poll.options[index]
+            vote = Vote(user_id=voter.id, poll_id=poll.id, option_id=option.id)
+            if stamp is not None:
+                vote.voted_at = stamp
+            db.session.add(vote)
+            option.vote_count += 1
+        db.session.commit()
+        return voters
+    
+    return add
+
+@pytest.fixture
+def query_budget(app):
+    """Fail the test if the block runs more SQL statements than allowed.
+
+        with query_budget(3) as statements:
+            client.get('/my_polls')
+    """
+    @contextmanager
+    def budget(limit):
+        statements = []
+        
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+        assert len(statements) <= limit, f'{len(statements)} queries, budget is {limit}:\n' + '\n'.join(statements)
+    
+    return budget
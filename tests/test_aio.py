@@ -0,0 +1,146 @@
+import asyncio
+import pytest
+from app import create_app, db
+from app.aio import AsyncReadApp, wsgi_environ
+from app.models import User, Poll, PollOption, Vote
+
+@pytest.fixture
+def app(tmp_path):
+    # A file database, so the async engine sees what the test writes
+    app = create_app('test')
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{tmp_path}/aio.db'
+    
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def asgi(app):
+    pytest.importorskip('aiosqlite')
+    return AsyncReadApp(app)
+
+@pytest.fixture
+def polls(app):
+    owner = User(username='owner', email='owner@example.com', password_hash='x')
+    voter = User(username='voter', email='voter@example.com', password_hash='x')
+    db.session.add_all([owner, voter])
+    db.session.flush()
+    public = Poll(title='Public Poll', user_id=owner.id)
+    private = Poll(title='Private Poll', user_id=owner.id, is_private=True)
+    db.session.add_all([public, private])
+    db.session.flush()
+    db.session.add_all([PollOption(text=text, poll_id=poll.id, vote_count=0)
+                        for poll in (public, private) for text in ('Yes', 'No')])
+    db.session.flush()
+    db.session.add(Vote(poll_id=public.id, user_id=voter.id, option_id=public.options[0].id))
+    public.options[0].vote_count = 1
+    db.session.commit()
+    return owner, voter, public, private
+
+def session_cookie(app, user_id):
+    value = app.session_interface.get_signing_serializer(app).dumps({'_user_id': str(user_id)})
+    return f'session={value}'
+
+def call(asgi, path, method='GET', headers=(), body=b''):
+    """Send one request through the ASGI app and return (status, headers as lists, body).
+
+    A list ``body`` is sent as one message per item.
+    """
+    path, _, query = path.partition('?')
+    scope = {
+        'type': 'http', 'method': method, 'path': path, 'query_string': query.encode(), 'root_path': '',
+        'http_version': '1.1', 'scheme': 'http', 'server': ('testserver', 80), 'client': ('127.0.0.1', 1234),
+        'headers': [(name.lower().encode(), value.encode()) for name, value in headers],
+    }
+    chunks = body if isinstance(body, list) else [body]
+    messages = [{'type': 'http.request', 'body': chunk, 'more_body': i < len(chunks) - 1} for i, chunk in enumerate(chunks)]
+    sent = []
+    
+    async def receive():
+        return messages.pop(0)
+    
+    async def send(message):
+        sent.append(message)
+    
+    async def run():
+        await asgi(scope, receive, send)
+        if asgi._engine is not None:
+            await asgi._engine.dispose()
+    
+    asyncio.run(run())
+    start = sent[0]
+    headers = {}
+    for name, value in start['headers']:
+        headers.setdefault(name.decode(), []).append(value.decode())
+    return start['status'], headers, b''.join(message.get('body', b'') for message in sent[1:])
+
+def test_view_poll_is_served_async(app, asgi, polls):
+    owner, voter, public, private = polls
+    status, headers, body = call(asgi, f'/poll/{public.id}')
+    assert status == 200
+    assert b'Public Poll' in body and b'Submit Vote' in body
+    
+    # The voter's session comes from the cookie; the has-voted check runs on the async engine
+    status, headers, body = call(asgi, f'/poll/{public.id}', headers=[('Cookie', session_cookie(app, voter.id))])
+    assert b'Vote Recorded Successfully!' in body and b'voter' in body
+    
+    status, headers, body = call(asgi, f'/poll/{private.id}', headers=[('Cookie', session_cookie(app, voter.id))])
+    assert status == 302
+    assert call(asgi, '/poll/999')[0] == 404
+    
+    # Request hooks still run, and the metrics count the statements of the async engine
+    assert headers['server-timing'][0].startswith('app;dur=')
+    status, headers, body = call(asgi, f'/poll/{public.id}', headers=[('Cookie', session_cookie(app, voter.id))])
+    assert headers['server-timing'][1].endswith('desc="1 queries"')  # has voted; the poll and user are cached
+
+def test_results_json_is_served_async(app, asgi, polls):
+    owner, voter, public, private = polls
+    status, headers, body = call(asgi, f'/poll/{public.id}/results.json')
+    assert status == 200
+    assert b'"total_votes":1' in body.replace(b' ', b'')
+    
+    status, _, body = call(asgi, f'/poll/{public.id}/results.json', headers=[('If-None-Match', headers['etag'][0])])
+    assert status == 304 and body == b''
+    
+    assert call(asgi, f'/poll/{private.id}/results.json')[0] == 404
+    assert call(asgi, f'/poll/{private.id}/results.json', headers=[('Cookie', session_cookie(app, owner.id))])[0] == 200
+
+def test_my_polls_is_served_async(app, asgi, polls):
+    owner, voter, public, private = polls
+    status, headers, _ = call(asgi, '/my_polls')
+    assert status == 302 and '/login' in headers['location'][0]
+    
+    status, _, body = call(asgi, '/my_polls', headers=[('Cookie', session_cookie(app, owner.id))])
+    assert status == 200
+    assert b'Public Poll' in body and b'Private Poll' in body and b'2 options' in body
+    
+    status, _, body = call(asgi, '/my_polls', headers=[('Cookie', session_cookie(app, voter.id))])
+    assert b'Created by: owner' in body
+
+def test_other_routes_go_to_the_flask_app(app, polls):
+    asgi = AsyncReadApp(app)
+    status, headers, body = call(asgi, '/login', method='POST', body=b'username=owner&password=wrong',
+                                 headers=[('Content-Type', 'application/x-www-form-urlencoded'), ('Content-Length', '29')])
+    assert status == 200
+    assert b'Invalid password' in body
+    assert asgi._engine is None
+
+def test_request_body_is_streamed_to_the_flask_app(app, polls):
+    owner, voter, public, private = polls
+    asgi = AsyncReadApp(app)
+    body = [b'{"title": "Streamed", "options": ', b'["A", "B"]}\n{"title": "Second", ', b'"options": ["C", "D"]}\n']
+    status, _, response = call(asgi, '/polls/import', method='POST', body=body,
+                               headers=[('Content-Type', 'application/x-ndjson'), ('Cookie', session_cookie(app, owner.id))])
+    assert status == 200
+    assert b'"imported":2' in response.replace(b' ', b'')
+
+def test_wsgi_environ_from_scope():
+    environ = wsgi_environ({
+        'method': 'GET', 'path': '/my_polls', 'query_string': b'per_page=5', 'http_version': '1.1',
+        'headers': [(b'accept', b'text/html'), (b'accept', b'*/*'), (b'content-type', b'text/plain')],
+    })
+    assert environ['PATH_INFO'] == '/my_polls' and environ['QUERY_STRING'] == 'per_page=5'
+    assert environ['HTTP_ACCEPT'] == 'text/html,*/*'
+    assert environ['CONTENT_TYPE'] == 'text/plain'
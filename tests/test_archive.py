@@ -0,0 +1,112 @@
+import csv
+import gzip
+import io
+import json
+from datetime import datetime, timedelta
+import pytest
+from flask import g
+from app import db
+from app.archive import archive_files, archive_polls, polls_to_archive
+from app.models import ArchivedVoter, User, Poll, Vote, VoteRollup
+from app.tally import reconcile_vote_counts
+
+@pytest.fixture
+def archive_dir(app, tmp_path):
+    app.config['ARCHIVE_DIR'] = str(tmp_path / 'archive')
+    return tmp_path / 'archive'
+
+@pytest.fixture
+def polls(make_poll, add_votes, logged_in, archive_dir):
+    polls = []
+    for title, days_ago in [('Old Poll', 100), ('Fresh Poll', 1)]:
+        when = datetime.utcnow() - timedelta(days=days_ago)
+        poll = make_poll(logged_in, title, options=('Yes', 'No'), created_at=when)
+        add_votes(poll, 0, 1, 0, voted_at=when)
+        polls.append(poll)
+    return polls
+
+def test_inactive_polls_are_archived(app, polls, archive_dir):
+    old, fresh = polls
+    assert polls_to_archive(30) == [old.id]
+    
+    assert archive_polls(30) == (1, 3)
+    assert Vote.query.filter_by(poll_id=old.id).count() == 0
+    assert Vote.query.filter_by(poll_id=fresh.id).count() == 3
+    assert db.session.get(Poll, old.id).archived_at is not None
+    # The time series keeps the archived votes
+    assert sum(rollup.votes for rollup in VoteRollup.query.filter_by(poll_id=old.id, granularity='day')) == 3
+    
+    [path] = archive_files(old.id)
+    with gzip.open(path, 'rt') as source:
+        header, *votes = [json.loads(line) for line in source]
+    assert header == {'poll_id': old.id, 'columns': ['vote_id', 'user_id', 'option_id', 'voted_at']}
+    assert [vote[2] for vote in votes] == [old.options[0].id, old.options[1].id, old.options[0].id]
+    
+    # Frozen tallies survive reconciliation, and nothing is left to archive
+    assert reconcile_vote_counts() == 0
+    assert [option.vote_count for option in db.session.get(Poll, old.id).options] == [2, 1]
+    assert archive_polls(30) == (0, 0)
+
+def test_archived_poll_renders_and_exports_but_takes_no_votes(app, client, polls, archive_dir):
+    old, fresh = polls
+    archive_polls(30)
+    
+    results = client.get(f'/poll/{old.id}/results.json').get_json()
+    assert results['total_votes'] == 3
+    page = client.get(f'/poll/{old.id}').data
+    assert b'no longer takes votes' in page and b'Submit Vote' not in page
+    
+    response = client.post(f'/vote/{old.id}', data={'option': old.options[0].id}, follow_redirects=True)
+    assert b'archived and no longer takes votes' in response.data
+    assert Vote.query.filter_by(poll_id=old.id).count() == 0
+    
+    rows = list(csv.DictReader(io.StringIO(client.get(f'/poll/{old.id}/export/votes.csv').get_data(as_text=True))))
+    assert [row['option_text'] for row in rows] == ['Yes', 'No', 'Yes']
+    
+    g.pop('_login_user', None)
+    client.post(f'/poll/{old.id}/delete')
+    assert archive_files(old.id) == []
+
+def test_archived_poll_stays_in_its_voters_listing(app, client, polls, archive_dir):
+    old, fresh = polls
+    archive_polls(30)
+    
+    voter = User.query.filter_by(username='voter0').one()
+    g.pop('_login_user', None)
+    with client.session_transaction() as session:
+        session['_user_id'] = str(voter.id)
+    assert b'Old Poll' in client.get('/my_polls').data
+    page = client.get(f'/poll/{old.id}').data
+    assert b'Vote Recorded Successfully!' in page
+    
+    g.pop('_login_user', None)
+    with client.session_transaction() as session:
+        session['_user_id'] = str(old.user_id)
+    client.post(f'/poll/{old.id}/delete')
+    assert ArchivedVoter.query.count() == 0
+
+def test_straggler_votes_are_archived_on_the_next_run(app, polls, archive_dir):
+    old, fresh = polls
+    archive_polls(30)
+    
+    # A vote written before every worker saw the poll archived
+    straggler = User(username='late', email='late@example.com', password_hash='x')
+    db.session.add(straggler)
+    db.session.flush()
+    db.session.add(Vote(user_id=straggler.id, poll_id=old.id, option_id=old.options[1].id))
+    db.session.commit()
+    
+    assert archive_polls(30) == (1, 1)
+    assert len(archive_files(old.id)) == 2
+    assert Vote.query.filter_by(poll_id=old.id).count() == 0
+
+def test_poll_deleted_during_the_run_is_skipped(app, polls, archive_dir, monkeypatch):
+    old, fresh = polls
+    # Deleted by its creator after the run listed it
+    monkeypatch.setattr('app.archive.polls_to_archive', lambda days, limit: [12345, old.id])
+    assert archive_polls(30) == (1, 3)
+
+def test_partition_votes_needs_mysql(app):
+    result = app.test_cli_runner().invoke(args=['db', 'partition-votes', '--dry-run'])
+    assert result.exit_code != 0
+    assert 'only supported on MySQL' in result.output
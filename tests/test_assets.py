@@ -0,0 +1,78 @@
+import gzip
+import pytest
+from app import assets
+
+@pytest.fixture
+def static(app, tmp_path):
+    (tmp_path / 'css').mkdir()
+    (tmp_path / 'css' / 'style.css').write_text('body { color: red; }\n' * 200)
+    (tmp_path / 'images').mkdir()
+    (tmp_path / 'images' / 'multiple formats.txt').write_text('x')
+    (tmp_path / '.DS_Store').write_text('')
+    app.static_folder = str(tmp_path)
+    app.extensions['assets'] = assets.build(str(tmp_path), widths=(480,))
+    return tmp_path
+
+def test_build_fingerprints_and_compresses(static):
+    manifest = assets.load_manifest(str(static))
+    names = manifest['assets']
+    assert set(names) == {'css/style.css', 'images/multiple formats.txt'}
+    assert names['images/multiple formats.txt'].startswith('images/multiple-formats.')
+    
+    built = static / 'build' / names['css/style.css']
+    assert built.read_text() == (static / 'css' / 'style.css').read_text()
+    assert gzip.decompress((static / 'build' / (names['css/style.css'] + '.gz')).read_bytes()) == built.read_bytes()
+    # Compressing a one-byte file would only make it bigger
+    assert not (static / 'build' / (names['images/multiple formats.txt'] + '.gz')).exists()
+    
+    # Same content, same name; changed content, new name
+    assert assets.build(str(static))['assets'] == names
+    (static / 'css' / 'style.css').write_text('body { color: blue; }\n')
+    assert assets.build(str(static))['assets']['css/style.css'] != names['css/style.css']
+
+def test_assets_are_served_compressed_and_immutable(app, client, static):
+    with app.test_request_context():
+        url = assets.asset_url('css/style.css')
+        assert url.startswith('/assets/css/style.')
+        assert assets.asset_url('missing.css') == '/static/missing.css'
+    
+    response = client.get(url, headers={'Accept-Encoding': 'gzip, deflate'})
+    assert response.status_code == 200
+    assert response.content_encoding == 'gzip'
+    assert response.mimetype == 'text/css'
+    assert 'Accept-Encoding' in response.vary
+    assert response.cache_control.immutable
+    assert response.cache_control.max_age == app.config['ASSET_MAX_AGE']
+    assert gzip.decompress(response.data).startswith(b'body { color: red; }')
+    
+    response = client.get(url, headers={'Accept-Encoding': 'identity'})
+    assert response.content_encoding is None
+    assert response.data.startswith(b'body { color: red; }')
+    
+    assert client.get('/assets/manifest.json').status_code == 404
+
+def test_cached_head_follows_a_new_build(app, client, static):
+    app.config['FRAGMENT_CACHE'] = True
+    with app.test_request_context():
+        old_url = assets.asset_url('css/style.css')
+    assert old_url.encode() in client.get('/').data
+    
+    # A new deploy builds new names; the fragment cached by the old one must not be served
+    (static / 'css' / 'style.css').write_text('body { color: blue; }\n')
+    app.extensions['assets'] = assets.build(str(static))
+    page = client.get('/').data
+    assert old_url.encode() not in page
+    assert b'/assets/css/style.' in page
+
+def test_webp_variants_for_srcset(app, tmp_path):
+    Image = pytest.importorskip('PIL.Image')
+    (tmp_path / 'images').mkdir()
+    Image.new('RGB', (800, 400)).save(tmp_path / 'images' / 'easy.jpg')
+    app.static_folder = str(tmp_path)
+    app.extensions['assets'] = assets.build(str(tmp_path), widths=(480, 960))
+    
+    # Never upscaled past the original width
+    srcset = app.extensions['assets']['srcsets']['images/easy.jpg']
+    assert [width for width, _ in srcset] == [480, 800]
+    with app.test_request_context():
+        assert assets.asset_srcset('images/easy.jpg').endswith('.webp 800w')
@@ -0,0 +1,30 @@
+import pytest
+from app import create_app
+
+def test_profiles(monkeypatch):
+    """Each profile carries its own SQL echo and pool settings"""
+    monkeypatch.setenv('SECRET_KEY', 'prod-secret')
+    production = create_app('production')
+    assert production.config['SQLALCHEMY_ECHO'] is False
+    assert production.config['DB_POOL_PRE_PING'] is True
+    assert production.config['SECRET_KEY'] == 'prod-secret'
+    
+    assert create_app('development').config['SQLALCHEMY_ECHO'] is True
+    assert create_app('test').config['TESTING'] is True
+
+def test_profile_from_environment(monkeypatch):
+    """FLASK_ENV picks the profile and DATABASE_URL the database"""
+    monkeypatch.setenv('FLASK_ENV', 'test')
+    monkeypatch.setenv('DATABASE_URL', 'sqlite:///env.db')
+    app = create_app()
+    assert app.config['TESTING'] is True
+    assert app.config['SQLALCHEMY_DATABASE_URI'] == 'sqlite:///env.db'
+
+def test_production_requires_secret_key(monkeypatch):
+    monkeypatch.delenv('SECRET_KEY', raising=False)
+    with pytest.raises(RuntimeError):
+        create_app('production')
+
+def test_unknown_profile():
+    with pytest.raises(ValueError):
+        create_app('staging')
@@ -0,0 +1,61 @@
+import json
+import pytest
+from app.events import EventHub, LocalBroker, broker, poll_channel
+
+@pytest.fixture
+def poll(make_poll, logged_in):
+    return make_poll(logged_in, 'Live Poll')
+
+def parse(chunk):
+    lines = dict(line.split(': ', 1) for line in chunk.decode().strip().split('\n'))
+    return lines['event'], json.loads(lines['data'])
+
+def test_hub_fans_out_to_channel_subscribers():
+    hub = EventHub()
+    first, second, other = hub.subscribe('poll:1'), hub.subscribe('poll:1'), hub.subscribe('poll:2')
+    LocalBroker(hub).publish('poll:1', {'type': 'vote'})
+    assert first.get(timeout=0) == second.get(timeout=0) == {'type': 'vote'}
+    assert other.get(timeout=0) is None
+    
+    for subscription in (first, second, other):
+        subscription.close()
+    assert hub.subscriber_count() == 0
+
+def test_slow_subscriber_is_cut_off_not_waited_for():
+    hub = EventHub(queue_size=2)
+    slow = hub.subscribe('poll:1')
+    for i in range(3):
+        hub.deliver('poll:1', {'type': 'vote', 'n': i})
+    assert slow.lagged
+    assert hub.subscriber_count() == 0
+
+def test_stream_sends_snapshot_then_vote_deltas(app, client, poll):
+    app.config['EVENTS_KEEPALIVE'] = 0
+    response = client.get(f'/poll/{poll.id}/events')
+    assert response.mimetype == 'text/event-stream'
+    chunks = iter(response.response)
+    
+    event, data = parse(next(chunks))
+    assert event == 'results'
+    assert [option['votes'] for option in data['options']] == [0, 0]
+    assert next(chunks) == b': keepalive\n\n'
+    
+    client.post(f'/vote/{poll.id}', data={'option': poll.options[1].id})
+    event, data = parse(next(chunks))
+    assert event == 'vote'
+    assert data == {'type': 'vote', 'option_id': poll.options[1].id, 'delta': 1}
+    
+    response.close()
+    assert broker().hub.subscriber_count() == 0
+
+def test_stream_of_missing_poll(client, app):
+    assert client.get('/poll/12345/events').status_code == 404
+    assert broker().hub.subscriber_count() == 0
+
+def test_rejected_vote_is_not_published(client, poll):
+    subscription = broker().subscribe(poll_channel(poll.id))
+    client.post(f'/vote/{poll.id}', data={'option': poll.options[0].id})
+    client.post(f'/vote/{poll.id}', data={'option': poll.options[0].id})
+    assert subscription.get(timeout=0)['option_id'] == poll.options[0].id
+    assert subscription.get(timeout=0) is None
+    subscription.close()
@@ -0,0 +1,72 @@
+import csv
+import io
+import json
+import pytest
+from sqlalchemy import event, insert
+from app import db
+from app.export import encode_rows
+from app.models import User, Poll, Vote
+
+@pytest.fixture
+def poll(make_poll, add_votes, logged_in):
+    poll = make_poll(logged_in, 'Exported Poll', options=('Yes, please', 'No'))
+    add_votes(poll, 0, 1, 0, 1, 0)
+    return poll
+
+def test_export_votes_csv(client, poll):
+    response = client.get(f'/poll/{poll.id}/export/votes.csv')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    assert response.headers['Content-Disposition'] == f'attachment; filename=poll-{poll.id}-votes.csv'
+    
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert len(rows) == 5
+    assert [row['option_text'] for row in rows] == ['Yes, please', 'No', 'Yes, please', 'No', 'Yes, please']
+    assert all(row['voted_at'] for row in rows)
+
+def test_export_tallies_jsonl(client, poll):
+    response = client.get(f'/poll/{poll.id}/export/tallies.jsonl')
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert lines == [
+        {'option_id': poll.options[0].id, 'option_text': 'Yes, please', 'votes': 3},
+        {'option_id': poll.options[1].id, 'option_text': 'No', 'votes': 2},
+    ]
+
+def test_export_streams_without_loading_votes_into_the_session(app, client, poll):
+    app.config['EXPORT_YIELD_PER'] = 2
+    loaded = []
+    
+    def record(target, context):
+        loaded.append(target)
+    
+    event.listen(Vote, 'load', record)
+    try:
+        response = client.get(f'/poll/{poll.id}/export/votes.jsonl')
+        assert response.is_streamed
+        assert len(response.get_data(as_text=True).splitlines()) == 5
+    finally:
+        event.remove(Vote, 'load', record)
+    assert loaded == []
+
+def test_encode_rows_yields_fixed_size_chunks():
+    chunks = list(encode_rows(['n'], ((i,) for i in range(5)), 'jsonl', chunk_rows=2))
+    assert [chunk.count('\n') for chunk in chunks] == [2, 2, 1]
+
+def test_export_is_only_for_the_creator(app, client, poll):
+    other = User(username='other', email='other@example.com', password_hash='x')
+    db.session.add(other)
+    db.session.commit()
+    db.session.execute(insert(Poll), [{'title': 'Not mine', 'user_id': other.id}])
+    db.session.commit()
+    not_mine = Poll.query.filter_by(title='Not mine').one()
+    assert client.get(f'/poll/{not_mine.id}/export/votes.csv').status_code == 404
+    assert client.get(f'/poll/{poll.id}/export/votes.xml').status_code == 404
+
+def test_export_command(app, poll, tmp_path):
+    path = tmp_path / 'votes.csv'
+    result = app.test_cli_runner().invoke(args=['export-poll', str(poll.id), '--output', str(path)])
+    assert result.exit_code == 0, result.output
+    assert len(path.read_text().splitlines()) == 6
+    
+    result = app.test_cli_runner().invoke(args=['export-poll', '12345'])
+    assert result.exit_code != 0
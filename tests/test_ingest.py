@@ -0,0 +1,98 @@
+import time
+import pytest
+from flask import g
+from app import create_app, db
+from app.ingest import PendingVote, vote_writer
+from app.models import User, PollOption, Vote
+
+@pytest.fixture
+def app(tmp_path):
+    # A file database, so the writer thread gets connections of its own
+    app = create_app('test')
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{tmp_path}/ingest.db'
+    app.config['VOTE_INGEST'] = 'buffered'
+    app.extensions['vote_writer'].interval = 0.5
+    
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def poll(app, make_poll):
+    owner = User(username='owner', email='owner@example.com', password_hash='x')
+    db.session.add(owner)
+    db.session.commit()
+    return make_poll(owner, 'Hot Poll')
+
+@pytest.fixture
+def voters(make_voters):
+    return make_voters(5)
+
+def vote_as(client, user, poll_id, option_id):
+    g.pop('_login_user', None)
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user.id)
+    return client.post(f'/vote/{poll_id}', data={'option': option_id})
+
+def wait_for_writer(count, timeout=5):
+    stats = vote_writer().stats
+    deadline = time.monotonic() + timeout
+    while stats['written'] + stats['duplicates'] < count:
+        assert time.monotonic() < deadline, 'votes were not written in time'
+        time.sleep(0.01)
+
+def tallies(poll_id):
+    db.session.expire_all()
+    return [option.vote_count for option in PollOption.query.filter_by(poll_id=poll_id).order_by(PollOption.id)]
+
+def test_votes_are_written_in_one_batch(client, poll, voters):
+    first, second = poll.options
+    for i, voter in enumerate(voters):
+        response = vote_as(client, voter, poll.id, (first if i < 3 else second).id)
+        assert response.status_code == 302
+    
+    wait_for_writer(len(voters))
+    stats = vote_writer().stats
+    assert (stats['queued'], stats['written'], stats['batches']) == (5, 5, 1)
+    assert Vote.query.count() == 5
+    assert tallies(poll.id) == [3, 2]
+
+def test_only_the_first_vote_of_a_user_counts(client, poll, voters):
+    first, second = poll.options
+    db.session.add(Vote(user_id=voters[0].id, poll_id=poll.id, option_id=first.id))
+    first.vote_count = 1
+    db.session.commit()
+    
+    vote_as(client, voters[0], poll.id, second.id)
+    vote_as(client, voters[1], poll.id, second.id)
+    vote_as(client, voters[1], poll.id, first.id)
+    
+    wait_for_writer(3)
+    assert vote_writer().stats['duplicates'] == 2
+    assert tallies(poll.id) == [1, 1]
+    assert Vote.query.filter_by(user_id=voters[1].id).one().option_id == second.id
+
+def test_option_of_another_poll_is_rejected_before_queueing(client, poll, voters):
+    assert vote_as(client, voters[0], poll.id, 12345).status_code == 404
+    assert vote_writer().stats['queued'] == 0
+
+def test_full_queue_falls_back_to_synchronous_write(client, poll, voters, monkeypatch):
+    monkeypatch.setattr(vote_writer(), 'submit', lambda *args: False)
+    vote_as(client, voters[0], poll.id, poll.options[0].id)
+    assert tallies(poll.id) == [1, 0]
+
+def test_batch_racing_a_synchronous_vote_is_written_one_by_one(app, poll, voters, monkeypatch):
+    writer = vote_writer()
+    option = poll.options[0]
+    batch = [PendingVote(poll.id, voter.id, option.id, None) for voter in voters[:2]]
+    # Simulate a vote committed after the duplicate check of the batch
+    db.session.add(Vote(user_id=voters[0].id, poll_id=poll.id, option_id=option.id))
+    option.vote_count = 1
+    db.session.commit()
+    monkeypatch.setattr(writer, '_new_votes', lambda session, batch: batch)
+    
+    written = writer.write(batch)
+    assert [vote.user_id for vote in written] == [voters[1].id]
+    assert tallies(poll.id) == [2, 0]
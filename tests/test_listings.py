@@ -0,0 +1,51 @@
+import pytest
+from app import db
+from app.models import User, Poll, PollOption, Vote
+from app.queries import voted_polls_query
+
+def add_polls(owner, count, voter=None):
+    for i in range(count):
+        poll = Poll(title=f'{owner.username} poll {i}', description='Listing', user_id=owner.id)
+        db.session.add(poll)
+        db.session.flush()
+        options = [PollOption(text=f'Option {j}', poll_id=poll.id) for j in range(3)]
+        db.session.add_all(options)
+        db.session.flush()
+        if voter is not None:
+            db.session.add(Vote(user_id=voter.id, poll_id=poll.id, option_id=options[0].id))
+    db.session.commit()
+
+@pytest.fixture
+def other_user(app):
+    user = User(username='other', email='other@example.com', password_hash='x')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+@pytest.mark.parametrize('count', [1, 10])
+def test_my_polls_query_count_is_constant(client, logged_in, other_user, query_budget, count):
+    """Created and voted polls render in a fixed number of queries, whatever their number"""
+    add_polls(logged_in, count)
+    add_polls(other_user, count, voter=logged_in)
+    
+    # Session user, created polls, voted polls with their creators
+    with query_budget(3):
+        response = client.get('/my_polls')
+    assert response.status_code == 200
+    assert response.data.count(b'3 options') == count
+    assert response.data.count(b'Created by: other') == count
+
+@pytest.mark.parametrize('count', [1, 10])
+def test_index_query_count_is_constant(client, logged_in, query_budget, count):
+    add_polls(logged_in, count)
+    
+    # Session user, polls with their option counts
+    with query_budget(2):
+        response = client.get('/')
+    assert response.status_code == 200
+    assert response.data.count(b'3 options') == count
+
+def test_voted_polls_are_not_duplicated(app, logged_in, other_user):
+    add_polls(other_user, 2, voter=logged_in)
+    polls = voted_polls_query(logged_in.id).all()
+    assert len(polls) == len({poll.id for poll in polls}) == 2
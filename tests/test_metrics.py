@@ -0,0 +1,69 @@
+import logging
+import pytest
+from app import create_app, db
+from app.metrics import Histogram
+from app.models import Poll, PollOption
+from app.results import invalidate_poll
+
+@pytest.fixture
+def poll(app, user):
+    poll = Poll(title='Measured Poll', user_id=user.id)
+    db.session.add(poll)
+    db.session.flush()
+    db.session.add_all([PollOption(text='A', poll_id=poll.id), PollOption(text='B', poll_id=poll.id)])
+    db.session.commit()
+    return poll
+
+def test_server_timing_header_counts_queries(client, poll):
+    response = client.get(f'/poll/{poll.id}')
+    timings = response.headers.getlist('Server-Timing')
+    assert timings[0].startswith('app;dur=')
+    assert timings[1].startswith('db;dur=') and timings[1].endswith('queries"')
+    queries = int(timings[1].split('desc="')[1].split()[0])
+    assert queries >= 1
+    
+    # The poll is cached now
+    response = client.get(f'/poll/{poll.id}')
+    assert response.headers.getlist('Server-Timing')[1].endswith('desc="0 queries"')
+
+def test_histograms_per_endpoint(app, client, poll):
+    client.get(f'/poll/{poll.id}')
+    client.get(f'/poll/{poll.id}')
+    text = app.extensions['metrics'].render()
+    assert 'pollmaker_request_duration_seconds_count{endpoint="main.view_poll"} 2' in text
+    assert 'pollmaker_request_sql_queries_bucket{endpoint="main.view_poll",le="+Inf"} 2' in text
+    assert '# TYPE pollmaker_request_sql_rows_total counter' in text
+
+def test_query_budget_warning(app, client, poll, caplog):
+    app.config['QUERY_BUDGET'] = 0
+    client.get(f'/poll/{poll.id}')
+    assert not caplog.records
+    
+    app.config['QUERY_BUDGET'] = 1
+    invalidate_poll(poll.id)
+    db.session.remove()
+    with caplog.at_level(logging.WARNING):
+        client.get(f'/poll/{poll.id}')
+    assert 'over the budget of 1' in caplog.text
+    assert 'pollmaker_request_over_query_budget_total{endpoint="main.view_poll"} 1' in app.extensions['metrics'].render()
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram((1, 5))
+    for value in (0, 1, 3, 9):
+        histogram.observe(value)
+    assert histogram.render('q', 'endpoint="x"') == [
+        'q_bucket{endpoint="x",le="1"} 2',
+        'q_bucket{endpoint="x",le="5"} 3',
+        'q_bucket{endpoint="x",le="+Inf"} 4',
+        'q_sum{endpoint="x"} 13.000000',
+        'q_count{endpoint="x"} 4',
+    ]
+
+def test_metrics_endpoint(monkeypatch):
+    monkeypatch.setenv('INTERNAL_ENDPOINTS', 'true')
+    app = create_app('test')
+    client = app.test_client()
+    client.get('/')
+    response = client.get('/_internal/metrics')
+    assert response.mimetype == 'text/plain'
+    assert 'endpoint="main.index"' in response.get_data(as_text=True)
@@ -0,0 +1,78 @@
+import re
+from datetime import datetime, timedelta
+import pytest
+from app import db
+from app.models import Poll
+from app.pagination import encode_cursor, decode_cursor, paginate_polls
+from app.queries import user_polls_query
+
+def add_polls(owner, count, created_at=None):
+    start = datetime(2024, 1, 1)
+    for i in range(count):
+        db.session.add(Poll(title=f'Paged poll {i}', user_id=owner.id,
+                            created_at=created_at or start + timedelta(minutes=i)))
+    db.session.commit()
+
+def walk(user_id, per_page):
+    pages, cursor = [], None
+    while True:
+        page = paginate_polls(user_polls_query(user_id), decode_cursor(cursor), per_page)
+        pages.append([poll.id for poll in page.items])
+        if page.next_cursor is None:
+            return pages
+        cursor = page.next_cursor
+
+def test_cursor_round_trip(app, user):
+    add_polls(user, 1)
+    poll = Poll.query.one()
+    assert decode_cursor(encode_cursor(poll)) == (poll.created_at, poll.id)
+    assert decode_cursor(None) is None
+
+@pytest.mark.parametrize('value', ['not-a-cursor', 'MjAyNHwx', '!!!'])
+def test_malformed_cursor_is_rejected(value):
+    with pytest.raises(ValueError):
+        decode_cursor(value)
+
+def test_pages_cover_every_poll_once_newest_first(app, user):
+    add_polls(user, 25)
+    pages = walk(user.id, 10)
+    assert [len(page) for page in pages] == [10, 10, 5]
+    ids = [poll_id for page in pages for poll_id in page]
+    expected = [poll.id for poll in Poll.query.order_by(Poll.created_at.desc()).all()]
+    assert ids == expected
+
+def test_identical_timestamps_are_split_by_id(app, user):
+    """Polls created in the same instant are neither skipped nor repeated across pages"""
+    add_polls(user, 7, created_at=datetime(2024, 1, 1))
+    pages = walk(user.id, 3)
+    ids = [poll_id for page in pages for poll_id in page]
+    assert ids == sorted(ids, reverse=True)
+    assert len(ids) == len(set(ids)) == 7
+
+def test_exact_page_has_no_next_cursor(app, user):
+    add_polls(user, 4)
+    assert walk(user.id, 4) == [[4, 3, 2, 1]]
+
+def test_index_follows_older_polls_link(client, logged_in):
+    add_polls(logged_in, 5)
+    response = client.get('/?per_page=2')
+    assert response.data.count(b'Paged poll') == 2
+    seen = 0
+    while True:
+        seen += response.data.count(b'Paged poll')
+        match = re.search(rb'href="([^"]+)"[^>]*>Older polls', response.data)
+        if not match:
+            break
+        response = client.get(match.group(1).decode().replace('&amp;', '&'))
+        assert response.status_code == 200
+    assert seen == 5
+
+def test_page_size_is_capped(app, client, logged_in):
+    app.config['MAX_POLLS_PER_PAGE'] = 3
+    add_polls(logged_in, 5)
+    response = client.get('/?per_page=1000')
+    assert response.data.count(b'Paged poll') == 3
+
+def test_bad_cursor_is_a_400(client, logged_in):
+    assert client.get('/?before=garbage').status_code == 400
+    assert client.get('/my_polls?voted_before=garbage').status_code == 400
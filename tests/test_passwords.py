@@ -0,0 +1,72 @@
+import threading
+import time
+import pytest
+from app import db
+from app.models import User
+from app.passwords import PasswordHasher, HasherBusy, hasher
+
+CHEAP = 'pbkdf2:sha256:1000'
+
+@pytest.mark.parametrize('executor', ['thread', 'process'])
+def test_hash_and_verify_on_the_pool(executor):
+    pool = PasswordHasher(CHEAP, workers=1, executor=executor)
+    pwhash = pool.hash('secret')
+    assert pwhash.startswith(CHEAP + '$')
+    assert pool.verify(pwhash, 'secret')
+    assert not pool.verify(pwhash, 'wrong')
+    assert pool.stats.as_dict()['completed'] == 3
+
+def test_hasher_rejects_work_beyond_max_pending():
+    pool = PasswordHasher(CHEAP, workers=1, max_pending=1)
+    slow = threading.Thread(target=pool.run, args=(time.sleep, 0.3))
+    slow.start()
+    time.sleep(0.05)
+    with pytest.raises(HasherBusy):
+        pool.hash('secret')
+    slow.join()
+    assert pool.hash('secret')
+    stats = pool.stats.as_dict()
+    assert (stats['completed'], stats['rejected']) == (2, 1)
+
+def test_needs_rehash():
+    pool = PasswordHasher(CHEAP)
+    assert not pool.needs_rehash(pool.hash('secret'))
+    assert pool.needs_rehash(PasswordHasher('pbkdf2:sha256:2000').hash('secret'))
+    assert not PasswordHasher('scrypt').needs_rehash(PasswordHasher('scrypt:32768:8:1').hash('secret'))
+
+def test_register_uses_configured_method(client, app):
+    hasher().method = CHEAP
+    client.post('/register', data={'username': 'new', 'email': 'new@example.com', 'password': 'secret'})
+    assert User.query.filter_by(username='new').one().password_hash.startswith(CHEAP + '$')
+
+def test_login_rehashes_an_outdated_hash(client, user):
+    assert not user.password_hash.startswith(CHEAP + '$')
+    hasher().method = CHEAP
+    response = client.post('/login', data={'username': 'testuser', 'password': 'password123'})
+    assert response.status_code == 302
+    
+    db.session.expire_all()
+    assert user.password_hash.startswith(CHEAP + '$')
+    assert hasher().verify(user.password_hash, 'password123')
+
+def test_login_keeps_a_hash_made_with_the_short_method(client, user):
+    # 'scrypt' writes hashes prefixed 'scrypt:32768:8:1'
+    hasher().method = 'scrypt'
+    client.post('/login', data={'username': 'testuser', 'password': 'password123'})
+    client.get('/logout')
+    db.session.expire_all()
+    rehashed = user.password_hash
+    assert rehashed.startswith('scrypt:32768:8:1$')
+    
+    client.post('/login', data={'username': 'testuser', 'password': 'password123'})
+    db.session.expire_all()
+    assert user.password_hash == rehashed
+
+def test_login_answers_503_when_hasher_is_busy(client, user, monkeypatch):
+    def busy(*args):
+        raise HasherBusy()
+    monkeypatch.setattr(hasher(), 'run', busy)
+    response = client.post('/login', data={'username': 'testuser', 'password': 'password123'})
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+    assert b'The server is busy' in response.data
@@ -0,0 +1,94 @@
+import io
+import json
+import pytest
+from app import db
+from app.models import Poll, PollOption
+from app.polls import import_polls
+
+def jsonl(*rows):
+    return '\n'.join(row if isinstance(row, str) else json.dumps(row) for row in rows) + '\n'
+
+def test_create_poll_is_one_transaction_with_one_option_insert(client, logged_in, query_budget):
+    with query_budget(10) as statements:
+        response = client.post('/create', data={
+            'title': 'Lunch', 'description': 'Friday', 'options': ['Pizza', 'Sushi', 'Tacos'],
+        })
+    assert response.status_code == 302
+    inserts = [statement for statement in statements if statement.startswith('INSERT')]
+    assert len(inserts) == 2
+    
+    poll = Poll.query.one()
+    assert [option.text for option in poll.options] == ['Pizza', 'Sushi', 'Tacos']
+
+def test_import_jsonl_in_batches(app, user, query_budget):
+    rows = [{'title': f'Poll {i}', 'options': ['Yes', 'No'], 'is_private': i == 0} for i in range(5)]
+    with query_budget(100) as statements:
+        result = import_polls(io.StringIO(jsonl(*rows)), user.id, batch_size=2)
+    assert (result.imported, result.skipped) == (5, 0)
+    assert sum(statement.startswith('INSERT INTO poll_option') for statement in statements) == 3
+    
+    assert Poll.query.count() == 5
+    assert PollOption.query.count() == 10
+    assert Poll.query.filter_by(title='Poll 0').one().is_private
+
+def test_import_skips_invalid_rows(app, user):
+    lines = io.StringIO(jsonl(
+        {'title': 'Good', 'options': ['A', 'B']},
+        '{not json',
+        {'title': '', 'options': ['A', 'B']},
+        {'title': 'One option', 'options': ['A']},
+        '',
+        {'title': 'Also good', 'options': 'A|B|C'},
+        {'title': 'Listed description', 'description': ['x'], 'options': ['A', 'B']},
+        {'title': 'Long description', 'description': 'x' * 65536, 'options': ['A', 'B']},
+    ))
+    result = import_polls(lines, user.id)
+    assert (result.imported, result.skipped) == (2, 5)
+    assert [error['line'] for error in result.errors] == [2, 3, 4, 7, 8]
+    assert result.errors[3:] == [{'line': 7, 'error': 'description must be a string'},
+                                 {'line': 8, 'error': 'description is longer than 65535 bytes'}]
+    assert Poll.query.filter_by(title='Also good').one().option_count == 3
+
+def test_import_csv(app, user):
+    lines = io.StringIO('title,description,options,is_private\r\nLunch,"Friday, noon",Pizza|Sushi,yes\r\nBad,,Only,no\r\n')
+    result = import_polls(lines, user.id, format='csv')
+    assert (result.imported, result.skipped) == (1, 1)
+    assert result.errors == [{'line': 3, 'error': 'a poll must have at least 2 options'}]
+    poll = Poll.query.one()
+    assert (poll.description, poll.is_private) == ('Friday, noon', True)
+
+def test_import_endpoint(client, logged_in):
+    body = jsonl({'title': 'Uploaded', 'options': ['A', 'B']}, {'title': 'Broken'})
+    response = client.post('/polls/import', data=body, content_type='application/x-ndjson')
+    assert response.status_code == 200
+    assert response.json['imported'] == 1
+    assert response.json['errors'] == [{'line': 2, 'error': 'a poll must have at least 2 options'}]
+    assert Poll.query.one().user_id == logged_in.id
+    
+    response = client.post('/polls/import', data='name\r\nx\r\n', content_type='text/csv')
+    assert response.status_code == 400
+
+def test_import_endpoint_stops_at_invalid_utf8(app, client, logged_in):
+    app.config['IMPORT_BATCH_SIZE'] = 10
+    # More than one read of the text decoder, so some batches are committed before the bad bytes
+    body = jsonl(*({'title': f'Poll {i}', 'options': ['A', 'B']} for i in range(400))).encode() + b'\xff\xfe\n'
+    response = client.post('/polls/import', data=body, content_type='application/x-ndjson')
+    assert response.status_code == 400
+    assert response.json['error'] == 'input is not valid UTF-8'
+    assert 0 < response.json['imported'] == Poll.query.count() < 400
+
+def test_import_endpoint_requires_login(client, app):
+    response = client.post('/polls/import', data=jsonl({'title': 'Anonymous', 'options': ['A', 'B']}))
+    assert response.status_code == 302
+    assert Poll.query.count() == 0
+
+def test_import_command(app, user, tmp_path):
+    path = tmp_path / 'polls.csv'
+    path.write_text('title,options\nFrom CLI,Red|Green|Blue\n')
+    result = app.test_cli_runner().invoke(args=['import-polls', str(path), '--user', 'testuser'])
+    assert result.exit_code == 0, result.output
+    assert 'Imported 1 poll(s)' in result.output
+    assert Poll.query.one().option_count == 3
+    
+    result = app.test_cli_runner().invoke(args=['import-polls', str(path), '--user', 'nobody'])
+    assert result.exit_code != 0
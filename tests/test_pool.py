@@ -0,0 +1,44 @@
+import pytest
+from app import create_app
+from app.pool import InstrumentedQueuePool, engine_options, pool_stats
+from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+def test_engine_options_follow_config(app):
+    app.config.update(DB_POOL_SIZE=3, DB_MAX_OVERFLOW=1, DB_POOL_PRE_PING=True)
+    options = engine_options(app.config, make_url('mysql+pymysql://root:@localhost/POLLyverse'))
+    assert options['poolclass'] is InstrumentedQueuePool
+    assert (options['pool_size'], options['max_overflow'], options['pool_pre_ping']) == (3, 1, True)
+    
+    # SQLite keeps the pool Flask-SQLAlchemy chooses for it
+    assert engine_options(app.config, make_url('sqlite:///:memory:')) == {}
+
+def test_pool_stats_record_checkouts_and_timeouts(tmp_path):
+    engine = create_engine(
+        f'sqlite:///{tmp_path / "pool.db"}',
+        poolclass=InstrumentedQueuePool, pool_size=1, max_overflow=0, pool_timeout=0.05,
+        connect_args={'check_same_thread': False},
+    )
+    connection = engine.connect()
+    with pytest.raises(PoolTimeoutError):
+        engine.connect()
+    
+    stats = pool_stats(engine)
+    assert stats['pool'] == 'InstrumentedQueuePool'
+    assert (stats['checked_out'], stats['checkouts'], stats['timeouts']) == (1, 1, 1)
+    assert stats['wait_max_ms'] >= 50
+    
+    connection.close()
+    assert pool_stats(engine)['checked_in'] == 1
+    engine.dispose()
+
+def test_internal_pool_endpoint(monkeypatch):
+    assert create_app('test').test_client().get('/_internal/pool').status_code == 404
+    
+    monkeypatch.setenv('INTERNAL_ENDPOINTS', 'true')
+    app = create_app('test')
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    response = app.test_client().get('/_internal/pool')
+    assert response.status_code == 200
+    assert response.get_json()['pool'] == 'StaticPool'
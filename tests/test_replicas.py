@@ -0,0 +1,91 @@
+import pytest
+from sqlalchemy import create_engine
+from app import create_app, db
+from app.config import TestConfig
+from app.models import User, Poll, PollOption
+from app.replicas import ReplicaSet
+
+@pytest.fixture
+def app(tmp_path):
+    # Two database files: the primary and a replica that lags behind it
+    config = TestConfig()
+    config.SQLALCHEMY_DATABASE_URI = f'sqlite:///{tmp_path}/primary.db'
+    config.REPLICA_DATABASE_URIS = (f'sqlite:///{tmp_path}/replica.db',)
+    app = create_app(config)
+    
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def poll(app, tmp_path):
+    user = User(username='alice', email='alice@example.com', password_hash='x')
+    db.session.add(user)
+    db.session.flush()
+    poll = Poll(title='Lunch', user_id=user.id)
+    db.session.add(poll)
+    db.session.flush()
+    db.session.add_all([PollOption(text='Soup', poll_id=poll.id), PollOption(text='Salad', poll_id=poll.id)])
+    db.session.commit()
+    
+    # Replicate everything so far
+    replica = create_engine(f'sqlite:///{tmp_path}/replica.db')
+    db.Model.metadata.create_all(replica)
+    with replica.begin() as connection:
+        for table in db.Model.metadata.sorted_tables:
+            rows = [dict(row) for row in db.session.execute(table.select()).mappings()]
+            if rows:
+                connection.execute(table.insert(), rows)
+    replica.dispose()
+    return poll
+
+@pytest.fixture
+def alice(client, poll):
+    with client.session_transaction() as session:
+        session['_user_id'] = str(poll.user_id)
+    return poll.user_id
+
+def test_voter_reads_their_vote_from_the_primary(app, client, poll, alice):
+    assert b'Submit Vote' in client.get(f'/poll/{poll.id}').data
+    
+    client.post(f'/vote/{poll.id}', data={'option': poll.options[0].id})
+    assert b'Vote Recorded Successfully!' in client.get(f'/poll/{poll.id}').data
+    
+    # Once the pin expires the page reads the replica, which hasn't seen the vote yet
+    with client.session_transaction() as session:
+        session['_primary_until'] = 0
+    assert b'Submit Vote' in client.get(f'/poll/{poll.id}').data
+    assert app.extensions['replicas'].stats()[0]['requests'] == 2
+
+def test_replica_reads_do_not_fill_the_poll_cache(app, client, poll, alice):
+    client.post(f'/vote/{poll.id}', data={'option': poll.options[0].id})
+    
+    # An unpinned visitor reads the lagging replica, which must not be cached
+    visitor = app.test_client()
+    assert b'Submit Vote' in visitor.get(f'/poll/{poll.id}').data
+    db.session.remove()  # requests share the fixture's session, which now holds the replica's rows
+    
+    assert client.get(f'/poll/{poll.id}/results.json').get_json()['total_votes'] == 1
+
+def test_writes_go_to_the_primary(app, client, poll, alice):
+    client.post('/create', data={'title': 'Dinner', 'description': '', 'options': ['Pizza', 'Pasta']})
+    assert Poll.query.filter_by(title='Dinner').count() == 1
+    
+    # Pinned after creating it, so the listing shows it
+    assert b'Dinner' in client.get('/my_polls').data
+    with client.session_transaction() as session:
+        session['_primary_until'] = 0
+    assert b'Dinner' not in client.get('/my_polls').data
+
+def test_round_robin_skips_unhealthy_replicas(app, tmp_path):
+    replicas = ReplicaSet([f'sqlite:///{tmp_path}/a.db', f'sqlite:///{tmp_path}/missing/b.db', f'sqlite:///{tmp_path}/c.db'],
+                          app.config, health_interval=60)
+    picked = [replicas.choose().url.database for _ in range(4)]
+    assert [name.rsplit('/', 1)[1] for name in picked] == ['a.db', 'c.db', 'c.db', 'a.db']
+    assert [replica['healthy'] for replica in replicas.stats()] == [True, False, True]
+    
+    # No healthy replica: read from the primary
+    replicas = ReplicaSet([f'sqlite:///{tmp_path}/missing/b.db'], app.config)
+    assert replicas.choose() is None
@@ -0,0 +1,93 @@
+import pytest
+from app import db
+from app.results import get_poll_results, poll_cache
+from flask import g
+from sqlalchemy import event
+
+@pytest.fixture
+def poll(make_poll, logged_in):
+    return make_poll(logged_in, 'Cached Poll', description='Cached Description')
+
+@pytest.fixture
+def poll_selects(app):
+    executed = []
+    
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith('SELECT') and ('FROM poll ' in statement or 'FROM poll_option' in statement):
+            executed.append(statement)
+    
+    event.listen(db.engine, 'before_cursor_execute', record)
+    yield executed
+    event.remove(db.engine, 'before_cursor_execute', record)
+
+def test_view_poll_is_served_from_cache(client, poll, poll_selects):
+    assert client.get(f'/poll/{poll.id}').status_code == 200
+    loaded = len(poll_selects)
+    response = client.get(f'/poll/{poll.id}')
+    assert response.status_code == 200
+    assert b'Cached Poll' in response.data
+    assert len(poll_selects) == loaded
+    
+    stats = poll_cache().stats.as_dict()
+    assert (stats['hits'], stats['misses']) == (1, 1)
+
+def test_vote_invalidates_cached_results(client, poll):
+    option = poll.options[0]
+    assert get_poll_results(poll.id).options[0].vote_count == 0
+    
+    client.post(f'/vote/{poll.id}', data={'option': option.id})
+    assert poll_cache().get(poll.id) is None
+    assert get_poll_results(poll.id).options[0].vote_count == 1
+
+def test_deleted_poll_is_not_served_from_cache(client, poll):
+    client.get(f'/poll/{poll.id}')
+    client.post(f'/poll/{poll.id}/delete')
+    assert client.get(f'/poll/{poll.id}').status_code == 404
+
+def test_missing_poll(app):
+    assert get_poll_results(12345) is None
+
+def test_results_json(client, poll):
+    client.post(f'/vote/{poll.id}', data={'option': poll.options[1].id})
+    response = client.get(f'/poll/{poll.id}/results.json')
+    assert response.status_code == 200
+    assert response.json == {
+        'poll_id': poll.id,
+        'total_votes': 1,
+        'options': [
+            {'id': poll.options[0].id, 'text': 'Option 1', 'votes': 0},
+            {'id': poll.options[1].id, 'text': 'Option 2', 'votes': 1},
+        ],
+    }
+    assert response.cache_control.public
+    etag, weak = response.get_etag()
+    assert etag and not weak
+
+def test_unchanged_results_answer_304_without_queries(client, poll, poll_selects):
+    etag = client.get(f'/poll/{poll.id}/results.json').headers['ETag']
+    loaded = len(poll_selects)
+    response = client.get(f'/poll/{poll.id}/results.json', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+    assert len(poll_selects) == loaded
+
+def test_vote_changes_results_etag(client, poll):
+    etag = client.get(f'/poll/{poll.id}/results.json').headers['ETag']
+    client.post(f'/vote/{poll.id}', data={'option': poll.options[0].id})
+    response = client.get(f'/poll/{poll.id}/results.json', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert response.json['total_votes'] == 1
+
+def test_private_results_are_only_for_the_creator(app, client, poll):
+    poll.is_private = True
+    db.session.commit()
+    response = client.get(f'/poll/{poll.id}/results.json')
+    assert response.status_code == 200
+    assert response.cache_control.private and not response.cache_control.public
+    
+    g.pop('_login_user', None)
+    assert app.test_client().get(f'/poll/{poll.id}/results.json').status_code == 404
+
+def test_missing_poll_results_json(client, app):
+    assert client.get('/poll/12345/results.json').status_code == 404
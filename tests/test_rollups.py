@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+from app import db
+from app.models import Vote, VoteRollup, RollupWatermark
+from app.results import poll_view, serialize_poll
+from app.rollups import compact, timeseries, WATERMARK
+
+@pytest.fixture
+def poll(make_poll, logged_in):
+    return make_poll(logged_in, 'Timed Poll', options=('Early', 'Late'))
+
+def rollups(granularity):
+    return {(row.bucket, row.option_id): row.votes for row in VoteRollup.query.filter_by(granularity=granularity)}
+
+def test_compaction_counts_votes_per_bucket(poll, add_votes):
+    early, late = poll.options
+    add_votes(poll, (0, datetime(2024, 5, 1, 9, 15, 10)), (0, datetime(2024, 5, 1, 9, 15, 50)),
+              (0, datetime(2024, 5, 1, 9, 40)), (1, datetime(2024, 5, 1, 13, 5)))
+    assert compact() == 4
+    
+    assert rollups('minute') == {
+        (datetime(2024, 5, 1, 9, 15), early.id): 2,
+        (datetime(2024, 5, 1, 9, 40), early.id): 1,
+        (datetime(2024, 5, 1, 13, 5), late.id): 1,
+    }
+    assert rollups('hour') == {(datetime(2024, 5, 1, 9), early.id): 3, (datetime(2024, 5, 1, 13), late.id): 1}
+    assert rollups('day') == {(datetime(2024, 5, 1), early.id): 3, (datetime(2024, 5, 1), late.id): 1}
+
+def test_compaction_is_incremental(poll, add_votes):
+    add_votes(poll, (0, datetime(2024, 5, 1, 9, 15)))
+    assert compact() == 1
+    assert compact() == 0
+    
+    add_votes(poll, (0, datetime(2024, 5, 1, 9, 15, 30)), (1, datetime(2024, 5, 1, 9, 16)))
+    assert compact(batch_size=1) == 2
+    assert rollups('minute')[datetime(2024, 5, 1, 9, 15), poll.options[0].id] == 2
+    assert db.session.get(RollupWatermark, WATERMARK).last_vote_id == Vote.query.count()
+
+def test_recent_votes_wait_for_the_lag(poll, add_votes):
+    add_votes(poll, (0, datetime(2024, 5, 1)), (0, datetime.utcnow() + timedelta(minutes=5)))
+    assert compact(lag=10) == 1
+    assert sum(rollups('day').values()) == 1
+
+class AheadOfTheDatabase(datetime):
+    # The app's UTC clock against a MySQL server five hours west of UTC
+    @classmethod
+    def utcnow(cls):
+        return datetime.utcnow() + timedelta(hours=5)
+
+def test_votes_are_compacted_by_the_app_clock(client, poll, add_votes, monkeypatch):
+    monkeypatch.setattr('app.rollups.datetime', AheadOfTheDatabase)
+    stamped = AheadOfTheDatabase.utcnow() - timedelta(minutes=1)
+    add_votes(poll, (0, stamped))
+    assert compact(lag=10) == 1
+    
+    buckets, series = timeseries(poll_view(serialize_poll(poll)), 'hour')
+    assert buckets[-1] == stamped.replace(minute=0, second=0, microsecond=0)
+    assert series[poll.options[0].id][-1] == 1
+
+def test_timeseries_fills_empty_buckets(client, poll, add_votes):
+    now = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+    add_votes(poll, (0, now - timedelta(hours=2)), (1, now - timedelta(hours=2)), (1, now))
+    compact(lag=-60)
+    
+    response = client.get(f'/poll/{poll.id}/timeseries.json?granularity=hour&since={(now - timedelta(hours=3)).isoformat()}')
+    assert response.status_code == 200
+    data = response.json
+    assert len(data['buckets']) == 4
+    assert [series['votes'] for series in data['series']] == [[0, 1, 0, 0], [0, 1, 0, 1]]
+
+def test_timeseries_converts_since_with_an_offset_to_utc(client, poll, add_votes):
+    now = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+    add_votes(poll, (0, now - timedelta(hours=2)))
+    compact(lag=-60)
+    
+    # Three hours ago in UTC, written in UTC+02:00
+    since = (now - timedelta(hours=1)).replace(tzinfo=timezone(timedelta(hours=2)))
+    response = client.get(f'/poll/{poll.id}/timeseries.json', query_string={'granularity': 'hour', 'since': since.isoformat()})
+    assert response.status_code == 200
+    assert response.json['buckets'][0] == (now - timedelta(hours=3)).isoformat()
+    assert response.json['series'][0]['votes'] == [0, 1, 0, 0]
+
+def test_timeseries_rejects_bad_arguments(client, poll):
+    assert client.get(f'/poll/{poll.id}/timeseries.json?granularity=week').status_code == 400
+    assert client.get(f'/poll/{poll.id}/timeseries.json?since=yesterday').status_code == 400
+    assert client.get('/poll/12345/timeseries.json').status_code == 404
+
+def test_deleting_a_poll_deletes_its_rollups(client, poll, add_votes):
+    add_votes(poll, (0, datetime(2024, 5, 1)))
+    compact()
+    client.post(f'/poll/{poll.id}/delete')
+    assert VoteRollup.query.count() == 0
+
+def test_compact_rollups_command(app, poll, add_votes):
+    add_votes(poll, (0, datetime(2024, 5, 1)))
+    result = app.test_cli_runner().invoke(args=['compact-rollups'])
+    assert result.exit_code == 0, result.output
+    assert 'Folded 1 vote(s)' in result.output
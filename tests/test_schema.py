@@ -0,0 +1,58 @@
+import migrations
+from app import db
+from sqlalchemy import create_engine, inspect, text
+
+def test_index_plan_is_created(app):
+    """The documented indexes exist on the tables"""
+    inspector = inspect(db.engine)
+    indexes = {
+        table: {index['name'] for index in inspector.get_indexes(table)}
+        for table in ('poll', 'poll_option', 'vote')
+    }
+    assert 'ix_poll_user_created' in indexes['poll']
+    assert 'ix_poll_option_poll' in indexes['poll_option']
+    assert {'ix_vote_user_poll', 'ix_vote_option'} <= indexes['vote']
+    
+    unique = {constraint['name'] for constraint in inspector.get_unique_constraints('vote')}
+    assert 'uq_vote_poll_user' in unique
+
+def test_route_queries_use_indexes(app):
+    """No route query falls back to a full table scan"""
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=['explain-queries'])
+    assert result.exit_code == 0, result.output
+    assert 'FULL SCAN' not in result.output
+
+def test_migrations_build_the_model_schema(tmp_path):
+    """Upgrading an empty database yields the tables and indexes the models expect"""
+    engine = create_engine(f'sqlite:///{tmp_path / "migrated.db"}')
+    applied = migrations.upgrade(engine)
+    assert [migration.version for migration in applied] == [m.version for m in migrations.discover()]
+    assert migrations.current_version(engine) == applied[-1].version
+    
+    inspector = inspect(engine)
+    for table in db.Model.metadata.sorted_tables:
+        columns = {column['name'] for column in inspector.get_columns(table.name)}
+        assert set(table.columns.keys()) <= columns, table.name
+        indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+        assert {index.name for index in table.indexes} <= indexes, table.name
+    assert 'uq_vote_poll_user' in {index['name'] for index in inspector.get_indexes('vote')}
+    
+    # A second run has nothing left to do
+    assert migrations.upgrade(engine) == []
+
+def test_unique_vote_migration_removes_duplicates(tmp_path):
+    """Duplicate votes from before the constraint are dropped and counters recounted"""
+    engine = create_engine(f'sqlite:///{tmp_path / "legacy.db"}')
+    migrations.upgrade(engine, target=2)
+    with engine.begin() as connection:
+        connection.execute(text("INSERT INTO user (id, username, email, password_hash) VALUES (1, 'u', 'u@example.com', 'x')"))
+        connection.execute(text("INSERT INTO poll (id, title, user_id) VALUES (1, 'Poll', 1)"))
+        connection.execute(text("INSERT INTO poll_option (id, text, poll_id, vote_count) "
+                                "VALUES (1, 'A', 1, 2), (2, 'B', 1, 0)"))
+        connection.execute(text("INSERT INTO vote (user_id, poll_id, option_id) VALUES (1, 1, 1), (1, 1, 1)"))
+    
+    migrations.upgrade(engine)
+    with engine.connect() as connection:
+        assert connection.execute(text('SELECT COUNT(*) FROM vote')).scalar() == 1
+        assert connection.execute(text('SELECT vote_count FROM poll_option WHERE id = 1')).scalar() == 1
@@ -0,0 +1,60 @@
+import pytest
+from app import db
+from app.models import User, Poll, PollOption, Vote
+from app.tally import get_vote_counts, get_chart_data, count_votes, reconcile_vote_counts
+
+@pytest.fixture
+def poll(app, user):
+    voters = [User(username=f'voter{i}', email=f'voter{i}@example.com', password_hash='x') for i in range(3)]
+    db.session.add_all(voters)
+    db.session.commit()
+    
+    poll = Poll(title='Tally Poll', description='Counting votes', user_id=user.id)
+    db.session.add(poll)
+    db.session.commit()
+    
+    options = [PollOption(text=f'Option {i}', poll_id=poll.id) for i in range(3)]
+    db.session.add_all(options)
+    db.session.commit()
+    
+    # Two votes for the first option, one for the second, none for the third
+    for voter, option in zip(voters, [options[0], options[0], options[1]]):
+        db.session.add(Vote(user_id=voter.id, poll_id=poll.id, option_id=option.id))
+    db.session.commit()
+    return poll
+
+def test_count_votes_groups_by_option(poll):
+    """The vote table is counted per option in one grouped query"""
+    options = poll.options
+    assert count_votes(poll.id) == {options[0].id: 2, options[1].id: 1}
+
+def test_reconcile_rebuilds_counters(poll):
+    """Counters that drifted from the vote table are rebuilt"""
+    options = poll.options
+    # The fixture inserts votes directly, so the counters are still at zero
+    assert get_vote_counts(poll) == {options[0].id: 0, options[1].id: 0, options[2].id: 0}
+    
+    assert reconcile_vote_counts() == 2
+    db.session.expire_all()
+    assert get_vote_counts(poll) == {options[0].id: 2, options[1].id: 1, options[2].id: 0}
+    
+    # Nothing left to fix on a second run
+    assert reconcile_vote_counts(poll.id) == 0
+
+def test_chart_data_uses_vote_counts(poll):
+    """The chart payload is built from the same counts as the page"""
+    reconcile_vote_counts()
+    db.session.expire_all()
+    vote_counts = get_vote_counts(poll)
+    assert get_chart_data(poll, vote_counts) == [
+        {'text': 'Option 0', 'votes': 2},
+        {'text': 'Option 1', 'votes': 1},
+        {'text': 'Option 2', 'votes': 0},
+    ]
+
+def test_reconcile_command(app, poll):
+    """The CLI command reports how many counters it corrected"""
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=['reconcile-tallies', '--poll-id', str(poll.id)])
+    assert result.exit_code == 0
+    assert '2 option(s) corrected' in result.output
@@ -0,0 +1,54 @@
+import pytest
+from flask import render_template, render_template_string
+from app import create_app, db
+from app.config import TestConfig
+from app.models import Poll, PollOption
+from app.templating import invalidate_fragment
+
+@pytest.fixture
+def poll(app, user):
+    app.config['FRAGMENT_CACHE'] = True
+    poll = Poll(title='Cached Poll', user_id=user.id)
+    db.session.add(poll)
+    db.session.flush()
+    db.session.add_all([PollOption(text='Red', poll_id=poll.id), PollOption(text='Blue', poll_id=poll.id)])
+    db.session.commit()
+    return poll
+
+def app_fragment(client, key):
+    return client.application.extensions['fragment_cache'].get(key)
+
+def test_fragment_is_rendered_once_per_key(app):
+    app.config['FRAGMENT_CACHE'] = True
+    source = "{% cache 'greeting', who %}Hello <b>{{ who }}</b> {{ count }}{% endcache %}"
+    with app.test_request_context():
+        assert render_template_string(source, who='Ada', count=1) == 'Hello <b>Ada</b> 1'
+        assert render_template_string(source, who='Ada', count=2) == 'Hello <b>Ada</b> 1'
+        assert render_template_string(source, who='Bob', count=3) == 'Hello <b>Bob</b> 3'
+        
+        invalidate_fragment('greeting', 'Ada')
+        assert render_template_string(source, who='Ada', count=4) == 'Hello <b>Ada</b> 4'
+        
+        app.config['FRAGMENT_CACHE'] = False
+        assert render_template_string(source, who='Ada', count=5) == 'Hello <b>Ada</b> 5'
+
+def test_poll_form_fragment_is_invalidated_with_the_poll(client, poll):
+    assert b'Red' in client.get(f'/poll/{poll.id}').data
+    
+    # Options are never edited in place, so the form stays cached until the poll goes away
+    PollOption.query.filter_by(text='Red').update({'text': 'Green'})
+    db.session.commit()
+    assert app_fragment(client, f'poll_form:{poll.id}') is not None
+    assert b'Green' not in client.get(f'/poll/{poll.id}').data
+    
+    client.post('/login', data={'username': 'testuser', 'password': 'password123'})
+    client.post(f'/poll/{poll.id}/delete')
+    assert app_fragment(client, f'poll_form:{poll.id}') is None
+
+def test_bytecode_cache_is_written(tmp_path):
+    config = TestConfig()
+    config.TEMPLATE_BYTECODE_CACHE_DIR = str(tmp_path)
+    app = create_app(config)
+    with app.test_request_context():
+        render_template('landing.html')
+    assert [path.name for path in tmp_path.iterdir()]
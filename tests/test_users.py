@@ -0,0 +1,86 @@
+import time
+import pytest
+from app import db
+from flask import g
+from app.cache import LRUCache, SharedStore, TieredCache
+from app.models import User
+from sqlalchemy import event
+
+@pytest.fixture
+def statements(app):
+    """Collect the SQL statements run while the test executes"""
+    executed = []
+    
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+    
+    event.listen(db.engine, 'before_cursor_execute', record)
+    yield executed
+    event.remove(db.engine, 'before_cursor_execute', record)
+
+def user_selects(statements):
+    return [s for s in statements if s.startswith('SELECT') and 'FROM user' in s]
+
+def test_cached_user_skips_select(client, logged_in, statements):
+    """Only the first authenticated request loads the user from the database"""
+    for path in ('/', '/', '/my_polls'):
+        # The test's app context outlives requests, so reset what a real request
+        # would start without: the session and Flask-Login's per-context user
+        db.session.remove()
+        g.pop('_login_user', None)
+        assert client.get(path).status_code == 200
+    assert len(user_selects(statements)) == 1
+
+def test_cached_user_renders_like_a_loaded_one(client, logged_in):
+    client.get('/')
+    response = client.get('/')
+    assert b'testuser' in response.data
+    assert b'Logout' in response.data
+
+def test_user_update_invalidates_cache(app, client, logged_in):
+    client.get('/')
+    db.session.expire_all()
+    user = User.query.get(logged_in.id)
+    user.username = 'renamed'
+    db.session.commit()
+    assert app.extensions['user_cache'].get(logged_in.id) is None
+    
+    assert b'renamed' in client.get('/').data
+
+def test_lru_evicts_and_expires():
+    cache = LRUCache(maxsize=2, ttl=0.05)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)  # evicts b, the least recently used
+    assert (cache.get('a'), cache.get('b'), cache.get('c')) == (1, None, 3)
+    
+    time.sleep(0.06)
+    assert cache.get('a') is None
+    assert cache.stats.as_dict()['misses'] == 2
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+    
+    def get(self, key):
+        return self.data.get(key)
+    
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+    
+    def delete(self, key):
+        self.data.pop(key, None)
+
+def test_tiered_cache_shares_entries():
+    """A worker with an empty local cache picks entries up from the shared store"""
+    redis = FakeRedis()
+    writer = TieredCache(LRUCache(), SharedStore(redis, prefix='user:'))
+    reader = TieredCache(LRUCache(), SharedStore(redis, prefix='user:'))
+    
+    writer.set(1, {'id': 1, 'username': 'testuser'})
+    assert 'user:1' in redis.data
+    assert reader.get(1) == {'id': 1, 'username': 'testuser'}
+    
+    writer.delete(1)
+    assert 'user:1' not in redis.data
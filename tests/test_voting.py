@@ -0,0 +1,48 @@
+import pytest
+from app import db
+from app.models import Poll, PollOption, Vote
+
+@pytest.fixture
+def poll(client, logged_in):
+    poll = Poll(title='Test Poll', description='Test Description', user_id=logged_in.id)
+    db.session.add(poll)
+    db.session.commit()
+    
+    db.session.add_all([PollOption(text='Option 1', poll_id=poll.id), PollOption(text='Option 2', poll_id=poll.id)])
+    db.session.commit()
+    return poll
+
+def test_vote_is_recorded_and_counted(client, poll):
+    """A vote inserts one row and bumps the option counter"""
+    option = poll.options[0]
+    response = client.post(f'/vote/{poll.id}', data={'option': option.id}, follow_redirects=True)
+    assert response.status_code == 200
+    assert b'Your vote has been recorded!' in response.data
+    
+    db.session.expire_all()
+    assert Vote.query.filter_by(poll_id=poll.id).count() == 1
+    assert option.vote_count == 1
+
+def test_second_vote_is_rejected(client, poll):
+    """The unique constraint keeps a second vote out, including its counter update"""
+    first, second = poll.options
+    client.post(f'/vote/{poll.id}', data={'option': first.id})
+    response = client.post(f'/vote/{poll.id}', data={'option': second.id})
+    assert response.status_code == 302
+    
+    db.session.expire_all()
+    assert Vote.query.filter_by(poll_id=poll.id).count() == 1
+    assert (first.vote_count, second.vote_count) == (1, 0)
+
+def test_vote_for_option_of_another_poll(client, poll):
+    """An option that does not belong to the poll is a 404 and nothing is written"""
+    other = Poll(title='Other Poll', user_id=poll.user_id)
+    db.session.add(other)
+    db.session.commit()
+    
+    response = client.post(f'/vote/{other.id}', data={'option': poll.options[0].id})
+    assert response.status_code == 404
+    
+    db.session.expire_all()
+    assert Vote.query.count() == 0
+    assert poll.options[0].vote_count == 0
@@ -0,0 +1,7 @@
+"""WSGI entry point: `gunicorn wsgi:app`, `flask run` or `python wsgi.py`."""
+from app import create_app
+
+app = create_app()
+
+if __name__ == '__main__':
+    app.run(debug=True, port=5002)